@@ -0,0 +1,224 @@
+from collections import deque
+
+import numpy as np
+
+# ==========================================
+# [모듈] 오디오 DSP / 음성 구간 검출 (NumPy 벡터화)
+# ==========================================
+# audioop은 Python 3.13에서 삭제되었고, 고정 임계값(rms 1000)은 매장 소음이 바뀌면 오작동한다.
+# 512샘플 청크 여러 개를 (N, 512) 배열로 묶어 특징을 한 번에 계산하고,
+# 배경 소음 수준(noise floor)을 계속 추적하면서 그보다 충분히 큰 소리만 음성으로 본다.
+
+FRAME_SIZE = 512
+SAMPLE_RATE = 16000
+
+
+def pcm_to_frames(pcm, frame_size=FRAME_SIZE):
+    """16-bit PCM bytes -> (N, frame_size) int16 배열 (남는 샘플은 버림, 복사 없음)"""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    n = len(samples) // frame_size
+    return samples[:n * frame_size].reshape(n, frame_size)
+
+
+def frame_rms(frames):
+    """프레임별 RMS (audioop.rms와 같은 스케일)"""
+    x = frames.astype(np.float32)
+    return np.sqrt(np.mean(x * x, axis=1))
+
+
+def frame_zcr(frames):
+    """프레임별 영교차율 (0~1). 마찰음/잡음은 높고 유성음은 낮다."""
+    signs = np.signbit(frames)
+    return np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1)
+
+
+def frame_spectral_flatness(frames, eps=1e-10):
+    """프레임별 스펙트럼 평탄도 (0~1). 백색 잡음에 가까울수록 1, 음성처럼 배음이 뚜렷하면 0에 가깝다."""
+    window = np.hanning(frames.shape[1]).astype(np.float32)
+    spectrum = np.abs(np.fft.rfft(frames.astype(np.float32) * window, axis=1)) ** 2 + eps
+    geometric = np.exp(np.mean(np.log(spectrum), axis=1))
+    arithmetic = np.mean(spectrum, axis=1)
+    return geometric / arithmetic
+
+
+def frame_features(frames):
+    """(rms, zcr, flatness) 한 번에 계산"""
+    return frame_rms(frames), frame_zcr(frames), frame_spectral_flatness(frames)
+
+
+# ==========================================
+# [클래스] 적응형 음성 구간 검출기 (VAD)
+# ==========================================
+class VoiceActivityDetector:
+    def __init__(self, frame_size=FRAME_SIZE, threshold_ratio=3.0, min_rms=300.0, initial_floor=200.0,
+                 max_flatness=0.5, max_zcr=0.35, hangover_frames=4, noise_adapt=0.05, noise_creep=0.002):
+        self.frame_size = frame_size
+        self.threshold_ratio = threshold_ratio  # 소음 수준의 몇 배 이상이어야 음성으로 볼지
+        self.min_rms = min_rms                  # 아주 조용한 방에서도 이 값 미만은 음성 아님
+        self.max_flatness = max_flatness        # 이보다 평탄하면 잡음 (단, 아주 큰 소리는 예외)
+        self.max_zcr = max_zcr                  # 이보다 영교차가 잦으면 잡음/치찰음
+        self.hangover_frames = hangover_frames  # 음성이 끊긴 뒤에도 음성으로 유지할 프레임 수
+        self.noise_adapt = noise_adapt          # 비음성 프레임에서 소음 수준 추적 속도
+        self.noise_creep = noise_creep          # 음성으로 판정된 프레임에서도 아주 천천히 따라감 (소음이 커졌을 때 빠져나오기용)
+
+        self.noise_floor = initial_floor
+        self._hangover = 0
+        self._carry = b""   # 청크 경계가 frame_size와 안 맞을 때 남는 바이트
+
+        # 마지막 블록의 특징 (디버깅/튜닝용)
+        self.last_rms = None
+        self.last_flags = None
+
+    @property
+    def threshold(self):
+        return max(self.min_rms, self.noise_floor * self.threshold_ratio)
+
+    def process(self, pcm):
+        """
+        PCM 블록을 처리하고 (프레임별 음성 여부 bool 배열, (N, frame_size) int16 프레임)을 반환.
+        입력 길이가 frame_size 배수가 아니면 남는 부분은 다음 호출로 넘어간다.
+        """
+        if self._carry:
+            pcm = self._carry + pcm
+        usable = len(pcm) - len(pcm) % (self.frame_size * 2)
+        self._carry = pcm[usable:]
+        frames = pcm_to_frames(pcm[:usable], self.frame_size)
+        if len(frames) == 0:
+            return np.zeros(0, dtype=bool), frames
+
+        rms, zcr, flatness = frame_features(frames)
+
+        # 임계값이 프레임마다 바뀌므로 상태 갱신만 순차 처리 (특징 계산은 위에서 벡터화)
+        flags = np.zeros(len(frames), dtype=bool)
+        for i in range(len(frames)):
+            threshold = self.threshold
+            loud = rms[i] > threshold
+            voiced = flatness[i] < self.max_flatness or rms[i] > threshold * 3
+            raw_speech = loud and voiced and zcr[i] < self.max_zcr
+
+            if raw_speech:
+                self._hangover = self.hangover_frames
+                self.noise_floor += self.noise_creep * (rms[i] - self.noise_floor)
+                flags[i] = True
+            else:
+                self.noise_floor += self.noise_adapt * (rms[i] - self.noise_floor)
+                if self._hangover > 0:
+                    self._hangover -= 1
+                    flags[i] = True
+
+        self.last_rms = rms
+        self.last_flags = flags
+        return flags, frames
+
+    def reset(self):
+        self._hangover = 0
+        self._carry = b""
+
+
+# ==========================================
+# [클래스] 재생 중 끼어들기 판정 (스피커 소리 되울림 무시)
+# ==========================================
+# 키오스크는 에코 캔슬러 없이 스피커와 마이크가 열려 있어서, 모델 답변 소리가 마이크로 되돌아와
+# VAD를 켜고 답변을 스스로 끊을 수 있다. 재생 중(playing)에는 VAD 임계값의 echo_ratio배보다 큰 소리가
+# min_speech_ms 이상 이어져야 사용자가 끼어든 것으로 본다 (짧은 틈은 봐주고, 조용해지면 다시 셈).
+
+
+class BargeInDetector:
+    def __init__(self, vad, sample_rate=SAMPLE_RATE, echo_ratio=2.5, min_speech_ms=300):
+        self.vad = vad                      # 업링크 게이트와 같은 VAD (소음 수준 / 임계값 공유)
+        self.echo_ratio = echo_ratio
+        self.min_speech_ms = min_speech_ms
+        self.frame_ms = vad.frame_size / sample_rate * 1000
+        self._speech_ms = 0.0
+
+        # 통계
+        self.triggered = 0
+        self.suppressed = 0                 # 재생 중 VAD는 켜졌지만 끼어들기로 보지 않은 청크 수
+
+    def process(self, pcm, playing):
+        """마이크 원본 PCM 청크 하나를 보고 지금 재생을 끊어야 하면 True"""
+        if not playing:
+            self._speech_ms = 0.0
+            return False
+        frames = pcm_to_frames(pcm, self.vad.frame_size)
+        if len(frames) == 0:
+            return False
+        threshold = self.vad.threshold * self.echo_ratio
+        for loud in frame_rms(frames) > threshold:
+            self._speech_ms = self._speech_ms + self.frame_ms if loud else max(0.0, self._speech_ms - self.frame_ms)
+        if self._speech_ms >= self.min_speech_ms:
+            self._speech_ms = 0.0
+            self.triggered += 1
+            return True
+        self.suppressed += 1
+        return False
+
+    def summary(self):
+        return f"끼어들기 {self.triggered}회, 재생 소리로 보고 무시 {self.suppressed}회"
+
+
+# ==========================================
+# [클래스] 업링크 무음 억제 게이트
+# ==========================================
+# 말하는 구간(+앞뒤 여유)만 Live 세션으로 보내고, 무음 구간에는 아무것도 보내지 않는다.
+# 말이 끝나면 stream_ended=True를 돌려주므로 호출 쪽에서 audio_stream_end를 보내면 된다.
+class AudioUplinkGate:
+    def __init__(self, vad=None, pre_roll_frames=10, post_roll_frames=15):
+        self.vad = vad or VoiceActivityDetector()
+        self.pre_roll_frames = pre_roll_frames    # 말 시작 전 같이 보낼 프레임 수 (512샘플 기준 약 0.32초)
+        self.post_roll_frames = post_roll_frames  # 말이 끝난 뒤 더 보낼 프레임 수 (약 0.48초)
+
+        self.active = False
+        self._pre_roll = deque(maxlen=pre_roll_frames)
+        self._silent_run = 0
+
+        # 통계
+        self.frames_sent = 0
+        self.frames_suppressed = 0
+        self.segments = 0
+
+    def process(self, pcm):
+        """
+        PCM 청크를 받아 (보낼 bytes, 방금 발화가 끝났는지)를 반환.
+        보낼 것이 없으면 b"".
+        발화 종료는 묶음 전체가 무음일 때만 알린다 - 묶음 안에서 다시 말하기 시작했는데
+        audio_stream_end를 보내면 서버가 말하는 도중에 턴을 끝내 버린다.
+        """
+        flags, frames = self.vad.process(pcm)
+        out = []
+        ended = False
+        block_voice = any(flags)
+
+        for is_voice, frame in zip(flags, frames):
+            if not self.active:
+                if is_voice:
+                    # 발화 시작: 앞부분 여유분부터 같이 보낸다
+                    self.active = True
+                    self.segments += 1
+                    self._silent_run = 0
+                    out.extend(self._pre_roll)
+                    self._pre_roll.clear()
+                    out.append(frame)
+                else:
+                    if len(self._pre_roll) == self._pre_roll.maxlen:
+                        self.frames_suppressed += 1
+                    self._pre_roll.append(frame)
+                continue
+
+            out.append(frame)
+            if is_voice:
+                self._silent_run = 0
+            else:
+                self._silent_run += 1
+                if self._silent_run >= self.post_roll_frames and not block_voice:
+                    self.active = False
+                    self._silent_run = 0
+                    ended = True
+
+        self.frames_sent += len(out)
+        return b"".join(f.tobytes() for f in out), ended
+
+    def summary(self):
+        total = self.frames_sent + self.frames_suppressed
+        ratio = self.frames_suppressed / total if total else 0.0
+        return f"발화 {self.segments}회, 전송 {self.frames_sent}프레임, 억제 {self.frames_suppressed}프레임 ({ratio:.0%})"
@@ -0,0 +1,339 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+import pyaudio
+
+from metrics import TURN_FIRST_AUDIO_MS, TURN_FIRST_PLAY_MS
+
+# ==========================================
+# [클래스] 콜백 방식 마이크 입력 (링 버퍼 + 프레임 묶기)
+# ==========================================
+# 32ms 청크마다 asyncio.to_thread(input_stream.read)로 스레드를 오가고 웹소켓 메시지를 하나씩
+# 보내는 대신, PortAudio 콜백이 미리 잡아둔 링 버퍼에 쓰고 이벤트 루프는 100~200ms 단위로
+# 모아서 꺼내 간다.
+#
+# 쓰는 쪽(PortAudio 콜백 스레드)은 _write_pos만, 읽는 쪽(이벤트 루프)은 _read_pos만 바꾼다.
+# 단일 생산자/단일 소비자라서 락이 필요 없다. 버퍼가 가득 차면 새로 들어온 청크를 버리고 센다.
+
+
+class MicrophoneStream:
+    def __init__(self, pa, rate=16000, channels=1, chunk_size=512, frame_ms=100,
+                 buffer_seconds=2.0, device_index=None, sample_format=pyaudio.paInt16):
+        self.pa = pa
+        self.rate = rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+        self.device_index = device_index
+        self.sample_format = sample_format
+
+        sample_width = pyaudio.get_sample_size(sample_format) * channels
+        self.frame_bytes = int(rate * frame_ms / 1000) * sample_width   # 한 번에 꺼낼 묶음 크기
+        self.capacity = int(rate * buffer_seconds) * sample_width
+        self._ring = bytearray(self.capacity)
+        self._write_pos = 0   # 누적 기록 바이트 (콜백 스레드만 변경)
+        self._read_pos = 0    # 누적 소비 바이트 (이벤트 루프만 변경)
+
+        self._loop = None
+        self._ready = None
+        self._signaled = False
+        self.stream = None
+
+        # 통계
+        self.callbacks = 0
+        self.frames_read = 0
+        self.overflow_chunks = 0     # 링 버퍼가 가득 차서 버린 청크 수
+        self.overflow_bytes = 0
+        self.input_overflows = 0     # PortAudio가 보고한 입력 오버플로 수
+
+    @property
+    def available(self):
+        return self._write_pos - self._read_pos
+
+    def start(self, loop=None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self.stream = self.pa.open(
+            format=self.sample_format,
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=self.chunk_size,
+            stream_callback=self._callback,
+        )
+        self.stream.start_stream()
+        return self
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PortAudio 스레드에서 호출됨 - 링 버퍼에 복사만 하고 바로 돌아간다"""
+        self.callbacks += 1
+        if status & pyaudio.paInputOverflow:
+            self.input_overflows += 1
+
+        n = len(in_data)
+        if self.capacity - self.available < n:
+            self.overflow_chunks += 1
+            self.overflow_bytes += n
+            return (None, pyaudio.paContinue)
+
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._ring[start:start + first] = in_data[:first]
+        if first < n:
+            self._ring[:n - first] = in_data[first:]
+        self._write_pos += n
+
+        # 한 묶음이 모였을 때만 이벤트 루프를 깨운다 (청크마다 깨우지 않음)
+        if not self._signaled and self.available >= self.frame_bytes:
+            self._signaled = True
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                pass
+        return (None, pyaudio.paContinue)
+
+    def _take(self, n):
+        start = self._read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        data = bytes(self._ring[start:start + first])
+        if first < n:
+            data += bytes(self._ring[:n - first])
+        self._read_pos += n
+        return data
+
+    async def read_frame(self):
+        """frame_ms 분량의 PCM bytes가 모일 때까지 기다렸다가 반환"""
+        while self.available < self.frame_bytes:
+            self._ready.clear()
+            self._signaled = False
+            # 깨우기 플래그를 내린 사이에 이미 다 찼을 수 있으니 다시 확인
+            if self.available >= self.frame_bytes:
+                break
+            await self._ready.wait()
+        self.frames_read += 1
+        return self._take(self.frame_bytes)
+
+    def stop(self):
+        if self.stream is not None:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+
+    def summary(self):
+        return (f"묶음 {self.frames_read}개 / 콜백 {self.callbacks}회, "
+                f"링 버퍼 초과 {self.overflow_chunks}청크, 입력 오버플로 {self.input_overflows}회")
+
+
+# ==========================================
+# [클래스] 재생 스레드 (지터 버퍼 + 끼어들기 시 즉시 비우기)
+# ==========================================
+# receive_response()가 output_stream.write()에서 막히면 긴 답변 동안 수신/전송 코루틴이 다 멈춘다.
+# 수신 쪽은 enqueue()로 PCM을 넣기만 하고, 전용 스레드가 조금 모였을 때(prebuffer) 재생을 시작한다.
+# 서버가 interrupted를 보내거나 로컬 VAD가 사용자 발화를 감지하면 flush()로 남은 답변을 버린다.
+# 로컬 끼어들기는 서버보다 먼저 일어나므로 같은 턴의 오디오가 계속 들어온다 - 그 턴이 끝날 때까지
+# (end_turn / 서버 interrupted) 들어오는 오디오는 재생하지 않고 버린다.
+class AudioPlayer:
+    def __init__(self, pa, rate=24000, channels=1, sample_format=pyaudio.paInt16,
+                 prebuffer_ms=80, max_buffer_ms=120000, write_ms=40, echo_tail_ms=300):
+        self.pa = pa
+        self.rate = rate
+        self.channels = channels
+        self.sample_format = sample_format
+
+        bytes_per_ms = rate * pyaudio.get_sample_size(sample_format) * channels / 1000
+        self.bytes_per_ms = bytes_per_ms
+        self.prebuffer_bytes = int(prebuffer_ms * bytes_per_ms)
+        # 모델은 실시간보다 빨리 보내므로 답변 하나는 통째로 담을 수 있을 만큼 잡는다
+        self.max_buffer_bytes = int(max_buffer_ms * bytes_per_ms)
+        self.write_bytes = int(write_ms * bytes_per_ms) // 2 * 2   # 한 번에 쓰는 양 (flush 반응 속도)
+        self.echo_tail_s = echo_tail_ms / 1000    # 마지막 쓰기 뒤에도 스피커/잔향이 남는 시간
+        self._last_write_at = 0.0
+
+        self._cond = threading.Condition()
+        self._chunks = deque()
+        self._buffered = 0
+        self._playing = False       # prebuffer를 채우고 재생 중인지
+        self._turn_open = False     # 모델 턴이 아직 끝나지 않았는지
+        self._muted = False         # 로컬 끼어들기로 끊은 턴 - 턴이 끝날 때까지 새 오디오를 버림
+        self._generation = 0        # flush마다 증가 - 쓰는 중이던 조각을 버리는 데 사용
+        self._running = False
+        self.stream = None
+        self.thread = None
+
+        # 턴별 지연 측정
+        self._speech_end_at = None
+        self._turn = None
+        self.turn_stats = []
+
+        # 통계
+        self.underruns = 0
+        self.flushes = 0
+        self.dropped_bytes = 0
+
+    @property
+    def buffered_ms(self):
+        return self._buffered / self.bytes_per_ms
+
+    @property
+    def audible(self):
+        """스피커에서 답변이 나오는 중인지 (마이크로 되돌아올 수 있는 동안, 끼어들기 판정용)"""
+        return self._playing or self._buffered > 0 or time.monotonic() - self._last_write_at < self.echo_tail_s
+
+    def start(self):
+        self.stream = self.pa.open(format=self.sample_format, channels=self.channels,
+                                   rate=self.rate, output=True)
+        self._running = True
+        self.thread = threading.Thread(target=self._run, name="audio-playback", daemon=True)
+        self.thread.start()
+        return self
+
+    def note_speech_end(self, at=None):
+        """사용자 발화가 끝난 시각 기록 (응답 지연 측정 기준점)"""
+        self._speech_end_at = time.monotonic() if at is None else at
+
+    def enqueue(self, pcm):
+        """모델 오디오 조각 추가 (이벤트 루프에서 호출, 블로킹 없음)"""
+        now = time.monotonic()
+        with self._cond:
+            if self._muted:
+                self.dropped_bytes += len(pcm)
+                return
+            if self._turn is None:
+                self._turn = {
+                    "speech_end_at": self._speech_end_at,
+                    "first_chunk_at": now,
+                    "first_play_at": None,
+                    "bytes": 0,
+                    "underruns": 0,
+                    "interrupted": False,
+                }
+                self._speech_end_at = None
+            self._turn["bytes"] += len(pcm)
+            self._turn_open = True
+
+            self._chunks.append(pcm)
+            self._buffered += len(pcm)
+            # 너무 많이 쌓이면 오래된 것부터 버림 (정상적으로는 일어나지 않음)
+            while self._buffered > self.max_buffer_bytes and self._chunks:
+                old = self._chunks.popleft()
+                self._buffered -= len(old)
+                self.dropped_bytes += len(old)
+            self._cond.notify()
+
+    def end_turn(self):
+        """모델 턴 완료 - prebuffer보다 적게 남아도 끝까지 재생 (다 재생하면 턴 통계 확정)"""
+        with self._cond:
+            self._turn_open = False
+            self._muted = False
+            self._cond.notify()
+
+    def flush(self, reason="interrupted"):
+        """
+        남은 답변을 즉시 버린다 (서버 interrupted / 로컬 끼어들기).
+        서버가 끊은 경우("server")는 그 턴이 이미 끝났으므로 다음 오디오부터 다시 재생하고,
+        로컬에서 끊은 경우는 end_turn() 또는 서버 interrupted까지 같은 턴의 오디오를 버린다.
+        """
+        with self._cond:
+            # 턴이 이미 끝났으면(turn_complete 수신) 더 올 오디오가 없으므로 막지 않는다
+            self._muted = reason != "server" and self._turn_open
+            if not self._chunks and not self._playing:
+                return False
+            self.dropped_bytes += self._buffered
+            self._chunks.clear()
+            self._buffered = 0
+            self._playing = False
+            self._turn_open = False
+            self._generation += 1
+            self.flushes += 1
+            if self._turn is not None:
+                self._turn["interrupted"] = reason
+            self._close_turn()
+            self._cond.notify()
+        return True
+
+    def _close_turn(self):
+        turn, self._turn = self._turn, None
+        if turn is None:
+            return None
+        stats = {"bytes": turn["bytes"], "underruns": turn["underruns"], "interrupted": turn["interrupted"]}
+        if turn["speech_end_at"] is not None:
+            stats["speech_end_to_first_chunk_ms"] = (turn["first_chunk_at"] - turn["speech_end_at"]) * 1000
+            if turn["first_play_at"] is not None:
+                stats["speech_end_to_first_play_ms"] = (turn["first_play_at"] - turn["speech_end_at"]) * 1000
+        if turn["first_play_at"] is not None:
+            stats["jitter_buffer_ms"] = (turn["first_play_at"] - turn["first_chunk_at"]) * 1000
+        self.turn_stats.append(stats)
+        if "speech_end_to_first_chunk_ms" in stats:
+            TURN_FIRST_AUDIO_MS.observe(stats["speech_end_to_first_chunk_ms"])
+        if "speech_end_to_first_play_ms" in stats:
+            TURN_FIRST_PLAY_MS.observe(stats["speech_end_to_first_play_ms"])
+            print(f"\n⏱️ 응답 지연: 발화 종료→첫 오디오 {stats['speech_end_to_first_chunk_ms']:.0f}ms, "
+                  f"→재생 시작 {stats['speech_end_to_first_play_ms']:.0f}ms")
+        return stats
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if self._playing and self._chunks:
+                        break
+                    # 재생 시작 조건: prebuffer만큼 모였거나, 턴이 끝나서 더 올 게 없을 때
+                    if self._chunks and (self._buffered >= self.prebuffer_bytes or not self._turn_open):
+                        self._playing = True
+                        break
+                    if self._playing and not self._chunks and self._turn_open:
+                        # 턴 도중에 버퍼가 비었음 -> 다시 prebuffer
+                        self.underruns += 1
+                        if self._turn is not None:
+                            self._turn["underruns"] += 1
+                        self._playing = False
+                    elif not self._chunks:
+                        self._playing = False
+                        if not self._turn_open and self._turn is not None:
+                            # 턴이 끝났고 끝까지 재생함
+                            self._close_turn()
+                    self._cond.wait()
+                if not self._running:
+                    return
+
+                chunk = self._chunks.popleft()
+                if len(chunk) > self.write_bytes:
+                    self._chunks.appendleft(chunk[self.write_bytes:])
+                    chunk = chunk[:self.write_bytes]
+                self._buffered -= len(chunk)
+                generation = self._generation
+                if self._turn is not None and self._turn["first_play_at"] is None:
+                    self._turn["first_play_at"] = time.monotonic()
+
+            if generation != self._generation:
+                continue
+            try:
+                self.stream.write(chunk)
+                self._last_write_at = time.monotonic()
+            except Exception as e:
+                print(f"재생 오류: {e}")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        if self.stream is not None:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+
+    def summary(self):
+        latencies = [t["speech_end_to_first_play_ms"] for t in self.turn_stats if "speech_end_to_first_play_ms" in t]
+        avg = f"{sum(latencies) / len(latencies):.0f}ms" if latencies else "-"
+        return (f"턴 {len(self.turn_stats)}개, 발화 종료→재생 평균 {avg}, "
+                f"끊김 {self.underruns}회, 끼어들기 {self.flushes}회")
@@ -0,0 +1,132 @@
+import threading
+
+from metrics import REGISTRY
+
+# ==========================================
+# [클래스] 세션 컨텍스트 토큰 추정 (슬라이딩 윈도 압축과 함께 사용)
+# ==========================================
+# 세탁 안내가 20분 넘게 이어지면 오디오/비디오가 계속 컨텍스트에 쌓여서 턴마다 응답이 느려지다가
+# 결국 세션이 끊긴다. get_config()에서 context_window_compression(슬라이딩 윈도)을 켜면 서버가
+# trigger_tokens를 넘을 때 오래된 턴부터 잘라 target_tokens로 줄인다.
+#
+# 서버가 무엇을 잘라낼지는 고를 수 없으므로, 로컬에서는 지금 창(window)에 들어 있는 토큰을
+# 종류별로 추정해서 비디오가 차지하는 비율이 max_video_share를 넘으면 비디오 전송 간격을 늘린다.
+# (대화(오디오/텍스트)보다 비디오를 먼저 줄임 - 오래된 화면은 최신 화면 한 장으로 대신할 수 있음)
+#
+# 토큰 단가 (Gemini 문서 기준 추정치)
+# - 입력/출력 오디오: 초당 32토큰
+# - 비디오 프레임: 장당 258토큰 (media_resolution LOW면 64토큰)
+# 서버가 usage_metadata를 보내주면 그 값으로 보정한다.
+
+AUDIO_TOKENS_PER_SECOND = 32
+FRAME_TOKENS = {"MEDIA_RESOLUTION_LOW": 64, "MEDIA_RESOLUTION_MEDIUM": 258, None: 258}
+
+
+def compression_window(keep_seconds, frames_per_second, frame_tokens=258, max_video_share=0.5,
+                       context_limit=128000):
+    """
+    압축 후에도 최근 keep_seconds 동안의 대화가 창에 남도록 (trigger_tokens, target_tokens)를 계산한다.
+    초당 토큰 = 입출력 오디오 + 비디오. 비디오는 ContextBudget이 창 안 비율을 max_video_share로
+    묶으므로 그 상한을 넘지 않는다고 본다. trigger는 target의 두 배 (모델 창 크기를 넘지 않게).
+    """
+    audio_rate = 2 * AUDIO_TOKENS_PER_SECOND      # 입력 + 출력 (계속 말한다고 보는 보수적인 값)
+    video_rate = frames_per_second * frame_tokens
+    if max_video_share:
+        video_rate = min(video_rate, audio_rate * max_video_share / (1 - max_video_share))
+    target = (audio_rate + video_rate) * keep_seconds
+    trigger = min(context_limit, target * 2)
+    return int(trigger), int(min(target, trigger / 2))
+
+
+class ContextBudget:
+    def __init__(self, trigger_tokens=32000, target_tokens=16000, frame_tokens=258,
+                 max_video_share=0.5, max_interval_scale=4.0, input_rate=16000, output_rate=24000):
+        self.trigger_tokens = trigger_tokens
+        self.target_tokens = target_tokens
+        self.frame_tokens = frame_tokens
+        self.max_video_share = max_video_share
+        self.max_interval_scale = max_interval_scale
+        self._input_bytes_per_second = input_rate * 2
+        self._output_bytes_per_second = output_rate * 2
+        self._lock = threading.Lock()
+
+        # 현재 창 안의 추정 토큰 (종류별)
+        self.window = {"audio_in": 0.0, "audio_out": 0.0, "video": 0.0, "text": 0.0}
+        # 세션 전체 누적 (압축과 관계없이)
+        self.streamed = {"audio_in": 0.0, "audio_out": 0.0, "video": 0.0, "text": 0.0}
+        self.compressions = 0
+        self.reported_tokens = None     # 서버 usage_metadata 값 (있으면)
+
+        REGISTRY.gauge("vision_context_tokens", "현재 컨텍스트 창 추정 토큰", fn=lambda: round(self.tokens))
+        REGISTRY.gauge("vision_context_streamed_tokens", "세션 전체 전송 추정 토큰",
+                       fn=lambda: round(sum(self.streamed.values())))
+        REGISTRY.gauge("vision_context_video_share", "창 안 비디오 토큰 비율", fn=lambda: round(self.video_share, 3))
+
+    @property
+    def tokens(self):
+        return sum(self.window.values())
+
+    @property
+    def video_share(self):
+        total = self.tokens
+        return self.window["video"] / total if total else 0.0
+
+    # ---------- 기록 ----------
+
+    def _add(self, kind, tokens):
+        with self._lock:
+            self.window[kind] += tokens
+            self.streamed[kind] += tokens
+            if self.trigger_tokens and self.tokens > self.trigger_tokens:
+                # 서버가 오래된 턴부터 잘라 target_tokens로 줄인다 - 비율은 그대로 유지된다고 보고 축소
+                scale = self.target_tokens / self.tokens
+                for key in self.window:
+                    self.window[key] *= scale
+                self.compressions += 1
+
+    def add_input_audio(self, nbytes):
+        self._add("audio_in", nbytes / self._input_bytes_per_second * AUDIO_TOKENS_PER_SECOND)
+
+    def add_output_audio(self, nbytes):
+        self._add("audio_out", nbytes / self._output_bytes_per_second * AUDIO_TOKENS_PER_SECOND)
+
+    def add_frame(self):
+        self._add("video", self.frame_tokens)
+
+    def add_text(self, text):
+        self._add("text", len(text) / 2)    # 한국어 기준 대략 2글자당 1토큰
+
+    def observe_usage(self, usage):
+        """서버 usage_metadata로 추정치 보정 (현재 창 전체 토큰 수)"""
+        total = getattr(usage, "prompt_token_count", None) or getattr(usage, "total_token_count", None)
+        if not total:
+            return
+        with self._lock:
+            self.reported_tokens = total
+            estimate = self.tokens
+            if estimate:
+                scale = total / estimate
+                for key in self.window:
+                    self.window[key] *= scale
+
+    # ---------- 비디오 조절 ----------
+
+    @property
+    def video_interval_scale(self):
+        """
+        비디오 전송 간격에 곱할 배수 (1 = 그대로).
+        창이 절반 이상 찼고 비디오 비율이 max_video_share를 넘으면, 넘은 만큼 간격을 늘린다.
+        """
+        if not self.trigger_tokens or self.tokens < self.trigger_tokens * 0.5:
+            return 1.0
+        share = self.video_share
+        if share <= self.max_video_share:
+            return 1.0
+        return min(self.max_interval_scale, share / self.max_video_share)
+
+    def summary(self):
+        streamed = sum(self.streamed.values())
+        return (f"창 {self.tokens:.0f}토큰 (비디오 {self.video_share * 100:.0f}%), "
+                f"누적 전송 {streamed:.0f}토큰 (오디오 입력 {self.streamed['audio_in']:.0f}, "
+                f"출력 {self.streamed['audio_out']:.0f}, 비디오 {self.streamed['video']:.0f}), "
+                f"압축 {self.compressions}회, 비디오 간격 x{self.video_interval_scale:.1f}")
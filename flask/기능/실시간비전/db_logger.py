@@ -0,0 +1,219 @@
+import random
+import threading
+import time
+import uuid
+
+import firebase_admin
+from firebase_admin import credentials
+from firebase_admin import db
+
+from live_config import LOCAL_DB_PATH, MODEL_ID
+from metrics import FIREBASE_WRITE_FAILURES, FIREBASE_WRITE_MS
+from outbox import LocalOutbox
+
+# ==========================================
+# [클래스] DB 로그 저장 (Firebase Realtime Database)
+# ==========================================
+class DatabaseLogger:
+    """
+    대화 로그를 Firebase에 저장한다.
+    호출 쪽(수신 루프 / STT 스레드)은 로컬 SQLite 아웃박스(chat_history.db)에 먼저 기록만 하고,
+    백그라운드 동기화 스레드가 안 올라간 행을 모아서 세션 경로에 multi-path update()로 보낸다.
+    (네트워크 지연이 오디오 경로에 끼지 않고, Firebase가 끊겨 있어도 로그를 잃지 않음)
+
+    parent를 주면 그 로거의 아웃박스 / 동기화 스레드 / 메시지 키 생성기를 같이 쓰는 세션 로거가 된다
+    (open_session() 참고 - Firebase 초기화 / 스레드 / DB 연결을 새로 만들지 않음).
+    """
+    def __init__(self, cred_path="firebase_key.json", database_url="https://YOUR_PROJECT_ID-default-rtdb.firebaseio.com/",
+                 outbox_path=None, batch_size=50, flush_interval=1.0, retry_base_delay=0.5, retry_max_delay=30.0,
+                 start_session=True, parent=None, tag=None):
+        self.cred_path = cred_path
+        self.database_url = database_url
+        self.buffer = []
+        self.session_id = None
+        self.parent = parent
+
+        # 통계
+        self.batches_written = 0
+        self.items_written = 0
+        self.sync_failures = 0
+
+        if parent is not None:
+            self.outbox = parent.outbox
+            self._wake = parent._wake
+            self._syncer = None
+            if start_session:
+                self._start_session(tag)
+            return
+
+        # 로컬 아웃박스 + 동기화 설정
+        self.outbox = LocalOutbox(outbox_path or LOCAL_DB_PATH)
+        self.batch_size = batch_size          # 한 번에 올릴 최대 행 수
+        self.flush_interval = flush_interval  # 새 로그가 생긴 뒤 이만큼 더 모았다가 올린다 (초)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._wake = threading.Event()
+        self._closed = False
+        self._key_lock = threading.Lock()
+        self._last_key_ms = 0
+        self._key_counter = 0
+        # 아웃박스의 message_id는 전체에서 UNIQUE (INSERT OR IGNORE)라서, 같은 DB를 쓰는 다른 프로세스
+        # (vision.py + gateway.py, 빠른 재시작)가 같은 ms에 만든 키와 겹치면 메시지가 조용히 버려진다
+        self._key_node = uuid.uuid4().hex[:6]
+
+        # Firebase 초기화(인증서 읽기 / 앱 생성)는 동기화 스레드에서 - 시작 경로에서 기다리지 않는다
+        if start_session:
+            self._start_session(tag)
+        self._syncer = threading.Thread(target=self._sync_loop, name="firebase-syncer", daemon=True)
+        self._syncer.start()
+
+    def _init_firebase(self):
+        """Firebase 초기화"""
+        try:
+            # 이미 초기화되었는지 확인
+            if not firebase_admin._apps:
+                cred = credentials.Certificate(self.cred_path)
+                firebase_admin.initialize_app(cred, {
+                    'databaseURL': self.database_url
+                })
+                print("🔥 Firebase 연결 성공!")
+            else:
+                print("🔥 Firebase 이미 연결됨")
+        except Exception as e:
+            print(f"❌ Firebase 초기화 오류: {e}")
+            print("⚠️ firebase_key.json 파일과 database_url을 확인해주세요.")
+
+    def _start_session(self, tag=None):
+        """새로운 대화 세션 시작"""
+        try:
+            # 세션 ID 생성 (타임스탬프로 시작해서 키 순서 = 시간 순서)
+            # 같은 초에 열린 세션(빠른 재시작 등)이 INSERT OR IGNORE로 합쳐지지 않도록 무작위 접미사를 붙인다
+            suffix = uuid.uuid4().hex[:8] if tag is None else f"{tag}-{uuid.uuid4().hex[:8]}"
+            self.session_id = f"{int(time.time())}-{suffix}"
+            self.outbox.start_session(self.session_id, time.strftime("%Y-%m-%d %H:%M:%S"), MODEL_ID)
+            self._wake.set()
+            print(f"💾 세션 시작됨: ID {self.session_id} (로컬 기록 후 Firebase 동기화)")
+        except Exception as e:
+            print(f"❌ 세션 시작 오류: {e}")
+
+    def _new_key(self):
+        """메시지 키를 로컬에서 생성 (시간순 정렬 가능, push()의 왕복 없이 - 재전송해도 같은 키)
+        시각(ms) + 같은 ms 안의 순번 + 프로세스(로거)별 무작위 값 - 앞부분만으로 시간 순서가 유지된다"""
+        if self.parent is not None:
+            # 세션 로거끼리도 키가 겹치지 않도록 부모의 생성기 하나로 만든다
+            return self.parent._new_key()
+        with self._key_lock:
+            now_ms = int(time.time() * 1000)
+            if now_ms == self._last_key_ms:
+                self._key_counter += 1
+            else:
+                self._last_key_ms, self._key_counter = now_ms, 0
+            return f"{now_ms:013d}{self._key_counter:03d}{self._key_node}"
+
+    def _add_message(self, sender, text):
+        try:
+            if self.session_id:
+                self.outbox.add_message(self.session_id, self._new_key(), sender, text,
+                                        time.strftime("%Y-%m-%d %H:%M:%S"))
+                self._wake.set()
+        except Exception as e:
+            print(f"\n⚠️ 로컬 저장 실패 ({sender}): {e}")
+
+    def _sync_once(self):
+        """안 올라간 행을 한 묶음 올린다. 올릴 게 남아 있으면 True"""
+        groups = self.outbox.pending(self.batch_size)
+        for session_key, updates, session_rows, message_rows in groups:
+            started = time.perf_counter()
+            try:
+                db.reference(f'sessions/{session_key}').update(updates)
+            except Exception:
+                FIREBASE_WRITE_FAILURES.inc()
+                raise
+            FIREBASE_WRITE_MS.observe((time.perf_counter() - started) * 1000)
+            self.outbox.mark_synced(session_rows, message_rows)
+            self.batches_written += 1
+            self.items_written += len(session_rows) + len(message_rows)
+        # pending()의 LIMIT은 세션 / 메시지 조회 전체에 걸리므로 세션별이 아니라 합계로 판단한다
+        # (여러 세션에 흩어진 밀린 행도 간격을 기다리지 않고 이어서 올림)
+        session_total = sum(len(s) for _, _, s, _ in groups)
+        message_total = sum(len(m) for _, _, _, m in groups)
+        return session_total >= self.batch_size or message_total >= self.batch_size
+
+    def _sync_loop(self):
+        self._init_firebase()
+        delay = self.retry_base_delay
+        while True:
+            self._wake.wait(timeout=self.retry_max_delay)
+            if not self._closed:
+                # 잠깐 더 모았다가 한 번에 보낸다
+                time.sleep(self.flush_interval)
+            self._wake.clear()
+            try:
+                while self._sync_once():
+                    pass
+                delay = self.retry_base_delay
+            except Exception as e:
+                # 실패한 행은 아웃박스에 그대로 남아 있으므로 백오프 후 다시 시도
+                self.sync_failures += 1
+                if self._closed:
+                    return
+                print(f"\n⚠️ Firebase 동기화 실패 ({delay:.1f}초 후 재시도): {e}")
+                time.sleep(delay * (0.5 + random.random()))
+                delay = min(delay * 2, self.retry_max_delay)
+                self._wake.set()
+                continue
+            if self._closed:
+                return
+
+    def append_text(self, text):
+        self.buffer.append(text)
+
+    def log_user_message(self, text):
+        """사용자 메시지 저장"""
+        self._add_message('user', text)
+
+    def flush_model_turn(self):
+        """모델 응답 저장"""
+        if not self.buffer: return
+        
+        full_text = "".join(self.buffer)
+        self._add_message('gemini', full_text)
+        self.buffer = []
+    
+    def save_feedback(self, score):
+        """피드백 저장"""
+        try:
+            if self.session_id:
+                self.outbox.set_feedback(self.session_id, score)
+                self._wake.set()
+                print("✅ 피드백 저장 완료!")
+        except Exception as e:
+            print(f"❌ 피드백 저장 오류: {e}")
+
+    def open_session(self, tag):
+        """
+        같은 아웃박스 / 동기화 스레드 / 메시지 키 생성기를 쓰는 세션 로거를 하나 더 만든다.
+        (게이트웨이에서 클라이언트마다 세션을 따로 기록할 때 사용 - 스레드/DB 연결이 늘지 않음)
+        """
+        return ClientSessionLogger(parent=self, tag=tag)
+
+    def close(self, timeout=10.0):
+        """남은 로그를 올려보고 동기화 스레드 종료 (못 올린 것은 다음 실행 때 올라감)"""
+        self.flush_model_turn()
+        self._closed = True
+        self._wake.set()
+        self._syncer.join(timeout=timeout)
+        left = self.outbox.pending_count()
+        print(f"💾 Firebase 동기화: {self.items_written}건 ({self.batches_written}회 전송), 대기 {left}건")
+        if not self._syncer.is_alive():
+            self.outbox.close()
+
+class ClientSessionLogger(DatabaseLogger):
+    """DatabaseLogger.open_session()이 만드는 세션별 로거 - 기록 방식은 같고, 동기화는 부모가 맡는다"""
+
+    def __init__(self, parent, tag):
+        super().__init__(parent=parent, tag=tag)
+
+    def close(self, timeout=None):
+        self.flush_model_turn()
+        self._wake.set()
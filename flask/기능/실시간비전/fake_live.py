@@ -0,0 +1,83 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+# ==========================================
+# [클래스] 가짜 Live 세션 (네트워크 없이 이벤트 처리 확인용)
+# ==========================================
+# client.aio.live.connect()가 돌려주는 세션과 같은 모양의 메서드만 흉내 낸다.
+# - send_realtime_input / send_client_content / send_tool_response: 보낸 내용을 기록
+# - receive(): 미리 넣어둔 응답을 차례로 돌려줌 (턴이 끝나면 generator 종료 - 실제 SDK와 동일)
+
+
+def server_content(input_text=None, output_text=None, audio=None, text=None,
+                   turn_complete=False, interrupted=False, input_finished=False):
+    """응답(response) 객체 하나를 만든다. 속성 이름은 google.genai.types.LiveServerMessage와 같다."""
+    parts = []
+    if audio is not None:
+        parts.append(SimpleNamespace(inline_data=SimpleNamespace(data=audio, mime_type="audio/pcm;rate=24000"), text=None))
+    if text is not None:
+        parts.append(SimpleNamespace(inline_data=None, text=text))
+    content = SimpleNamespace(
+        model_turn=SimpleNamespace(parts=parts) if parts else None,
+        input_transcription=SimpleNamespace(text=input_text, finished=input_finished) if input_text else None,
+        output_transcription=SimpleNamespace(text=output_text, finished=False) if output_text else None,
+        turn_complete=turn_complete,
+        interrupted=interrupted,
+    )
+    return SimpleNamespace(server_content=content, tool_call=None, session_resumption_update=None,
+                           go_away=None, usage_metadata=None)
+
+
+def tool_call(name, args, call_id="call-1"):
+    """함수 호출(tool_call) 응답 하나를 만든다 (server_content는 없음)"""
+    call = SimpleNamespace(id=call_id, name=name, args=args)
+    return SimpleNamespace(server_content=None, tool_call=SimpleNamespace(function_calls=[call]),
+                           session_resumption_update=None, go_away=None, usage_metadata=None)
+
+
+class FakeLiveSession:
+    def __init__(self, turns=None):
+        self._turns = asyncio.Queue()
+        for turn in turns or []:
+            self._turns.put_nowait(list(turn))
+        self.sent = []          # (시각, 종류, 내용) 기록
+        self.closed = False
+
+    def add_turn(self, responses):
+        """응답 목록 하나(= 턴 하나)를 추가"""
+        self._turns.put_nowait(list(responses))
+
+    def _record(self, kind, payload):
+        self.sent.append((time.monotonic(), kind, payload))
+
+    async def send_realtime_input(self, **kwargs):
+        if self.closed:
+            raise ConnectionError("세션이 닫혔습니다")
+        for kind, payload in kwargs.items():
+            self._record(kind, payload)
+
+    async def send_client_content(self, **kwargs):
+        self._record("client_content", kwargs)
+
+    async def send_tool_response(self, **kwargs):
+        self._record("tool_response", kwargs)
+
+    async def receive(self):
+        responses = await self._turns.get()
+        for response in responses:
+            delay = getattr(response, "delay", 0)
+            if delay:
+                await asyncio.sleep(delay)
+            yield response
+
+    def count(self, kind):
+        return sum(1 for _, k, _ in self.sent if k == kind)
+
+    def bytes_sent(self, kind):
+        total = 0
+        for _, k, payload in self.sent:
+            if k == kind:
+                data = getattr(payload, "data", payload)
+                total += len(data) if isinstance(data, (bytes, bytearray)) else 0
+        return total
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from metrics import VIDEO_ENCODE_MS
+
+# ==========================================
+# [클래스] JPEG 인코더 워커 (이벤트 루프 밖에서 resize + imencode)
+# ==========================================
+# cv2.resize / cv2.imencode가 asyncio 루프 위에서 돌면 오디오 송수신 코루틴이 그만큼 밀린다.
+# 전용 스레드가 최신 프레임 1장만 받아서(latest-wins) 인코딩하고,
+# 이벤트 루프에는 완성된 bytes만 크기 제한이 있는 asyncio.Queue로 넘긴다.
+# (OpenCV는 연산 중 GIL을 풀기 때문에 스레드 하나로도 루프와 겹쳐서 돈다)
+
+EncodedFrame = namedtuple(
+    "EncodedFrame",
+    ["data", "size", "quality", "encode_ms", "submitted_at", "encoded_at", "tag"],
+)
+
+
+class FrameEncoder:
+    def __init__(self, loop=None, max_pending=2):
+        self._loop = loop or asyncio.get_running_loop()
+        self.output = asyncio.Queue(maxsize=max_pending)
+
+        self._cond = threading.Condition()
+        self._pending = None      # (frame, size, quality, submitted_at, tag) - 최신 요청 하나만 유지
+        self._running = True
+        self._resize_buffers = {}  # (w, h, 채널 수) -> 미리 잡아둔 resize 결과 버퍼
+
+        # 통계
+        self.encoded = 0
+        self.dropped_before_encode = 0   # 인코딩 전에 더 새 프레임이 와서 버려진 수
+        self.dropped_after_encode = 0    # 전송이 밀려서 큐에서 버려진 수
+        self.last_encode_ms = 0.0
+        self.avg_encode_ms = 0.0
+        self.max_encode_ms = 0.0
+
+        self.thread = threading.Thread(target=self._run, name="frame-encoder", daemon=True)
+        self.thread.start()
+
+    def submit(self, frame, size, quality, tag=None):
+        """인코딩 요청 (논블로킹). 아직 처리 안 된 이전 요청은 버린다."""
+        with self._cond:
+            if self._pending is not None:
+                self.dropped_before_encode += 1
+            self._pending = (frame, tuple(size), int(quality), time.monotonic(), tag)
+            self._cond.notify()
+
+    async def get(self):
+        """완성된 EncodedFrame 하나를 기다렸다가 반환"""
+        return await self.output.get()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.thread.join(timeout=1.0)
+
+    def _buffer_for(self, size, frame):
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        key = (size[0], size[1], channels)
+        buf = self._resize_buffers.get(key)
+        if buf is None:
+            shape = (size[1], size[0], channels) if channels > 1 else (size[1], size[0])
+            buf = np.empty(shape, dtype=frame.dtype)
+            self._resize_buffers[key] = buf
+        return buf
+
+    def _encode(self, frame, size, quality):
+        if (frame.shape[1], frame.shape[0]) == size:
+            resized = frame
+        else:
+            resized = cv2.resize(frame, size, dst=self._buffer_for(size, frame))
+        ok, buffer = cv2.imencode('.jpg', resized, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        return buffer.tobytes() if ok else None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                frame, size, quality, submitted_at, tag = self._pending
+                self._pending = None
+
+            started = time.perf_counter()
+            try:
+                data = self._encode(frame, size, quality)
+            except Exception as e:
+                print(f"프레임 인코딩 오류 (무시됨): {e}")
+                continue
+            if data is None:
+                continue
+            encode_ms = (time.perf_counter() - started) * 1000
+
+            self.encoded += 1
+            self.last_encode_ms = encode_ms
+            VIDEO_ENCODE_MS.observe(encode_ms)
+            self.max_encode_ms = max(self.max_encode_ms, encode_ms)
+            self.avg_encode_ms += (encode_ms - self.avg_encode_ms) / self.encoded
+
+            item = EncodedFrame(data, size, quality, encode_ms, submitted_at, time.monotonic(), tag)
+            try:
+                self._loop.call_soon_threadsafe(self._deliver, item)
+            except RuntimeError:
+                # 이벤트 루프가 이미 닫힘 (종료 중)
+                return
+
+    def _deliver(self, item):
+        """이벤트 루프 스레드에서 실행됨: 큐가 가득 차면 가장 오래된 프레임을 버린다"""
+        if self.output.full():
+            self.output.get_nowait()
+            self.dropped_after_encode += 1
+        self.output.put_nowait(item)
+
+    def summary(self):
+        return (f"인코딩 {self.encoded}장, 평균 {self.avg_encode_ms:.1f}ms / 최대 {self.max_encode_ms:.1f}ms, "
+                f"폐기 {self.dropped_before_encode}(인코딩 전) + {self.dropped_after_encode}(전송 대기)")
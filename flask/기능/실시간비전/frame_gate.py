@@ -0,0 +1,71 @@
+import time
+
+import cv2
+import numpy as np
+
+# ==========================================
+# [클래스] 장면 변화 감지 게이트 (전송할 프레임 고르기)
+# ==========================================
+# 카메라가 같은 세탁기 조작부를 계속 비추고 있으면 매 프레임이 거의 똑같다.
+# 축소한 흑백 썸네일끼리 비교해서, 장면이 바뀌었을 때만 즉시 전송(keyframe)하고
+# 그 외에는 낮은 주기의 하트비트만 보낸다.
+
+
+class SceneChangeGate:
+    def __init__(self, diff_threshold=6.0, heartbeat_interval=5.0, thumb_size=(32, 18)):
+        self.diff_threshold = diff_threshold          # 평균 픽셀 차이(0~255) 기준
+        self.heartbeat_interval = heartbeat_interval  # 변화가 없어도 이 간격마다 1장 전송 (초)
+        self.thumb_size = thumb_size                  # 비교용 썸네일 크기 (16:9 유지)
+
+        self._last_thumb = None   # 마지막으로 '전송한' 프레임의 썸네일
+        self._last_sent_at = 0.0
+
+        # 통계
+        self.sent_keyframes = 0
+        self.sent_heartbeats = 0
+        self.skipped = 0
+        self.last_diff = 0.0
+
+    def _thumbnail(self, frame):
+        """축소 + 흑백 변환 (INTER_AREA로 노이즈도 같이 평균됨)"""
+        small = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.int16)
+
+    def check(self, frame, now=None):
+        """
+        프레임을 보낼지 판단한다.
+        반환값: (전송 여부, 사유) - 사유는 'keyframe' / 'heartbeat' / 'skip'
+        """
+        now = time.monotonic() if now is None else now
+        thumb = self._thumbnail(frame)
+
+        if self._last_thumb is None:
+            reason = "keyframe"
+            self.last_diff = float("inf")
+        else:
+            # 자동 노출 변화로 전체 밝기만 바뀐 경우는 무시하도록 평균 밝기 차이를 빼고 비교
+            delta = thumb - self._last_thumb
+            delta -= int(delta.mean())
+            self.last_diff = float(np.abs(delta).mean())
+
+            if self.last_diff >= self.diff_threshold:
+                reason = "keyframe"
+            elif now - self._last_sent_at >= self.heartbeat_interval:
+                reason = "heartbeat"
+            else:
+                self.skipped += 1
+                return False, "skip"
+
+        self._last_thumb = thumb
+        self._last_sent_at = now
+        if reason == "keyframe":
+            self.sent_keyframes += 1
+        else:
+            self.sent_heartbeats += 1
+        return True, reason
+
+    def reset(self):
+        """다음 프레임을 무조건 keyframe으로 보내도록 초기화"""
+        self._last_thumb = None
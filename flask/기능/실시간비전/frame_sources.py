@@ -0,0 +1,186 @@
+import os
+import pathlib
+import time
+
+import cv2
+import numpy as np
+
+# ==========================================
+# [클래스] 프레임 소스 (웹캠 / 동영상 파일 / RTSP·HTTP 스트림 / 이미지 폴더 / 합성)
+# ==========================================
+# 캡처 프로세스(shm_capture)는 소스가 무엇이든 read(target)로 한 장씩 받아 공유 메모리에 쓴다.
+# 서버 박스처럼 카메라가 없는 곳에서도 파일 / 스트림 / 합성 프레임으로 같은 파이프라인을 돌릴 수 있다.
+#
+# 소스 문자열 (--source / VISION_SOURCE):
+#   "0", "1"                  웹캠 장치 번호
+#   "rtsp://...", "http://..."  네트워크 스트림
+#   "경로/영상.mp4"            동영상 파일 (끝나면 처음부터 반복)
+#   "경로/폴더"                이미지 폴더 (이름순, 반복)
+#   "synthetic[:시드]"         합성 프레임 (같은 시드면 항상 같은 프레임 - 벤치마크용)
+#
+# 인터페이스: read(target=None) -> (성공 여부, 프레임)   release()
+# 파일 / 폴더 / 합성은 스스로 fps에 맞춰 속도를 조절한다 (realtime=False면 최대 속도).
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+class _Pacer:
+    """fps 간격으로 read()를 맞춘다 (밀리면 따라잡지 않고 기준을 옮김)"""
+
+    def __init__(self, fps, realtime=True):
+        self.interval = 1.0 / fps if fps and realtime else 0.0
+        self._next = None
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self._next is None or now - self._next > self.interval:
+            self._next = now
+        elif self._next > now:
+            time.sleep(self._next - now)
+        self._next += self.interval
+
+
+class VideoCaptureSource:
+    """cv2.VideoCapture를 그대로 쓰는 소스 (웹캠 / 스트림 / 동영상 파일)"""
+
+    def __init__(self, target, width=None, height=None, loop=False, realtime=False):
+        self.target = target
+        self.loop = loop
+        self.cap = cv2.VideoCapture(target)
+        if width and height and isinstance(target, int):
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0
+        # 파일은 디코딩이 실제 속도보다 빠르므로 원래 fps로 맞춘다 (웹캠/스트림은 장치가 속도를 정함)
+        self._pacer = _Pacer(fps if 0 < fps <= 120 else 30, realtime=realtime)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, target=None):
+        self._pacer.wait()
+        ret, frame = self.cap.read(target)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(target)
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirSource:
+    """폴더의 이미지를 이름순으로 fps에 맞춰 돌려준다"""
+
+    def __init__(self, directory, fps=5.0, loop=True, realtime=True):
+        self.paths = sorted(p for p in pathlib.Path(directory).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        self.loop = loop
+        self._index = 0
+        self._cache = {}    # 작은 폴더는 디코딩 결과를 보관 (반복 재생 시 다시 읽지 않음)
+        self._pacer = _Pacer(fps, realtime=realtime)
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self, target=None):
+        if self._index >= len(self.paths):
+            if not self.loop or not self.paths:
+                return False, None
+            self._index = 0
+        path = self.paths[self._index]
+        self._index += 1
+        frame = self._cache.get(path)
+        if frame is None:
+            frame = cv2.imread(str(path))
+            if frame is None:
+                return False, None
+            if len(self.paths) <= 64:
+                self._cache[path] = frame
+        self._pacer.wait()
+        return True, frame
+
+    def release(self):
+        self._cache.clear()
+
+
+class SyntheticSource:
+    """
+    카메라 없이 쓰는 합성 프레임. 배경 그라데이션 위로 사각형(조작부 흉내)이 천천히 움직이고,
+    일정 간격마다 장면이 바뀐다 (장면 변화 게이트 / ROI가 실제처럼 동작하도록).
+    같은 seed면 n번째 프레임은 항상 같다.
+    """
+
+    def __init__(self, width=1280, height=720, fps=30.0, seed=0, scene_seconds=4.0, realtime=True):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.seed = seed
+        self.scene_frames = max(1, int(scene_seconds * fps))
+        self.index = 0
+        self._pacer = _Pacer(fps, realtime=realtime)
+
+        ramp = np.linspace(40, 120, width, dtype=np.uint8)
+        self._background = np.empty((height, width, 3), dtype=np.uint8)
+        self._background[:] = ramp[None, :, None]
+
+    def isOpened(self):
+        return True
+
+    def render(self, index):
+        scene = index // self.scene_frames
+        rng = np.random.default_rng(self.seed * 100003 + scene)
+        color = tuple(int(c) for c in rng.integers(60, 255, size=3))
+        box_w, box_h = self.width // 3, self.height // 3
+        phase = (index % self.scene_frames) / self.scene_frames
+        x = int(rng.integers(0, self.width - box_w) * (1 - phase) + (self.width - box_w) // 2 * phase)
+        y = int(rng.integers(0, self.height - box_h))
+        return color, (x, y, box_w, box_h), scene
+
+    def read(self, target=None):
+        self._pacer.wait()
+        frame = target if target is not None and target.shape == self._background.shape else None
+        if frame is None:
+            frame = np.empty_like(self._background)
+        np.copyto(frame, self._background)
+        color, (x, y, w, h), scene = self.render(self.index)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, thickness=-1)
+        cv2.putText(frame, f"scene {scene}", (x + 20, y + 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def open_source(spec, width=1280, height=720, fps=None, loop=True, realtime=True):
+    """소스 문자열(또는 장치 번호)로 프레임 소스를 연다 (캡처 프로세스 안에서 호출)"""
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return VideoCaptureSource(int(spec), width, height)
+
+    text = str(spec)
+    if text.startswith("synthetic"):
+        seed = int(text.split(":", 1)[1]) if ":" in text else 0
+        return SyntheticSource(width, height, fps=fps or 30.0, seed=seed, realtime=realtime)
+    if "://" in text:
+        # RTSP는 TCP로 받는 편이 패킷 손실에 덜 깨진다 (FFmpeg 백엔드 옵션)
+        if text.startswith("rtsp://"):
+            os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", "rtsp_transport;tcp")
+        return VideoCaptureSource(text)
+    if os.path.isdir(text):
+        return ImageDirSource(text, fps=fps or 5.0, loop=loop, realtime=realtime)
+    return VideoCaptureSource(text, loop=loop, realtime=realtime)
+
+
+def describe_source(spec):
+    text = str(spec)
+    if text.isdigit():
+        return f"웹캠 {text}"
+    if text.startswith("synthetic"):
+        return "합성 프레임"
+    if "://" in text:
+        return f"스트림 {text}"
+    if os.path.isdir(text):
+        return f"이미지 폴더 {text}"
+    return f"동영상 파일 {text}"
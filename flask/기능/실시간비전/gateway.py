@@ -0,0 +1,400 @@
+import asyncio
+import hmac
+import itertools
+import json
+import os
+import secrets
+import sys
+import time
+from collections import deque
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from google.genai import types
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from live_pipeline import answer_tool_call
+from live_session import ReconnectingSession
+from live_transcript import TranscriptRouter
+from metrics import (AUDIO_BYTES_SENT, AUDIO_CHUNKS_SENT, GATEWAY_CONNECT_MS, GATEWAY_DOWNLINK_DROPPED,
+                     GATEWAY_REJECTED, GATEWAY_UPLINK_DROPPED, REGISTRY, VIDEO_BYTES_SENT, VIDEO_FRAMES_SENT)
+
+# ==========================================
+# [서버] 여러 클라이언트용 Live 게이트웨이 (WebSocket)
+# ==========================================
+# vision.py는 이 컴퓨터의 카메라/마이크로 세션 하나만 돌린다. 태블릿 같은 얇은 클라이언트 여러 대를
+# 한 서버에서 받기 위해, 클라이언트마다 WebSocket 연결 하나 = Gemini Live 세션 하나로 중계한다.
+# genai.Client 하나를 모두 같이 쓰고, 설정(페르소나)은 live_config.get_config(), 로그는 DatabaseLogger를 그대로 쓴다.
+#
+# 접속: ws://호스트:포트/?token=<토큰> 또는 Authorization: Bearer <토큰> 헤더 (틀리면 핸드셰이크에서 401)
+# 프로토콜 (클라이언트 -> 게이트웨이)
+#   binary: 첫 바이트 0x01 + PCM16 16kHz mono (오디오) / 0x02 + JPEG (카메라 프레임)
+#   text  : {"type": "audio_end"}  - 말이 끝남 (클라이언트 쪽 VAD를 쓰는 경우)
+#           {"type": "feedback", "score": 0|1}
+# 프로토콜 (게이트웨이 -> 클라이언트)
+#   binary: 0x01 + PCM16 24kHz mono (모델 음성)
+#   text  : {"type": "ready"} / {"type": "user_text"|"model_text", "text": ...}
+#           {"type": "turn_complete"} / {"type": "interrupted"} / {"type": "busy"}
+#
+# 함수 도구 (search_manual): 설정에 tools가 있으면 모델의 tool_call을 게이트웨이가 직접 처리한다.
+# 클라이언트마다 make_tools()로 도구를 새로 만들어 (세션별 검색 캐시) LivePipeline과 같은 경로로 답한다.
+#
+# 부하 제어
+# - 동시 세션 수 상한 (넘으면 busy 보내고 1013으로 닫음), 동시에 진행하는 Live 연결(핸드셰이크) 수 상한
+# - 업링크: 오디오는 클라이언트별 대기열(넘치면 오래된 것부터 버림), 프레임은 최신 한 장 + 최소 간격
+# - 다운링크: 클라이언트가 못 따라오면 쌓인 모델 오디오 중 오래된 것부터 버림 (Live 수신은 막지 않음)
+
+AUDIO_IN = 0x01
+FRAME_IN = 0x02
+AUDIO_OUT = 0x01
+
+
+class _LimitedConnect:
+    """Live 연결(핸드셰이크)을 동시에 몇 개까지만 진행하도록 세마포어로 감싼다"""
+
+    def __init__(self, cm, slots):
+        self._cm = cm
+        self._slots = slots
+
+    async def __aenter__(self):
+        async with self._slots:
+            return await self._cm.__aenter__()
+
+    async def __aexit__(self, *exc):
+        return await self._cm.__aexit__(*exc)
+
+
+class _NoLogger:
+    """로거 없이 돌릴 때 (부하 측정 등) TranscriptRouter에 넘길 빈 로거"""
+
+    def append_text(self, text):
+        pass
+
+    def log_user_message(self, text):
+        pass
+
+
+class ClientConnection:
+    def __init__(self, gateway, ws, client_id):
+        self.gateway = gateway
+        self.ws = ws
+        self.client_id = client_id
+        self.logger = gateway.root_logger.open_session(client_id) if gateway.root_logger is not None else None
+        self.tools = gateway.make_tools() if gateway.make_tools is not None else {}
+
+        # 업링크 (클라이언트 -> Live)
+        self._audio = asyncio.Queue(maxsize=gateway.max_uplink_chunks)
+        self._frame = None                 # 최신 JPEG 한 장
+        self._frame_ready = asyncio.Event()
+        self._last_frame_at = 0.0
+
+        # 다운링크 (Live -> 클라이언트): 텍스트 이벤트는 항상, 오디오는 max_downlink_bytes까지
+        self._out = deque()
+        self._out_audio_bytes = 0
+        self._out_ready = asyncio.Event()
+
+        # 통계
+        self.audio_in = 0
+        self.frames_in = 0
+        self.uplink_dropped = 0
+        self.downlink_dropped = 0
+        self.turns = 0
+
+    # ---------- 다운링크 대기열 ----------
+
+    def _push(self, item):
+        self._out.append(item)
+        if isinstance(item, bytes):
+            self._out_audio_bytes += len(item)
+            while self._out_audio_bytes > self.gateway.max_downlink_bytes:
+                if not self._drop_oldest_audio():
+                    break
+        self._out_ready.set()
+
+    def _drop_oldest_audio(self):
+        for i, item in enumerate(self._out):
+            if isinstance(item, bytes):
+                del self._out[i]
+                self._out_audio_bytes -= len(item)
+                self.downlink_dropped += 1
+                GATEWAY_DOWNLINK_DROPPED.inc()
+                return True
+        return False
+
+    def _clear_audio(self):
+        self._out = deque(item for item in self._out if not isinstance(item, bytes))
+        self._out_audio_bytes = 0
+
+    def _push_event(self, kind, **fields):
+        fields["type"] = kind
+        self._push(json.dumps(fields, ensure_ascii=False))
+
+    # ---------- 태스크 ----------
+
+    async def _read_client(self, session):
+        """클라이언트 메시지를 받아 대기열에 넣는다 (Live 전송은 _send_audio / _send_frames가 맡음)"""
+        async for message in self.ws:
+            if isinstance(message, bytes):
+                if not message:
+                    continue
+                kind, payload = message[0], message[1:]
+                if kind == AUDIO_IN:
+                    self.audio_in += 1
+                    if self._audio.full():
+                        self._audio.get_nowait()      # 밀리면 오래된 오디오부터 버림
+                        self.uplink_dropped += 1
+                        GATEWAY_UPLINK_DROPPED.inc()
+                    self._audio.put_nowait(("audio", payload))
+                elif kind == FRAME_IN:
+                    self.frames_in += 1
+                    now = time.monotonic()
+                    if now - self._last_frame_at < self.gateway.min_frame_interval:
+                        self.uplink_dropped += 1
+                        GATEWAY_UPLINK_DROPPED.inc()
+                        continue
+                    self._last_frame_at = now
+                    if self._frame is not None:
+                        self.uplink_dropped += 1
+                        GATEWAY_UPLINK_DROPPED.inc()
+                    self._frame = payload
+                    self._frame_ready.set()
+                continue
+
+            try:
+                control = json.loads(message)
+            except ValueError:
+                continue
+            if control.get("type") == "audio_end":
+                if self._audio.full():
+                    self._audio.get_nowait()
+                self._audio.put_nowait(("end", None))
+            elif control.get("type") == "feedback" and self.logger is not None:
+                self.logger.save_feedback(1 if control.get("score") else 0)
+
+    async def _send_audio(self, session):
+        while True:
+            kind, payload = await self._audio.get()
+            if kind == "end":
+                await session.send_realtime_input(audio_stream_end=True)
+                continue
+            await session.send_realtime_input(
+                audio=types.Blob(data=payload, mime_type="audio/pcm;rate=16000"))
+            AUDIO_CHUNKS_SENT.inc()
+            AUDIO_BYTES_SENT.inc(len(payload))
+
+    async def _send_frames(self, session):
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            payload, self._frame = self._frame, None
+            if payload is None:
+                continue
+            await session.send_realtime_input(video=types.Blob(data=payload, mime_type="image/jpeg"))
+            VIDEO_FRAMES_SENT.inc()
+            VIDEO_BYTES_SENT.inc(len(payload))
+
+    async def _receive_live(self, session, transcripts):
+        while True:
+            async for response in session.receive():
+                if getattr(response, "tool_call", None) is not None:
+                    # 답을 보내기 전까지 모델은 턴을 멈추고 기다린다
+                    await answer_tool_call(session, self.tools, response.tool_call)
+                sc = response.server_content
+                if not sc:
+                    continue
+                transcripts.handle(sc)
+                output_tr = getattr(sc, "output_transcription", None)
+                if output_tr is not None and getattr(output_tr, "text", None):
+                    self._push_event("model_text", text=output_tr.text)
+                if sc.model_turn:
+                    for part in sc.model_turn.parts:
+                        if part.inline_data:
+                            self._push(bytes([AUDIO_OUT]) + part.inline_data.data)
+                if getattr(sc, "interrupted", False):
+                    # 클라이언트가 재생 중인 답변을 버리도록 알리고, 아직 안 보낸 오디오도 버림
+                    self._clear_audio()
+                    self._push_event("interrupted")
+                if getattr(sc, "turn_complete", False):
+                    self.turns += 1
+                    transcripts.turn_complete()
+                    if self.logger is not None:
+                        self.logger.flush_model_turn()
+                    self._push_event("turn_complete")
+
+    async def _write_client(self):
+        """다운링크 대기열을 클라이언트로 보낸다 (ws.send가 느린 클라이언트에서 기다림 = 자연스러운 역압)"""
+        while True:
+            while not self._out:
+                self._out_ready.clear()
+                await self._out_ready.wait()
+            item = self._out.popleft()
+            if isinstance(item, bytes):
+                self._out_audio_bytes -= len(item)
+            await self.ws.send(item)
+
+    async def run(self):
+        started = time.monotonic()
+        transcripts = TranscriptRouter(self.logger or _NoLogger(), echo=False,
+                                       on_user_text=lambda text: self._push_event("user_text", text=text))
+
+        async with ReconnectingSession(self.gateway.connect_live) as session:
+            GATEWAY_CONNECT_MS.observe((time.monotonic() - started) * 1000)
+            self._push_event("ready")
+            tasks = [
+                asyncio.create_task(self._read_client(session)),
+                asyncio.create_task(self._send_audio(session)),
+                asyncio.create_task(self._send_frames(session)),
+                asyncio.create_task(self._receive_live(session, transcripts)),
+                asyncio.create_task(self._write_client()),
+            ]
+            try:
+                # 클라이언트가 끊으면(_read_client 종료) 나머지도 정리
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if self.logger is not None:
+                    self.logger.close()
+
+    def summary(self):
+        return (f"{self.client_id}: 오디오 {self.audio_in}, 프레임 {self.frames_in}, 턴 {self.turns}, "
+                f"업링크 버림 {self.uplink_dropped}, 다운링크 버림 {self.downlink_dropped}")
+
+
+class LiveGateway:
+    def __init__(self, connect, root_logger=None, max_sessions=32, max_connecting=4,
+                 max_uplink_chunks=50, min_frame_interval=0.25, max_downlink_seconds=30.0,
+                 output_rate=24000, make_tools=None, token=None):
+        self._connect = connect                 # handle -> async context manager (client.aio.live.connect)
+        self.token = token                      # 접속 토큰 (None이면 확인하지 않음 - 로컬 테스트용)
+        self.make_tools = make_tools            # () -> 도구 이름 -> 함수 (클라이언트마다 호출, 없으면 도구 없음)
+        self.root_logger = root_logger
+        self.max_sessions = max_sessions
+        self._sessions = asyncio.Semaphore(max_sessions)
+        self._connecting = asyncio.Semaphore(max_connecting)
+        self.max_uplink_chunks = max_uplink_chunks      # 100ms 묶음 기준 50개 = 5초
+        self.min_frame_interval = min_frame_interval
+        self.max_downlink_bytes = int(max_downlink_seconds * output_rate * 2)
+        self._ids = itertools.count(1)
+        self.clients = {}
+
+        # 통계
+        self.accepted = 0
+        self.rejected = 0
+        self.unauthorized = 0
+
+        REGISTRY.gauge("vision_gateway_clients", "연결된 클라이언트 수", fn=lambda: len(self.clients))
+
+    def _authorize(self, connection, request):
+        """핸드셰이크 단계에서 토큰 확인 (websockets process_request 훅)"""
+        supplied = parse_qs(urlsplit(request.path).query).get("token", [""])[0]
+        header = request.headers.get("Authorization", "")
+        if header.startswith("Bearer "):
+            supplied = header[len("Bearer "):]
+        if hmac.compare_digest(supplied.encode(), self.token.encode()):
+            return None
+        self.unauthorized += 1
+        GATEWAY_REJECTED.inc()
+        return connection.respond(HTTPStatus.UNAUTHORIZED, "invalid token\n")
+
+    def connect_live(self, handle):
+        return _LimitedConnect(self._connect(handle), self._connecting)
+
+    async def handle(self, ws):
+        if self._sessions.locked():
+            self.rejected += 1
+            GATEWAY_REJECTED.inc()
+            await ws.send(json.dumps({"type": "busy"}))
+            await ws.close(code=1013, reason="too many sessions")
+            return
+
+        async with self._sessions:
+            client_id = f"c{next(self._ids)}"
+            client = ClientConnection(self, ws, client_id)
+            self.clients[client_id] = client
+            self.accepted += 1
+            print(f"🔌 클라이언트 접속: {client_id} ({len(self.clients)}/{self.max_sessions})")
+            try:
+                await client.run()
+            except ConnectionClosed:
+                pass
+            except Exception as e:
+                print(f"❌ {client_id} 세션 오류: {e}")
+            finally:
+                del self.clients[client_id]
+                print(f"🔌 클라이언트 종료: {client.summary()}")
+
+    async def serve(self, host="127.0.0.1", port=8765, ready=None):
+        # max_size: JPEG 한 장 크기 상한, max_queue: 처리 전 쌓아둘 수신 메시지 수 (넘으면 TCP 수준에서 밀림)
+        process_request = self._authorize if self.token is not None else None
+        async with serve(self.handle, host, port, max_size=2 ** 21, max_queue=64,
+                         process_request=process_request) as server:
+            print(f"🌐 Live 게이트웨이 대기 중: ws://{host}:{port} (동시 세션 {self.max_sessions}개)")
+            if ready is not None:
+                ready.set()
+            await server.serve_forever()
+
+
+# ==========================================
+# [메인] 실제 Gemini Live 세션으로 중계
+# ==========================================
+
+GATEWAY_HOST = os.getenv("VISION_GATEWAY_HOST", "127.0.0.1")   # 태블릿 등 다른 기기에서 붙을 때만 0.0.0.0
+GATEWAY_PORT = 8765
+GATEWAY_TOKEN = os.getenv("VISION_GATEWAY_TOKEN")   # 접속 토큰 (없으면 실행할 때마다 새로 만들어 출력)
+GATEWAY_MAX_SESSIONS = 32        # 동시 세션 상한 (부하 측정 결과 참고: 테스트/게이트웨이부하확인.py)
+GATEWAY_MAX_CONNECTING = 4       # 동시에 진행하는 Live 연결 수
+
+
+async def main():
+    # Live 설정(.env / 모델 / 페르소나)은 vision.py와 같은 live_config.py를 쓴다 (카메라 / 마이크 설정은 필요 없음)
+    import live_config
+    from db_logger import DatabaseLogger
+    from google import genai
+
+    if not live_config.API_KEY:
+        print("❌ API 키가 없습니다. .env 파일을 확인해주세요.")
+        sys.exit(1)
+    token = GATEWAY_TOKEN
+    if not token:
+        token = secrets.token_urlsafe(16)
+        print(f"🔑 VISION_GATEWAY_TOKEN이 없어서 이번 실행용 토큰을 만들었습니다: {token}")
+
+    client = genai.Client(api_key=live_config.API_KEY)   # 모든 클라이언트가 같이 씀
+    config = live_config.get_config()
+
+    # 매뉴얼 색인은 모든 클라이언트가 같이 쓰고, 검색 캐시는 클라이언트별로 둔다
+    make_tools = None
+    if live_config.MANUAL_TOOL:
+        from manual_index import ManualIndex, ManualSearch, load_manual_sections
+        try:
+            index = ManualIndex(load_manual_sections(live_config.MANUAL_CACHE_PATH))
+            make_tools = lambda: ManualSearch(index).tools()
+        except Exception as e:
+            # 도구를 선언해 두고 답하지 못하면 턴이 멈추므로, 색인이 없으면 도구 선언을 뺀다
+            print(f"⚠️ 매뉴얼 색인 준비 실패 - search_manual 도구 없이 진행: {e}")
+            config = {k: v for k, v in config.items() if k != "tools"}
+
+    def connect(handle):
+        session_config = config
+        if live_config.LIVE_SESSION_RESUMPTION:
+            session_config = dict(config, session_resumption={"handle": handle})
+        return client.aio.live.connect(model=live_config.MODEL_ID, config=session_config)
+
+    root_logger = DatabaseLogger(start_session=False)
+    if live_config.METRICS_PORT:
+        REGISTRY.serve(live_config.METRICS_PORT, host=live_config.METRICS_HOST)
+    gateway = LiveGateway(connect, root_logger=root_logger, max_sessions=GATEWAY_MAX_SESSIONS,
+                          max_connecting=GATEWAY_MAX_CONNECTING, output_rate=live_config.OUTPUT_RATE,
+                          make_tools=make_tools, token=token)
+    try:
+        await gateway.serve(GATEWAY_HOST, GATEWAY_PORT)
+    finally:
+        root_logger.close()
+        REGISTRY.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
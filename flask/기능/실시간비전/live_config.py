@@ -0,0 +1,127 @@
+import os
+import pathlib
+
+from dotenv import load_dotenv
+
+from context_budget import FRAME_TOKENS, compression_window
+from manual_index import SEARCH_MANUAL_TOOL
+from persona import PersonaLibrary
+
+# ==========================================
+# [설정] Live 세션 공통 설정
+# ==========================================
+# vision.py(이 컴퓨터의 카메라/마이크)와 gateway.py(여러 클라이언트 중계)가 같이 쓰는 설정.
+# 게이트웨이가 vision.py를 통째로 import하지 않도록 (pyaudio / 카메라 / 화면 설정까지 딸려옴) 따로 둔다.
+
+def load_environment():
+    try:
+        current_dir = pathlib.Path(__file__).parent.absolute()
+        env_path = None
+        for parent in [current_dir] + list(current_dir.parents):
+            check_path = parent / ".env"
+            if check_path.exists():
+                env_path = check_path
+                break
+
+        if env_path:
+            load_dotenv(dotenv_path=env_path)
+        else:
+            print("⚠️ .env 파일을 찾을 수 없습니다.")
+    except Exception as e:
+        print(f"❌ .env 로드 오류: {e}")
+
+load_environment()
+
+LOCAL_DB_PATH = pathlib.Path(__file__).parent.absolute() / "chat_history.db"   # 로그 로컬 아웃박스
+
+API_KEY = os.getenv("GEMINI_API_KEY")   # 없으면 실행하는 쪽(vision.py / gateway.py)에서 종료
+
+
+MODEL_ID = "gemini-2.5-flash-native-audio-preview-09-2025"
+#MODEL_ID = "gemini-2.5-flash"
+#MODEL_ID = "gemini-2.5-flash-preview-09-2025"
+#MODEL_ID = "gemini-2.0-flash"
+#MODEL_ID = "gemini-2.0-flash-exp"
+
+# [오디오 형식]
+INPUT_RATE = 16000
+OUTPUT_RATE = 24000
+
+# [STT 설정]
+TRANSCRIPT_SOURCE = "live"       # "live": Live 세션의 자체 전사 사용 (오디오 1회 전송), "stt": 별도 Google STT로 한 번 더 인식
+
+# [지표 설정]
+METRICS_PORT = int(os.getenv("VISION_METRICS_PORT", "9108"))  # /metrics (Prometheus), /metrics.json - 0이면 끔
+METRICS_HOST = os.getenv("VISION_METRICS_HOST", "127.0.0.1")  # 지표 서버 주소 (원격 수집이 필요할 때만 0.0.0.0)
+
+# [컨텍스트 설정] 긴 세션에서 컨텍스트가 계속 커지며 느려지는 것을 막는다
+VIDEO_MIN_INTERVAL = 0.4         # 프레임 전송 후 최소 대기 (초, 2.5 FPS 상한)
+CONTEXT_COMPRESSION = True       # 슬라이딩 윈도 압축 (서버가 오래된 턴부터 잘라냄)
+CONTEXT_KEEP_SECONDS = 300       # 압축 후에도 창에 남길 최근 대화 길이 (초) - 방금 보여준 화면/설명을 잃지 않게
+CONTEXT_LIMIT_TOKENS = 128000    # 모델 컨텍스트 창 크기 (압축 시작점이 이보다 커지지 않게)
+VIDEO_MEDIA_RESOLUTION = None    # "MEDIA_RESOLUTION_LOW": 프레임당 64토큰 (기본 258) - 화면 디테일은 줄어듦
+VIDEO_MAX_CONTEXT_SHARE = 0.5    # 창 안에서 비디오가 이 비율을 넘으면 비디오 전송 간격을 늘림
+# 압축 시작 / 압축 후 남길 토큰 수: 전송 속도(오디오 + 비디오 상한)로 CONTEXT_KEEP_SECONDS를 환산
+# (고정 32k/16k는 2.5 FPS 비디오 + 오디오 기준 몇 분마다 압축되어 최근 화면 맥락까지 잘렸다)
+CONTEXT_TRIGGER_TOKENS, CONTEXT_TARGET_TOKENS = compression_window(
+    CONTEXT_KEEP_SECONDS,
+    frames_per_second=1 / VIDEO_MIN_INTERVAL,
+    frame_tokens=FRAME_TOKENS.get(VIDEO_MEDIA_RESOLUTION, 258),
+    max_video_share=VIDEO_MAX_CONTEXT_SHARE,
+    context_limit=CONTEXT_LIMIT_TOKENS,
+)
+
+# [페르소나 설정]
+PERSONA_DEFAULT = "세탁법"        # 시작 페르소나 (persona_<이름>.txt)
+
+# [재연결 설정]
+LIVE_SESSION_RESUMPTION = True   # 끊기면 세션 재개 핸들로 다시 연결 (대화 맥락 유지)
+
+# [매뉴얼 검색 설정]
+MANUAL_TOOL = True               # Live 세션에 search_manual 함수 도구 선언 (설명서 근거로 답변)
+MANUAL_CACHE_PATH = pathlib.Path(__file__).parent.absolute() / "manual_sections.json"  # Supabase에서 받은 조각 캐시
+
+# ==========================================
+# [함수] 설정 및 페르소나 로드
+# ==========================================
+
+def get_config(personas=None, persona=PERSONA_DEFAULT):
+    # 페르소나 파일은 PersonaLibrary가 한 번만 읽어서 보관 (전환/재연결 때 다시 읽지 않음)
+    personas = personas or PersonaLibrary()
+    system_instruction = personas.text(persona)
+
+    config = {
+        "response_modalities": ["AUDIO"],
+        "speech_config": {
+            "voice_config": {
+                "prebuilt_voice_config": {
+                    "voice_name": "Aoede"
+                }
+            }
+        },
+        "system_instruction": system_instruction
+    }
+
+    # 사용자/모델 음성의 글자 전사를 세션에서 같이 받는다 (DB 로그용)
+    if TRANSCRIPT_SOURCE == "live":
+        config["input_audio_transcription"] = {}
+        config["output_audio_transcription"] = {}
+
+    # 설명서 검색 도구: 모델이 tool_call을 보내면 로컬 색인에서 찾아 돌려준다 (manual_index.py)
+    if MANUAL_TOOL:
+        config["tools"] = [SEARCH_MANUAL_TOOL]
+
+    # 긴 세션: 창이 trigger_tokens를 넘으면 서버가 target_tokens까지 오래된 턴을 잘라낸다
+    if CONTEXT_COMPRESSION:
+        config["context_window_compression"] = {
+            "trigger_tokens": CONTEXT_TRIGGER_TOKENS,
+            "sliding_window": {"target_tokens": CONTEXT_TARGET_TOKENS},
+        }
+    if VIDEO_MEDIA_RESOLUTION:
+        config["media_resolution"] = VIDEO_MEDIA_RESOLUTION
+
+    # 세션 재개: 서버가 재개 핸들을 보내주고, 끊겼을 때 그 핸들로 다시 붙으면 대화 맥락이 이어진다
+    if LIVE_SESSION_RESUMPTION:
+        config["session_resumption"] = {"handle": None}
+
+    return config
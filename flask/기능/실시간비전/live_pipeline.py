@@ -0,0 +1,357 @@
+import asyncio
+import time
+
+import cv2
+from google.genai import types
+
+from audio_dsp import BargeInDetector
+from frame_gate import SceneChangeGate
+from uplink_control import AdaptiveUplinkController
+from frame_encoder import FrameEncoder
+from roi import fit_crop
+from metrics import (AUDIO_BYTES_SENT, AUDIO_CHUNKS_SENT, TOOL_CALL_MS, VIDEO_BYTES_SENT, VIDEO_FRAME_AGE_MS,
+                     VIDEO_FRAME_BYTES, VIDEO_FRAMES_SENT, VIDEO_SEND_MS)
+
+# ==========================================
+# [클래스] Live 세션 파이프라인 (비디오 / 오디오 / 수신 태스크 묶음)
+# ==========================================
+# main() 안에 있던 태스크들을 그대로 옮겨 장치와 세션을 밖에서 넣을 수 있게 했다.
+# 실제 실행(vision.py)은 카메라 공유 메모리 / 마이크 / 스피커 / Live 세션을 넣고,
+# 재생 하니스(session_replay.py)는 녹화 파일에서 읽는 장치와 가짜 세션을 넣는다.
+#
+# 필요한 인터페이스:
+# - frames.latest() -> (seq, frame) / frames.read_copy(seq) -> 복사본 (덮어써졌으면 None)
+# - mic.read_frame() (async) -> PCM bytes
+# - player.enqueue / end_turn / flush / note_speech_end
+# - session.send_realtime_input / receive()  (tools를 넘기면 send_tool_response도)
+
+
+class LivePipeline:
+    def __init__(self, session, frames, mic, player, logger, transcripts=None, stt=None,
+                 shared_state=None, gate=None, uplink=None, encoder=None, roi_selector=None,
+                 audio_gate=None, camera_alive=None, show_window=True, window_name='Gemini Live Vision',
+                 check_interval=0.1, local_barge_in=True, context=None, tools=None,
+                 visual=None, turn_state=None, barge_in=None):
+        self.session = session
+        self.frames = frames
+        self.mic = mic
+        self.player = player
+        self.logger = logger
+        self.transcripts = transcripts      # Live 세션 전사를 쓰는 경우
+        self.stt = stt                      # 별도 STT를 쓰는 경우
+        self.shared_state = shared_state if shared_state is not None else {"running": True}
+        self.shared_state.setdefault("running", True)
+
+        # 전송 쪽 상태 (선별 / 업링크 제어 / 인코더)는 두 코루틴이 공유
+        self.gate = gate or SceneChangeGate()
+        self.uplink = uplink or AdaptiveUplinkController()
+        self.encoder = encoder or FrameEncoder(max_pending=1)
+        self.roi_selector = roi_selector
+        self.audio_gate = audio_gate        # None이면 무음도 계속 전송
+        self.context = context              # 컨텍스트 토큰 추정 (ContextBudget, 선택)
+        self.tools = tools or {}            # 함수 도구 이름 -> 함수 (search_manual 등, 인자는 키워드)
+        self.visual = visual                # 로컬 화면 인식 (VisualRecognizer, 선택)
+        self.turn_state = turn_state        # 모델 턴 진행 상태 (TurnState, 턴 사이에 보낼 메시지용)
+        self._base_heartbeat = self.gate.heartbeat_interval
+
+        self.camera_alive = camera_alive    # 카메라 상태 확인 함수 (없으면 항상 살아 있음)
+        self.show_window = show_window
+        self.window_name = window_name
+        self.check_interval = check_interval
+        self.local_barge_in = local_barge_in
+        # 재생 중 끼어들기 판정 (스피커 소리가 마이크로 돌아와도 답변을 스스로 끊지 않게)
+        if barge_in is None and local_barge_in and audio_gate is not None:
+            barge_in = BargeInDetector(audio_gate.vad)
+        self.barge_in = barge_in if local_barge_in else None
+
+        self.tasks = []
+
+    @property
+    def running(self):
+        return self.shared_state["running"]
+
+    def stop(self):
+        """모든 태스크를 끝내도록 표시 (run()이 정리까지 마친다)"""
+        self.shared_state["running"] = False
+
+    # -------------------------------------------------------
+    # [Task 1] 비디오 처리 (화면 표시 + 전송 분리)
+    # -------------------------------------------------------
+
+    async def capture_and_display(self):
+        print("📷 카메라 캡처 시작")
+        shown_seq = 0
+        while self.running:
+            if self.camera_alive is not None and not self.camera_alive():
+                print("❌ 카메라 프레임 읽기 실패")
+                break
+
+            if self.show_window:
+                # 공유 메모리의 최신 프레임을 복사 없이 표시
+                seq, frame = self.frames.latest()
+                if frame is not None and seq != shown_seq:
+                    cv2.imshow(self.window_name, frame)
+                    shown_seq = seq
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    self.stop()
+                    break
+
+            # 화면 갱신 (약 30 FPS)
+            await asyncio.sleep(0.03)
+
+    async def select_video_frames(self):
+        """보낼 프레임을 골라 인코더 워커에 넘긴다 (resize/imencode는 루프 밖에서)"""
+        checked_seq = 0
+        while self.running:
+            seq, frame = self.frames.latest()
+            if frame is None or seq == checked_seq:
+                # 아직 새 프레임이 없음
+                await asyncio.sleep(self.check_interval)
+                continue
+            checked_seq = seq
+
+            # 거의 같은 장면이면 인코딩/전송 생략
+            should_send, reason = self.gate.check(frame)
+            if not should_send:
+                await asyncio.sleep(self.check_interval)
+                continue
+
+            # 보낼 프레임만 복사한다. 공유 메모리 뷰는 (슬롯수-1)장 뒤면 덮어써지는데 인코더는 밀리면
+            # 그보다 늦게 읽고, 복사하는 중에 덮어써질 수도 있다 (그러면 버리고 다음 프레임으로)
+            frame = self.frames.read_copy(seq)
+            if frame is None:
+                continue
+
+            # 보낼 프레임은 로컬 색인과도 비교 (흑백 축소본을 떠서 스레드에서 매칭)
+            if self.visual is not None:
+                self.visual.offer(frame)
+
+            # 장면이 바뀌었으면 관심 영역만 원본 해상도로 자른다
+            # (하트비트는 전체 화면을 보내서 모델이 전체 맥락을 잃지 않게 함)
+            if self.roi_selector is not None and reason == "keyframe":
+                roi = self.roi_selector.find(frame)
+                if roi is not None:
+                    x, y, w, h = fit_crop(roi, frame.shape, self.uplink.size)
+                    frame = frame[y:y + h, x:x + w]
+
+            # 전송 규격은 업링크 제어기가 결정 (기본 640x480, 품질 50)
+            self.encoder.submit(frame, self.uplink.size, self.uplink.quality)
+
+            # 전송 주기 (기본 0.4초 = 2.5 FPS, 회선 상태에 따라 늘어남)
+            # 긴 세션에서 컨텍스트 창을 비디오가 너무 많이 차지하면 간격/하트비트를 더 늘린다
+            # 로컬 색인으로 이미 알아본 대상이 계속 보이는 동안에도 늘린다
+            scale = self.context.video_interval_scale if self.context is not None else 1.0
+            if self.visual is not None:
+                scale *= self.visual.video_interval_scale
+            self.gate.heartbeat_interval = self._base_heartbeat * scale
+            await asyncio.sleep(self.uplink.interval * scale)
+
+    async def send_video_frames(self):
+        print("📡 비디오 전송 데몬 시작")
+        try:
+            while self.running:
+                encoded = await self.encoder.get()
+                payload = encoded.data
+
+                sent_at = time.perf_counter()
+                try:
+                    await self.session.send_realtime_input(
+                        video=types.Blob(
+                            data=payload,
+                            mime_type="image/jpeg"
+                        )
+                    )
+                except TypeError:
+                    await self.session.send_realtime_input(
+                        data=payload,
+                        mime_type="image/jpeg"
+                    )
+                except Exception as e:
+                    print(f"비디오 전송 오류 (무시됨): {e}")
+                send_seconds = time.perf_counter() - sent_at
+                self.uplink.record(len(payload), send_seconds)
+
+                VIDEO_FRAMES_SENT.inc()
+                VIDEO_BYTES_SENT.inc(len(payload))
+                VIDEO_FRAME_BYTES.observe(len(payload))
+                VIDEO_SEND_MS.observe(send_seconds * 1000)
+                VIDEO_FRAME_AGE_MS.observe((time.monotonic() - encoded.submitted_at) * 1000)
+                if self.context is not None:
+                    self.context.add_frame()
+        finally:
+            print(f"📊 비디오 전송 통계: keyframe {self.gate.sent_keyframes}, "
+                  f"heartbeat {self.gate.sent_heartbeats}, 생략 {self.gate.skipped}")
+            print(f"📊 업링크: {self.uplink.summary()} (조절 {self.uplink.adjustments}회)")
+            print(f"📊 인코더: {self.encoder.summary()}")
+            if self.roi_selector is not None:
+                print(f"📊 ROI: 잘라서 전송 {self.roi_selector.found}회, 전체 화면 {self.roi_selector.missed}회, "
+                      f"대상 전환 {self.roi_selector.resets}회")
+
+    # -------------------------------------------------------
+    # [Task 2] 오디오 입력
+    # -------------------------------------------------------
+    async def send_audio_stream(self):
+        print("🎙️ 마이크 전송 시작")
+        audio_gate = self.audio_gate
+        try:
+            while True:
+                try:
+                    data = await self.mic.read_frame()
+
+                    # STT 처리를 위해 데이터 복사본 전달
+                    if self.stt is not None:
+                        self.stt.add_audio(data)
+
+                    # 무음 억제: 말하는 구간만 보내고, 말이 끝나면 스트림 종료 신호
+                    stream_ended = False
+                    if audio_gate is not None:
+                        raw = data
+                        data, stream_ended = audio_gate.process(data)
+                        # 답변 재생 중에 사용자가 말하면 끊는다 (끼어들기)
+                        # 재생 중에는 스피커 소리보다 크게, 잠깐 이상 이어져야 사용자 발화로 인정
+                        if self.barge_in is not None and self.barge_in.process(
+                                raw, audio_gate.active and self.player.audible):
+                            self.player.flush("local-vad")
+                        if stream_ended:
+                            self.player.note_speech_end()
+
+                    # [수정] 문서를 참고하여 audio=types.Blob(...) 형태로 전송
+                    if data:
+                        await self.session.send_realtime_input(
+                            audio=types.Blob(
+                                data=data,
+                                mime_type="audio/pcm;rate=16000"
+                            )
+                        )
+                        AUDIO_CHUNKS_SENT.inc()
+                        AUDIO_BYTES_SENT.inc(len(data))
+                        if self.context is not None:
+                            self.context.add_input_audio(len(data))
+                    if stream_ended:
+                        await self.session.send_realtime_input(audio_stream_end=True)
+                except Exception as e:
+                    print(f"오디오 전송 오류: {e}")
+                    break
+        finally:
+            print(f"📊 마이크: {self.mic.summary()}")
+            if audio_gate is not None:
+                print(f"📊 오디오 업링크: {audio_gate.summary()}")
+            if self.barge_in is not None:
+                print(f"📊 끼어들기: {self.barge_in.summary()}")
+
+    # -------------------------------------------------------
+    # [Task 3] 응답 수신
+    # -------------------------------------------------------
+    async def receive_response(self):
+        transcripts = self.transcripts
+        context = self.context
+        turn_state = self.turn_state
+        while True:
+            try:
+                async for response in self.session.receive():
+                    if context is not None and getattr(response, "usage_metadata", None) is not None:
+                        context.observe_usage(response.usage_metadata)
+                    if getattr(response, "tool_call", None) is not None:
+                        if turn_state is not None:
+                            turn_state.begin()
+                        await self.answer_tool_call(response.tool_call)
+                    if response.server_content:
+                        # 사용자/모델 전사 -> DB 로그
+                        if transcripts is not None:
+                            transcripts.handle(response.server_content)
+
+                        model_turn = response.server_content.model_turn
+                        if turn_state is not None and (model_turn or getattr(
+                                response.server_content, "output_transcription", None) is not None):
+                            turn_state.begin()
+                        if model_turn:
+                            for part in model_turn.parts:
+                                if part.inline_data:
+                                    self.player.enqueue(part.inline_data.data)
+                                    if context is not None:
+                                        context.add_output_audio(len(part.inline_data.data))
+                                if part.text and context is not None:
+                                    context.add_text(part.text)
+                                # 전사를 쓰는 경우 모델 텍스트는 output_transcription으로 기록됨
+                                if part.text and transcripts is None:
+                                    print(part.text, end="", flush=True)
+                                    self.logger.append_text(part.text)
+
+                        # 서버가 사용자 끼어들기를 감지하면 남은 답변 재생을 버림
+                        if getattr(response.server_content, "interrupted", False):
+                            self.player.flush("server")
+                            if turn_state is not None:
+                                turn_state.end()
+
+                        # 턴이 끝났는지 확인 (API 버전에 따라 다를 수 있음)
+                        # turn_complete가 명시적으로 오면 저장
+                        if getattr(response.server_content, "turn_complete", False):
+                            self.player.end_turn()
+                            if turn_state is not None:
+                                turn_state.end()
+                            if transcripts is not None:
+                                transcripts.turn_complete()
+                            self.logger.flush_model_turn()
+
+            except Exception as e:
+                print(f"수신 오류: {e}")
+                if isinstance(e, ConnectionError):
+                    # 다시 연결하지 못함 - 응답 없이 화면만 떠 있지 않도록 종료
+                    self.stop()
+                break
+
+    async def answer_tool_call(self, tool_call):
+        """모델의 함수 호출을 로컬에서 처리하고 결과를 돌려준다 (모델은 결과를 받을 때까지 기다림)"""
+        await answer_tool_call(self.session, self.tools, tool_call)
+
+    # -------------------------------------------------------
+    # 실행 / 정리
+    # -------------------------------------------------------
+    async def run(self, *extra):
+        """
+        태스크를 모두 띄우고 화면 태스크(종료 'q' / 카메라 끊김 / stop())가 끝날 때까지 기다린다.
+        extra: 같이 돌리다가 끝낼 때 취소할 코루틴 (녹화 등)
+        """
+        video_display_task = asyncio.create_task(self.capture_and_display())
+        self.tasks = [
+            asyncio.create_task(self.select_video_frames()),
+            asyncio.create_task(self.send_video_frames()),
+            asyncio.create_task(self.send_audio_stream()),
+            asyncio.create_task(self.receive_response()),
+        ] + [asyncio.create_task(coro) for coro in extra]
+
+        try:
+            # 카메라 창이 닫힐 때까지 대기
+            await video_display_task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.stop()
+            for task in self.tasks:
+                task.cancel()
+            self.encoder.stop()
+            # 각 태스크의 finally(통계 출력)가 돌 시간을 준다
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+async def answer_tool_call(session, tools, tool_call):
+    """
+    tool_call의 함수들을 tools(이름 -> 함수)로 실행하고 send_tool_response로 돌려준다.
+    LivePipeline과 게이트웨이(gateway.py)가 같이 쓴다.
+    """
+    started = time.monotonic()
+    responses = []
+    for call in tool_call.function_calls or []:
+        fn = tools.get(call.name)
+        if fn is None:
+            result = {"error": f"알 수 없는 도구: {call.name}"}
+        else:
+            try:
+                # 색인 검색은 수 ms지만 루프(오디오 전송)를 막지 않도록 스레드에서
+                result = await asyncio.to_thread(fn, **(call.args or {}))
+            except Exception as e:
+                result = {"error": str(e)}
+        responses.append(types.FunctionResponse(id=call.id, name=call.name, response=result))
+    if responses:
+        await session.send_tool_response(function_responses=responses)
+        TOOL_CALL_MS.observe((time.monotonic() - started) * 1000)
@@ -0,0 +1,239 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+from metrics import RECONNECT_MS, RECONNECTS, RECONNECT_GAP_DROPPED
+
+# ==========================================
+# [클래스] 끊기면 다시 붙는 Live 세션 (세션 재개 핸들 사용)
+# ==========================================
+# 예전에는 send/receive에서 예외가 나면 출력만 하고 루프가 끝나서, 키오스크를 다시 켜야 했다.
+# 이 래퍼는 LivePipeline에 세션처럼 보이면서 연결이 끊기면 뒤에서 다시 연결한다.
+# - 서버가 보내는 session_resumption_update의 핸들을 기억해 두었다가 재연결 때 넘긴다 (대화 맥락 유지)
+# - go_away(서버 쪽 종료 예고)를 받으면 진행 중인 턴이 끝난 뒤 미리 갈아탄다
+# - 끊긴 동안 보내려던 오디오는 최근 max_gap_seconds 분량만, 비디오는 마지막 한 장만 보관했다가
+#   다시 연결되면 순서대로 보낸다
+# - 재연결은 지터를 섞은 지수 백오프로 시도하고, 끊김 -> 복구 시간을 기록한다
+# - 재개 핸들로 handle_attempts번 실패하거나 서버가 핸들을 거부하면 핸들을 버리고 새 세션으로 붙는다
+#   (만료된 핸들로 영원히 재시도하지 않도록). max_attempts번 모두 실패하면 포기하고, 그 뒤의
+#   receive() / send_*()는 ConnectionError를 낸다 (파이프라인이 조용히 멈춰 있지 않도록)
+#
+# connect(handle)는 client.aio.live.connect(...)처럼 async context manager를 돌려주는 함수.
+# 카메라 / 마이크 / 스피커 / DB 로거는 파이프라인 쪽에 그대로 남는다.
+
+
+def _invalid_handle(error):
+    """서버가 재개 핸들을 거부한 오류인지 (만료 / 다른 모델·설정의 핸들)"""
+    text = str(error).lower()
+    return "handle" in text or "resum" in text
+
+
+def _audio_len(kwargs):
+    audio = kwargs.get("audio")
+    return len(getattr(audio, "data", b"") or b"")
+
+
+class ReconnectingSession:
+    def __init__(self, connect, base_delay=0.5, max_delay=15.0, max_gap_seconds=5.0,
+                 audio_bytes_per_second=32000, max_attempts=10, handle_attempts=3):
+        self._connect = connect
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts        # 한 번 끊겼을 때 재연결 시도 상한 (None이면 계속)
+        self.handle_attempts = handle_attempts  # 재개 핸들로 이만큼 실패하면 핸들 없이 (새 세션)
+        self.max_gap_bytes = int(max_gap_seconds * audio_bytes_per_second)
+
+        self.handle = None          # 최근 재개 핸들
+        self._cm = None
+        self._session = None
+        self._connected = asyncio.Event()
+        self._reconnect_task = None
+        self._go_away = False
+        self._closed = False
+        self.error = None           # 재연결을 포기하게 만든 마지막 오류
+
+        # 끊긴 동안의 입력 (오디오 / audio_stream_end는 순서대로, 비디오는 마지막 한 장)
+        self._gap = deque()
+        self._gap_bytes = 0
+        self._gap_video = None
+        self._lost_at = None
+
+        # 통계
+        self.reconnects = 0
+        self.recovery_ms = []
+        self.gap_dropped = 0
+        self.handles_dropped = 0
+
+    @property
+    def connected(self):
+        return self._connected.is_set() and self.error is None
+
+    def _check(self):
+        if self.error is not None:
+            raise ConnectionError(f"Live 재연결 실패: {self.error}") from self.error
+
+    # ---------- 연결 ----------
+
+    async def __aenter__(self):
+        # 시작 단계에서 다른 초기화와 동시에 미리 연결해 두었으면 그대로 쓴다
+        if self._session is None:
+            await self._open()
+        self._connected.set()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _open(self):
+        cm = self._connect(self.handle)
+        session = await cm.__aenter__()
+        self._cm, self._session = cm, session
+        self._go_away = False
+        return session
+
+    async def _close_current(self):
+        cm, self._cm, self._session = self._cm, None, None
+        if cm is not None:
+            try:
+                await cm.__aexit__(None, None, None)
+            except Exception:
+                pass
+
+    async def close(self):
+        self._closed = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        self._connected.clear()
+        await self._close_current()
+
+    def _lost(self, session, reason):
+        """연결이 끊긴 것을 알림 - 같은 세션에 대해 한 번만 재연결을 시작한다"""
+        if self._closed or session is not self._session or not self.connected:
+            return
+        self._connected.clear()
+        self._lost_at = time.monotonic()
+        print(f"\n⚠️ Live 세션 끊김 ({reason}) - 재연결 시도")
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        await self._close_current()
+        delay = self.base_delay
+        attempt = 0
+        while not self._closed:
+            attempt += 1
+            try:
+                session = await self._open()
+                # 끊긴 동안 모아둔 입력을 먼저 보낸 뒤에 연결됨으로 표시 (새 입력이 앞지르지 않도록)
+                await self._send_gap(session)
+                break
+            except Exception as e:
+                await self._close_current()
+                if self.handle is not None and (attempt >= self.handle_attempts or _invalid_handle(e)):
+                    # 핸들이 만료됐거나 거부됨 - 맥락은 잃지만 새 세션으로라도 붙는다
+                    print("⚠️ 재개 핸들로 연결하지 못해서 새 세션으로 연결합니다")
+                    self.handle = None
+                    self.handles_dropped += 1
+                if self.max_attempts is not None and attempt >= self.max_attempts:
+                    print(f"❌ 재연결 {attempt}회 모두 실패 - 포기합니다: {e}")
+                    self.error = e
+                    self._connected.set()   # 기다리던 receive() / send_*()를 깨워 오류를 넘긴다
+                    return
+                wait = delay * (0.5 + random.random())
+                print(f"⚠️ 재연결 실패 {attempt}회 ({wait:.1f}초 후 재시도): {e}")
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, self.max_delay)
+        else:
+            return
+        self._connected.set()
+
+        recovery_ms = (time.monotonic() - self._lost_at) * 1000
+        self.reconnects += 1
+        self.recovery_ms.append(recovery_ms)
+        RECONNECTS.inc()
+        RECONNECT_MS.observe(recovery_ms)
+        resumed = "맥락 유지" if self.handle else "새 세션"
+        print(f"✅ 재연결 완료 ({resumed}, 복구 {recovery_ms:.0f}ms, 시도 {attempt}회)")
+
+    # ---------- 끊긴 동안의 입력 ----------
+
+    def _hold(self, kwargs):
+        if "video" in kwargs or "mime_type" in kwargs:
+            self._gap_video = kwargs    # 오래된 화면은 의미 없음 - 마지막 한 장만
+            return
+        self._gap.append(kwargs)
+        self._gap_bytes += _audio_len(kwargs)
+        while self._gap_bytes > self.max_gap_bytes and self._gap:
+            old = self._gap.popleft()
+            self._gap_bytes -= _audio_len(old)
+            self.gap_dropped += 1
+            RECONNECT_GAP_DROPPED.inc()
+
+    async def _send_gap(self, session):
+        """보관한 입력을 순서대로 보낸다 (실패하면 못 보낸 것은 그대로 남기고 예외)"""
+        while self._gap:
+            kwargs = self._gap[0]
+            await session.send_realtime_input(**kwargs)
+            self._gap.popleft()
+            self._gap_bytes -= _audio_len(kwargs)
+        if self._gap_video is not None:
+            await session.send_realtime_input(**self._gap_video)
+            self._gap_video = None
+
+    # ---------- 세션 인터페이스 ----------
+
+    async def send_realtime_input(self, **kwargs):
+        self._check()
+        if not self.connected:
+            self._hold(kwargs)
+            return
+        session = self._session
+        try:
+            await session.send_realtime_input(**kwargs)
+        except TypeError:
+            raise   # 인자 형식 문제는 호출 쪽에서 처리 (연결 문제 아님)
+        except Exception as e:
+            self._hold(kwargs)
+            self._lost(session, e)
+
+    async def send_client_content(self, **kwargs):
+        await self._connected.wait()
+        self._check()
+        await self._session.send_client_content(**kwargs)
+
+    async def send_tool_response(self, **kwargs):
+        await self._connected.wait()
+        self._check()
+        await self._session.send_tool_response(**kwargs)
+
+    async def receive(self):
+        """현재 세션에서 한 턴을 받는다 (끊겨 있으면 다시 연결될 때까지 기다림)"""
+        while not self._closed:
+            await self._connected.wait()
+            self._check()
+            session = self._session
+            try:
+                async for response in session.receive():
+                    update = getattr(response, "session_resumption_update", None)
+                    if update is not None and getattr(update, "resumable", False) and update.new_handle:
+                        self.handle = update.new_handle
+                    if getattr(response, "go_away", None) is not None:
+                        self._go_away = True
+                    yield response
+            except Exception as e:
+                self._lost(session, e)
+                continue
+
+            if self._go_away:
+                # 서버가 곧 끊겠다고 알렸음 - 턴 사이에 미리 갈아탄다
+                self._lost(session, "go_away")
+            return
+
+    def summary(self):
+        if self.error is not None:
+            return f"재연결 포기 ({self.error}), 성공한 재연결 {self.reconnects}회"
+        if not self.recovery_ms:
+            return "재연결 없음"
+        return (f"재연결 {self.reconnects}회, 평균 복구 {sum(self.recovery_ms) / len(self.recovery_ms):.0f}ms, "
+                f"최대 {max(self.recovery_ms):.0f}ms, 보관 한도 초과로 버린 오디오 {self.gap_dropped}개, "
+                f"버린 재개 핸들 {self.handles_dropped}개")
@@ -0,0 +1,73 @@
+# ==========================================
+# [클래스] Live 세션 전사 이벤트 -> DB 로거 연결
+# ==========================================
+# Live 세션에 input/output_audio_transcription을 켜면 서버가 사용자 음성과 모델 음성을
+# 글자로 같이 보내준다. 같은 오디오를 Google Web Speech API로 한 번 더 올리는 대신
+# 이 이벤트를 모아서 DatabaseLogger에 넘긴다.
+#
+# 사용자 전사는 조각으로 여러 번 오므로 모아두었다가, 모델 응답이 시작되거나
+# 턴이 끝날 때 한 메시지로 저장한다 (사용자 메시지가 항상 모델 답변보다 먼저 기록됨).
+
+
+class TranscriptRouter:
+    def __init__(self, logger, on_user_text=None, on_partial=None, echo=True):
+        self.logger = logger
+        self.on_user_text = on_user_text  # 사용자 발화 확정 시 콜백 (선택)
+        self.on_partial = on_partial      # 사용자 전사 조각이 올 때마다 콜백 (선택, 누적 텍스트 전달)
+        self.echo = echo                  # 콘솔 출력 여부
+
+        self._user_parts = []
+        self._model_started = False
+
+        # 통계
+        self.user_messages = 0
+        self.model_fragments = 0
+
+    @property
+    def partial_user_text(self):
+        return "".join(self._user_parts).strip()
+
+    def handle(self, server_content):
+        """server_content 하나에서 전사 이벤트를 꺼내 처리"""
+        if server_content is None:
+            return
+
+        input_tr = getattr(server_content, "input_transcription", None)
+        if input_tr is not None and getattr(input_tr, "text", None):
+            if self._model_started:
+                # 모델 답변 뒤에 새 발화가 시작됨 (끼어들기 등)
+                self._model_started = False
+            self._user_parts.append(input_tr.text)
+            if self.on_partial is not None:
+                self.on_partial(self.partial_user_text)
+            if getattr(input_tr, "finished", False):
+                self.flush_user()
+
+        output_tr = getattr(server_content, "output_transcription", None)
+        if output_tr is not None and getattr(output_tr, "text", None):
+            # 모델이 말하기 시작했으면 사용자 발화는 끝난 것
+            self.flush_user()
+            self._model_started = True
+            self.model_fragments += 1
+            if self.echo:
+                print(output_tr.text, end="", flush=True)
+            self.logger.append_text(output_tr.text)
+
+    def flush_user(self):
+        """모아둔 사용자 전사를 한 메시지로 저장"""
+        text = self.partial_user_text
+        self._user_parts = []
+        if not text:
+            return None
+        self.user_messages += 1
+        if self.echo:
+            print(f"\n[🗣️ User]: {text}")
+        self.logger.log_user_message(text)
+        if self.on_user_text is not None:
+            self.on_user_text(text)
+        return text
+
+    def turn_complete(self):
+        """모델 턴 완료 시 호출 - 남은 사용자 전사를 먼저 저장"""
+        self.flush_user()
+        self._model_started = False
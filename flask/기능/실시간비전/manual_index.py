@@ -0,0 +1,332 @@
+import asyncio
+import json
+import math
+import os
+import pathlib
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from metrics import (MANUAL_PREFETCH_HITS, MANUAL_PREFETCH_SAVED_MS, MANUAL_PREFETCHES, MANUAL_SEARCH_CACHE_HITS,
+                     MANUAL_SEARCH_MS)
+
+# ==========================================
+# [클래스] 매뉴얼 검색 (프로세스 안 글자 n-gram 색인)
+# ==========================================
+# RAG/upload_manual*.py가 Supabase manual_sections에 올린 매뉴얼 조각을 Live 세션 중에 쓰려면
+# 턴마다 임베딩 API + RPC를 다녀와야 해서 (수백 ms ~ 수 초) 음성 대화에는 너무 느리다.
+# 시작할 때 조각 텍스트만 한 번 받아 로컬 JSON에 캐시하고, 메모리에서 글자 2/3-gram BM25로 찾는다.
+# (한국어는 띄어쓰기 / 조사 때문에 단어 단위보다 글자 n-gram이 잘 맞는다. 조각 수천 개 기준 1~5ms)
+#
+# Live 설정에 search_manual 함수 도구(SEARCH_MANUAL_TOOL)를 선언하면 모델이 필요할 때 호출하고,
+# LivePipeline(게이트웨이도 같은 함수)이 tool_call을 받아 ManualSearch로 답한 뒤 send_tool_response로 돌려준다.
+
+SUPABASE_URL = "https://wzafalbctqkylhyzlfej.supabase.co"   # RAG/upload_manual*.py와 같은 프로젝트
+
+SEARCH_MANUAL_TOOL = {
+    "function_declarations": [{
+        "name": "search_manual",
+        "description": "LG 드럼 세탁기 사용 설명서에서 관련 내용을 찾는다. 에러 코드, 고장 증상, "
+                       "버튼/코스 사용법, 세탁 방법처럼 설명서 근거가 필요한 질문이면 먼저 호출한다.",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "query": {"type": "STRING", "description": "찾을 내용 (예: 'OE 에러 배수', '통살균 코스')"},
+            },
+            "required": ["query"],
+        },
+    }]
+}
+
+
+def _normalize(text):
+    """한글/영문/숫자만 남기고 소문자로 (upload_manual_final.sanitize_text와 같은 규칙)"""
+    text = re.sub(r"[^0-9A-Za-z가-힣\s]", " ", text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _grams(text, sizes=(2, 3)):
+    """단어마다 글자 n-gram (짧은 단어는 단어 그대로 - 'oe', 'le' 같은 에러 코드)"""
+    grams = []
+    for word in _normalize(text).split():
+        if len(word) <= min(sizes):
+            grams.append(word)
+            continue
+        for n in sizes:
+            grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return grams
+
+
+class ManualIndex:
+    def __init__(self, sections, k1=1.2, b=0.75):
+        self.sections = [s for s in sections if s.get("content_text")]
+        self.k1 = k1
+        self.b = b
+
+        postings = defaultdict(list)     # gram -> [(조각 번호, 빈도)]
+        self._lengths = []
+        self._doc_grams = []             # 조각 번호 -> {gram: 빈도} (미리 찾은 후보만 다시 채점할 때)
+        for doc, section in enumerate(self.sections):
+            counts = defaultdict(int)
+            for gram in _grams(f"{section.get('section_title', '')} {section['content_text']}"):
+                counts[gram] += 1
+            self._lengths.append(sum(counts.values()))
+            self._doc_grams.append(dict(counts))
+            for gram, tf in counts.items():
+                postings[gram].append((doc, tf))
+        self._postings = dict(postings)
+
+        count = len(self.sections)
+        self._avg_length = sum(self._lengths) / count if count else 0.0
+        self._idf = {gram: math.log(1 + (count - len(p) + 0.5) / (len(p) + 0.5)) for gram, p in postings.items()}
+
+    def __len__(self):
+        return len(self.sections)
+
+    def _term(self, gram, doc, tf):
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[doc] / (self._avg_length or 1.0))
+        return self._idf[gram] * tf * (self.k1 + 1) / (tf + norm)
+
+    def rank(self, query, k=3, within=None):
+        """
+        [(점수, 조각 번호), ...] 점수 높은 순.
+        within(조각 번호 목록)을 주면 그 조각들만 채점한다 (미리 찾아둔 후보를 실제 질의로 다시 정렬).
+        """
+        scores = defaultdict(float)
+        grams = set(_grams(query))
+        if within is not None:
+            for doc in within:
+                counts = self._doc_grams[doc]
+                for gram in grams:
+                    tf = counts.get(gram)
+                    if tf:
+                        scores[doc] += self._term(gram, doc, tf)
+        else:
+            for gram in grams:
+                for doc, tf in self._postings.get(gram, ()):
+                    scores[doc] += self._term(gram, doc, tf)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, doc) for doc, score in best]
+
+    def search(self, query, k=3):
+        """[(점수, 조각 dict), ...] 점수 높은 순"""
+        return [(score, self.sections[doc]) for score, doc in self.rank(query, k)]
+
+
+# ==========================================
+# [함수] manual_sections 불러오기 (로컬 캐시 우선)
+# ==========================================
+
+def fetch_manual_sections(page_size=1000):
+    """Supabase manual_sections에서 텍스트 컬럼만 받는다 (임베딩 벡터는 받지 않음)"""
+    try:
+        from supabase import create_client
+    except ImportError as e:
+        # 캐시 파일(manual_sections.json)이 있으면 Supabase 없이도 색인을 만든다
+        raise ImportError("supabase 라이브러리가 설치되지 않아 매뉴얼을 받을 수 없습니다. "
+                          "pip install supabase 후 다시 실행하거나 manual_sections.json 캐시를 넣어주세요.") from e
+
+    client = create_client(SUPABASE_URL, os.getenv("supbase_service_role"))
+    rows, start = [], 0
+    while True:
+        response = client.table("manual_sections") \
+            .select("section_id, category, section_title, content_text, page_number") \
+            .range(start, start + page_size - 1) \
+            .execute()
+        rows.extend(response.data or [])
+        if len(response.data or []) < page_size:
+            return rows
+        start += page_size
+
+
+def load_manual_sections(cache_path, refresh=False):
+    """캐시 파일이 있으면 그것을, 없거나 refresh면 Supabase에서 받아 캐시에 저장"""
+    cache_path = pathlib.Path(cache_path)
+    if cache_path.exists() and not refresh:
+        try:
+            return json.loads(cache_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"⚠️ 매뉴얼 캐시 읽기 실패 ({cache_path.name}): {e}")
+    try:
+        rows = fetch_manual_sections()
+    except Exception as e:
+        print(f"⚠️ 매뉴얼 받기 실패 - 매뉴얼 검색 없이 진행: {e}")
+        return []
+    tmp = cache_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(rows, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, cache_path)
+    print(f"📚 매뉴얼 {len(rows)}개 조각 캐시 저장: {cache_path.name}")
+    return rows
+
+
+# ==========================================
+# [클래스] search_manual 도구 (세션 단위 결과 캐시)
+# ==========================================
+
+class ManualSearch:
+    def __init__(self, index, top_k=3, max_chars=400, cache_size=128, prefetch_ttl=20.0, prefetch_coverage=0.6,
+                 prefetch_candidates=15):
+        self.index = index
+        self.top_k = top_k
+        self.max_chars = max_chars          # 조각 하나당 모델에 넘길 최대 글자 수 (컨텍스트 절약)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()         # 정규화한 질의 -> 결과 (같은 세션에서 같은 질문 반복)
+        self._lock = threading.Lock()
+
+        # 미리 찾아둔 결과 (사용자가 말하는 중에 전사 조각으로 검색) - 짧게만 보관
+        self.prefetch_ttl = prefetch_ttl
+        self.prefetch_coverage = prefetch_coverage  # 질의 n-gram 중 이만큼이 발화에 들어 있으면 같은 질문으로 본다
+        self.prefetch_candidates = prefetch_candidates  # 발화로 미리 뽑아 둘 후보 조각 수 (실제 질의로 다시 채점)
+        self._speculative = OrderedDict()   # 정규화한 발화 -> (시각, n-gram 집합, 후보 조각 번호, 검색 ms)
+
+        # 통계
+        self.calls = 0
+        self.cache_hits = 0
+        self.prefetches = 0
+        self.prefetch_hits = 0
+        self.saved_ms = 0.0
+
+    def search_manual(self, query):
+        """도구 응답 dict를 돌려준다 (FunctionResponse.response)"""
+        started = time.perf_counter()
+        key = _normalize(query)
+        with self._lock:
+            self.calls += 1
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                MANUAL_SEARCH_CACHE_HITS.inc()
+        if result is None:
+            result = self._take_prefetched(query, started)
+        if result is None:
+            result = self._search(query)
+            with self._lock:
+                self._cache[key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        MANUAL_SEARCH_MS.observe((time.perf_counter() - started) * 1000)
+        return result
+
+    def _search(self, query):
+        hits = self.index.search(query, k=self.top_k) if self.index is not None else []
+        return self._format(hits)
+
+    def _format(self, hits):
+        if not hits:
+            return {"results": [], "note": "설명서에서 관련 내용을 찾지 못했다. 추측하지 말고 그렇게 말해."}
+        return {"results": [
+            {
+                "page": section.get("page_number"),
+                "title": section.get("section_title"),
+                "text": section["content_text"][:self.max_chars],
+                "score": round(score, 2),
+            }
+            for score, section in hits
+        ]}
+
+    # ---------- 미리 찾기 (발화 중) ----------
+
+    def prefetch(self, text):
+        """발화 조각으로 미리 검색해 둔다 (스레드에서 호출)"""
+        key = _normalize(text)
+        if not key or key in self._speculative:
+            return
+        if self.index is None:
+            return
+        started = time.perf_counter()
+        candidates = [doc for _, doc in self.index.rank(text, k=self.prefetch_candidates)]
+        cost_ms = (time.perf_counter() - started) * 1000
+        now = time.monotonic()
+        with self._lock:
+            self._speculative[key] = (now, set(_grams(text)), candidates, cost_ms)
+            while self._speculative:
+                oldest = next(iter(self._speculative.values()))
+                if now - oldest[0] <= self.prefetch_ttl and len(self._speculative) <= self.cache_size:
+                    break
+                self._speculative.popitem(last=False)
+            self.prefetches += 1
+        MANUAL_PREFETCHES.inc()
+
+    def _take_prefetched(self, query, started):
+        """
+        질의가 최근 발화에 거의 다 들어 있으면 그 발화로 미리 뽑아 둔 후보만 실제 질의로 다시 채점한다.
+        커버리지가 같으면 더 최근 발화를 쓴다 (최근 발화부터 보고 더 높을 때만 바꿈).
+        """
+        grams = set(_grams(query))
+        if not grams:
+            return None
+        now = time.monotonic()
+        best, best_coverage = None, 0.0
+        with self._lock:
+            for entry in reversed(self._speculative.values()):     # 최근 발화부터
+                if now - entry[0] > self.prefetch_ttl:
+                    continue
+                coverage = len(grams & entry[1]) / len(grams)
+                if coverage >= self.prefetch_coverage and coverage > best_coverage:
+                    best, best_coverage = entry, coverage
+        if best is None:
+            return None
+        hits = self.index.rank(query, k=self.top_k, within=best[2])
+        if not hits:
+            return None     # 후보 안에 질의와 맞는 조각이 없음 -> 전체 검색
+        with self._lock:
+            self.prefetch_hits += 1
+        # 아낀 시간 = 다시 검색했다면 걸렸을 시간 - 후보를 다시 채점하는 데 쓴 시간
+        saved = max(0.0, best[3] - (time.perf_counter() - started) * 1000)
+        self.saved_ms += saved
+        MANUAL_PREFETCH_HITS.inc()
+        MANUAL_PREFETCH_SAVED_MS.observe(saved)
+        return self._format([(score, self.index.sections[doc]) for score, doc in hits])
+
+    def tools(self):
+        """LivePipeline(tools=...)에 넘길 이름 -> 함수"""
+        return {"search_manual": lambda query="", **_: self.search_manual(query)}
+
+    def summary(self):
+        size = len(self.index) if self.index is not None else 0
+        text = f"조각 {size}개, 호출 {self.calls}회 (캐시 적중 {self.cache_hits}회)"
+        if self.prefetches:
+            rate = self.prefetch_hits / self.calls * 100 if self.calls else 0.0
+            text += (f", 미리 찾기 {self.prefetches}회 -> 적중 {self.prefetch_hits}회 ({rate:.0f}%), "
+                     f"아낀 시간 {self.saved_ms:.1f}ms")
+        return text
+
+
+# ==========================================
+# [클래스] 발화 중 매뉴얼 미리 찾기
+# ==========================================
+# 사용자 발화는 말이 끝나야(무음 / 전사 finished) 확정되고, 모델은 그 뒤에야 search_manual을 부른다.
+# Live 전사 조각(TranscriptRouter.on_partial)이 올 때마다 누적 텍스트로 미리 검색해 두면
+# 도구 호출이 왔을 때 이미 결과가 있다. 검색은 한 번에 하나만 돌고, 밀린 조각은 최신 것만 검색한다.
+
+
+class ManualPrefetcher:
+    def __init__(self, search, min_new_chars=4, min_chars=4):
+        self.search = search
+        self.min_new_chars = min_new_chars  # 지난 검색 이후 이만큼 늘어났을 때만 다시 검색
+        self.min_chars = min_chars
+        self._pending = None
+        self._last = ""                 # 마지막으로 검색한 누적 텍스트
+        self._task = None
+
+    def on_partial(self, text):
+        """누적 사용자 전사 (이벤트 루프 안에서 호출)"""
+        text = (text or "").strip()
+        if not text.startswith(self._last):
+            self._last = ""             # 새 발화 시작
+        if len(text) < self.min_chars or len(text) - len(self._last) < self.min_new_chars:
+            return
+        self._last = text
+        self._pending = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while self._pending is not None:
+            text, self._pending = self._pending, None
+            try:
+                await asyncio.to_thread(self.search.prefetch, text)
+            except Exception as e:
+                print(f"⚠️ 매뉴얼 미리 찾기 실패: {e}")
@@ -0,0 +1,327 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# [클래스] 지표 레지스트리 (카운터 / 게이지 / 히스토그램)
+# ==========================================
+# "느리다"는 말이 나왔을 때 캡처 / 인코딩 / 업링크 / 모델 / 재생 중 어디가 문제인지 보려고
+# 파이프라인 곳곳의 숫자를 한 곳에 모은다. 운영 중에도 켜 둘 수 있게 기록은 가볍게 한다.
+# - 히스토그램은 값을 저장하지 않고 고정 구간별 개수만 센다 (observe 1회 = bisect + 덧셈)
+# - p50/p95/p99는 조회할 때 구간 안에서 선형 보간으로 계산
+# - 큐 깊이 / 버퍼 양처럼 "지금 값"은 등록해 둔 함수를 샘플러 스레드가 주기적으로 읽어 기록
+#
+# 내보내기: Prometheus 텍스트 (/metrics), JSON (/metrics.json), 주기적 JSON 파일 덤프
+
+LATENCY_MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+DEPTH_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 32, 64)
+BUFFER_MS_BUCKETS = (0, 20, 40, 80, 160, 320, 640, 1280, 2560, 5120, 10240, 30000)
+BYTES_BUCKETS = (1000, 5000, 10000, 20000, 40000, 80000, 160000, 320000)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn=None):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self.fn = fn            # 있으면 조회할 때 호출해서 값을 얻는다
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        if self.fn is not None:
+            try:
+                return self.fn()
+            except Exception:
+                return None
+        return self.value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_MS_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)   # 마지막 칸 = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+            if self.min is None or value < self.min:
+                self.min = value
+
+    def percentile(self, q):
+        """구간 개수로 추정한 q 백분위수 (구간 안은 선형 보간, 실제 최솟값~최댓값 범위로 제한)"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+            top = self.max
+            bottom = self.min
+        if not total:
+            return 0.0
+        rank = q / 100 * total
+        seen = 0
+        for index, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else top
+                upper = min(upper, top)
+                lower = min(max(lower, bottom), upper)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return top
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "avg": round(self.sum / self.count, 2) if self.count else 0.0,
+            "p50": round(self.percentile(50), 2),
+            "p95": round(self.percentile(95), 2),
+            "p99": round(self.percentile(99), 2),
+            "max": round(self.max, 2),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, sample_interval=0.5):
+        self._metrics = {}
+        self._samplers = []         # (히스토그램, 값 함수)
+        self._lock = threading.Lock()
+        self.sample_interval = sample_interval
+        self._sampler_thread = None
+        self._dump_thread = None
+        self._stop = threading.Event()
+        self.server = None
+
+    # ---------- 등록 ----------
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing     # 같은 이름은 한 번만 (모듈을 여러 번 import해도 안전)
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name, help_text="", fn=None):
+        gauge = self._register(Gauge(name, help_text))
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(self, name, help_text="", buckets=LATENCY_MS_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def track(self, histogram, fn):
+        """fn()이 돌려주는 현재 값을 sample_interval마다 histogram에 기록 (None이면 건너뜀)"""
+        with self._lock:
+            self._samplers.append((histogram, fn))
+        self._start_sampler()
+
+    def untrack(self, fn):
+        with self._lock:
+            self._samplers = [(h, f) for h, f in self._samplers if f is not fn]
+
+    def _start_sampler(self):
+        if self._sampler_thread is None:
+            self._sampler_thread = threading.Thread(target=self._sample_loop, name="metrics-sampler", daemon=True)
+            self._sampler_thread.start()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                samplers = list(self._samplers)
+            for histogram, fn in samplers:
+                try:
+                    value = fn()
+                except Exception:
+                    continue
+                if value is not None:
+                    histogram.observe(value)
+
+    # ---------- 내보내기 ----------
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def render_prometheus(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if metric.kind == "histogram":
+                with metric._lock:
+                    counts = list(metric.counts)
+                    total, value_sum = metric.count, metric.sum
+                cumulative = 0
+                for bound, n in zip(metric.bounds, counts):
+                    cumulative += n
+                    lines.append(f'{metric.name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric.name}_bucket{{le="+Inf"}} {total}')
+                lines.append(f"{metric.name}_sum {value_sum}")
+                lines.append(f"{metric.name}_count {total}")
+            else:
+                value = metric.snapshot()
+                if value is not None:
+                    lines.append(f"{metric.name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        /metrics (Prometheus 텍스트), /metrics.json 을 별도 스레드에서 제공.
+        기본은 이 컴퓨터에서만 접속 가능 - 다른 장비에서 수집하려면 host를 열어 준다.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(registry.snapshot(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = registry.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass    # 요청마다 콘솔에 찍지 않음
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        return self.server
+
+    def dump_every(self, path, interval=10.0):
+        """interval초마다 JSON 스냅샷을 path에 덮어쓴다 (임시 파일로 쓰고 교체)"""
+        def loop():
+            while not self._stop.wait(interval):
+                self.dump(path)
+
+        self._dump_thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+        self._dump_thread.start()
+
+    def dump(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"time": time.time(), "metrics": self.snapshot()}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def stop(self):
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+# ==========================================
+# [설정] 파이프라인 공통 지표
+# ==========================================
+# 프로세스 하나에 레지스트리 하나. 각 모듈은 필요한 지표만 import해서 쓴다.
+
+REGISTRY = MetricsRegistry()
+
+TURN_FIRST_AUDIO_MS = REGISTRY.histogram(
+    "vision_turn_first_audio_ms", "사용자 발화 종료 -> 모델 첫 오디오 도착 (턴별)")
+TURN_FIRST_PLAY_MS = REGISTRY.histogram(
+    "vision_turn_first_play_ms", "사용자 발화 종료 -> 스피커 재생 시작 (턴별)")
+
+VIDEO_FRAMES_SENT = REGISTRY.counter("vision_video_frames_sent_total", "전송한 비디오 프레임 수")
+VIDEO_BYTES_SENT = REGISTRY.counter("vision_video_bytes_sent_total", "전송한 비디오 바이트")
+VIDEO_FRAME_BYTES = REGISTRY.histogram(
+    "vision_video_frame_bytes", "전송 프레임 JPEG 크기", buckets=BYTES_BUCKETS)
+VIDEO_ENCODE_MS = REGISTRY.histogram("vision_video_encode_ms", "프레임 resize + JPEG 인코딩 시간")
+VIDEO_FRAME_AGE_MS = REGISTRY.histogram(
+    "vision_video_frame_age_ms", "인코더 제출 -> 전송 완료 (인코딩 + 대기 + 업링크)")
+VIDEO_SEND_MS = REGISTRY.histogram("vision_video_send_ms", "send_realtime_input(video) 소요 시간")
+
+AUDIO_CHUNKS_SENT = REGISTRY.counter("vision_audio_chunks_sent_total", "전송한 오디오 묶음 수")
+AUDIO_BYTES_SENT = REGISTRY.counter("vision_audio_bytes_sent_total", "전송한 오디오 바이트")
+
+STT_QUEUE_DEPTH = REGISTRY.histogram(
+    "vision_stt_queue_depth", "인식 대기 발화 수 (주기 샘플)", buckets=DEPTH_BUCKETS)
+STT_RECOGNIZE_MS = REGISTRY.histogram("vision_stt_recognize_ms", "발화 1건 인식 시간")
+
+PLAYBACK_BUFFER_MS = REGISTRY.histogram(
+    "vision_playback_buffer_ms", "재생 대기 중인 모델 오디오 양 (주기 샘플)", buckets=BUFFER_MS_BUCKETS)
+
+RECONNECTS = REGISTRY.counter("vision_live_reconnects_total", "Live 세션 재연결 횟수")
+RECONNECT_MS = REGISTRY.histogram("vision_live_reconnect_ms", "Live 세션 끊김 -> 재연결(보관 입력 전송)까지")
+RECONNECT_GAP_DROPPED = REGISTRY.counter(
+    "vision_live_gap_dropped_total", "끊긴 동안 보관 한도를 넘어 버린 오디오 묶음 수")
+
+GATEWAY_REJECTED = REGISTRY.counter("vision_gateway_rejected_total", "동시 세션 상한으로 거절한 클라이언트 수")
+GATEWAY_UPLINK_DROPPED = REGISTRY.counter(
+    "vision_gateway_uplink_dropped_total", "클라이언트 입력이 밀려서 버린 오디오/프레임 수")
+GATEWAY_DOWNLINK_DROPPED = REGISTRY.counter(
+    "vision_gateway_downlink_dropped_total", "클라이언트가 못 따라와서 버린 모델 오디오 조각 수")
+GATEWAY_CONNECT_MS = REGISTRY.histogram("vision_gateway_connect_ms", "클라이언트 접속 -> Live 세션 연결 완료")
+
+FIREBASE_WRITE_MS = REGISTRY.histogram("vision_firebase_write_ms", "Firebase update() 1회 소요 시간")
+FIREBASE_WRITE_FAILURES = REGISTRY.counter("vision_firebase_write_failures_total", "Firebase 쓰기 실패 수")
+
+PERSONA_SWITCHES = REGISTRY.counter("vision_persona_switches_total", "세션 중 페르소나 전환 횟수")
+PERSONA_SWITCH_MS = REGISTRY.histogram("vision_persona_switch_ms", "페르소나 전환 (지시문 전송) 소요 시간")
+
+STARTUP_READY_MS = REGISTRY.histogram("vision_startup_ready_ms", "실행 -> 오디오/카메라/Live 연결 모두 준비까지")
+
+MANUAL_SEARCH_MS = REGISTRY.histogram("vision_manual_search_ms", "search_manual 도구 1회 처리 시간 (캐시 포함)")
+MANUAL_SEARCH_CACHE_HITS = REGISTRY.counter("vision_manual_search_cache_hits_total", "세션 캐시로 답한 매뉴얼 검색 수")
+TOOL_CALL_MS = REGISTRY.histogram("vision_tool_call_ms", "tool_call 수신 -> send_tool_response 완료")
+MANUAL_PREFETCHES = REGISTRY.counter("vision_manual_prefetches_total", "발화 중 전사 조각으로 미리 검색한 횟수")
+MANUAL_PREFETCH_HITS = REGISTRY.counter("vision_manual_prefetch_hits_total", "미리 찾아둔 결과로 답한 search_manual 호출 수")
+MANUAL_PREFETCH_SAVED_MS = REGISTRY.histogram("vision_manual_prefetch_saved_ms", "미리 찾기로 아낀 검색 시간")
+
+VISUAL_MATCH_MS = REGISTRY.histogram("vision_visual_match_ms", "로컬 화면 인식 (ORB 매칭) 1회 소요 시간")
+VISUAL_MATCHES = REGISTRY.counter("vision_visual_matches_total", "로컬 색인으로 알아본 프레임 수")
+VISUAL_CONTEXTS = REGISTRY.counter("vision_visual_contexts_total", "화면 인식 결과를 텍스트 맥락으로 보낸 횟수")
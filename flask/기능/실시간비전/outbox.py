@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+
+# ==========================================
+# [클래스] 로컬 SQLite 아웃박스 (chat_history.db)
+# ==========================================
+# 세션 / 메시지 / 피드백을 먼저 로컬 DB에 기록하고(WAL 모드라 빠름), 업로드가 끝난 행만
+# synced=1로 표시한다. Firebase가 끊겨 있어도 로그는 남고, 다음 동기화(다음 실행 포함) 때 올라간다.
+# 메시지는 로컬에서 만든 message_id를 Firebase 키로 그대로 쓰므로 같은 행을 여러 번 올려도
+# 같은 경로를 덮어쓸 뿐이다 (중복 없음).
+#
+# 예전 chat_history.db의 sessions / messages 테이블을 그대로 쓰고 필요한 열만 추가한다.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    model_id TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER,
+    sender TEXT,
+    content TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES sessions (id)
+);
+"""
+
+# (테이블, 열, 정의) - 없으면 ALTER TABLE로 추가
+_COLUMNS = [
+    ("sessions", "feedback", "INTEGER"),
+    ("sessions", "session_key", "TEXT"),
+    ("sessions", "synced", "INTEGER DEFAULT 0"),
+    ("messages", "message_id", "TEXT"),
+    ("messages", "synced", "INTEGER DEFAULT 0"),
+]
+
+_INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_key ON sessions (session_key) WHERE session_key IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_message_id ON messages (message_id) WHERE message_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_messages_pending ON messages (synced) WHERE synced = 0;
+"""
+
+
+class LocalOutbox:
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")   # WAL에서는 전원 차단 시에도 DB가 깨지지 않음
+        self._conn.execute("PRAGMA busy_timeout=2000")
+        self._migrate()
+
+    def _migrate(self):
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            for table, column, definition in _COLUMNS:
+                existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            # 예전 실행에서 쌓인(키 없는) 행은 업로드 대상이 아님
+            self._conn.execute("UPDATE sessions SET synced = 1 WHERE session_key IS NULL AND synced = 0")
+            self._conn.execute("UPDATE messages SET synced = 1 WHERE message_id IS NULL AND synced = 0")
+            self._conn.executescript(_INDEXES)
+
+    # ---------- 기록 (호출 쪽 스레드) ----------
+
+    def start_session(self, session_key, start_time, model_id):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_key, start_time, model_id, synced) VALUES (?, ?, ?, 0)",
+                (session_key, start_time, model_id),
+            )
+
+    def add_message(self, session_key, message_id, sender, content, created_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO messages (session_id, message_id, sender, content, created_at, synced) "
+                "VALUES ((SELECT id FROM sessions WHERE session_key = ?), ?, ?, ?, ?, 0)",
+                (session_key, message_id, sender, content, created_at),
+            )
+
+    def set_feedback(self, session_key, score):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET feedback = ?, synced = 0 WHERE session_key = ?",
+                (score, session_key),
+            )
+
+    # ---------- 동기화 (백그라운드 스레드) ----------
+
+    def pending(self, limit=50):
+        """
+        아직 올라가지 않은 행을 세션별 업데이트로 묶어서 반환.
+        반환: [(session_key, {하위경로: 값}, [(세션 행 id, 피드백)], 메시지 행 id 목록), ...]
+        """
+        with self._lock:
+            session_rows = self._conn.execute(
+                "SELECT id, session_key, start_time, model_id, feedback FROM sessions "
+                "WHERE synced = 0 AND session_key IS NOT NULL ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+            message_rows = self._conn.execute(
+                "SELECT m.id, s.session_key, m.message_id, m.sender, m.content, m.created_at "
+                "FROM messages m JOIN sessions s ON s.id = m.session_id "
+                "WHERE m.synced = 0 AND m.message_id IS NOT NULL ORDER BY m.id LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+        grouped = {}
+        for row_id, key, start_time, model_id, feedback in session_rows:
+            updates, session_ids, _ = grouped.setdefault(key, ({}, [], []))
+            updates["start_time"] = start_time
+            updates["model_id"] = model_id
+            if feedback is not None:
+                updates["feedback"] = feedback
+            session_ids.append((row_id, feedback))
+        for row_id, key, message_id, sender, content, created_at in message_rows:
+            updates, _, message_ids = grouped.setdefault(key, ({}, [], []))
+            updates[f"messages/{message_id}"] = {
+                "sender": sender,
+                "content": content,
+                "created_at": created_at,
+            }
+            message_ids.append(row_id)
+        return [(key, updates, sids, mids) for key, (updates, sids, mids) in grouped.items()]
+
+    def mark_synced(self, session_rows, message_row_ids):
+        with self._lock:
+            if session_rows:
+                # 올리는 사이에 피드백이 바뀌었으면 다시 올려야 하므로 synced를 유지
+                self._conn.executemany("UPDATE sessions SET synced = 1 WHERE id = ? AND feedback IS ?", session_rows)
+            if message_row_ids:
+                self._conn.executemany("UPDATE messages SET synced = 1 WHERE id = ?", [(i,) for i in message_row_ids])
+
+    def pending_count(self):
+        with self._lock:
+            sessions = self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE synced = 0 AND session_key IS NOT NULL").fetchone()[0]
+            messages = self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE synced = 0 AND message_id IS NOT NULL").fetchone()[0]
+        return sessions + messages
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,134 @@
+import asyncio
+import pathlib
+import time
+
+from metrics import PERSONA_SWITCH_MS, PERSONA_SWITCHES
+
+# ==========================================
+# [클래스] 페르소나 목록 (시작할 때 한 번 읽어서 메모리에 보관)
+# ==========================================
+# 예전에는 get_config()가 persona_세탁법.txt만 연결할 때 읽어서, 수리 안내로 바꾸려면
+# 세션을 끊고 다시 연결해야 했다 (몇 초). 두 파일을 미리 읽어두고 이름으로 꺼내 쓴다.
+
+DEFAULT_INSTRUCTION = "너는 도움이 되는 AI 어시스턴트야. 실시간으로 대화해."
+
+# 파일 이름(persona_<이름>.txt)의 <이름> -> 사용자 발화에서 이 페르소나를 고를 키워드
+PERSONA_KEYWORDS = {
+    "세탁기수리법": ["고장", "수리", "에러", "오류", "안 돼", "안돼", "소음", "소리가", "물이 새",
+                  "배수", "탈수가 안", "문이 안", "전원이", "멈춰", "멈췄", "점검", "코드"],
+    "세탁법": ["빨래", "세탁법", "얼룩", "옷", "섬유", "세제", "울 소재", "니트", "이불", "코스", "헹굼", "건조"],
+}
+
+
+class PersonaLibrary:
+    def __init__(self, directory=None, keywords=None):
+        self.directory = pathlib.Path(directory or pathlib.Path(__file__).parent.absolute())
+        self.keywords = keywords if keywords is not None else PERSONA_KEYWORDS
+        self.texts = {}
+        for path in sorted(self.directory.glob("persona_*.txt")):
+            try:
+                self.texts[path.stem[len("persona_"):]] = path.read_text(encoding="utf-8")
+            except Exception as e:
+                print(f"⚠️ 페르소나 읽기 실패 ({path.name}): {e}")
+        if self.texts:
+            print(f"🎭 페르소나 로드됨: {', '.join(self.texts)}")
+
+    def __contains__(self, name):
+        return name in self.texts
+
+    def text(self, name):
+        return self.texts.get(name, DEFAULT_INSTRUCTION)
+
+    def detect(self, utterance):
+        """발화에서 키워드가 가장 많이 나온 페르소나 이름 (없으면 None)"""
+        best, best_hits = None, 0
+        for name, words in self.keywords.items():
+            if name not in self.texts:
+                continue
+            hits = sum(1 for word in words if word in utterance)
+            if hits > best_hits:
+                best, best_hits = name, hits
+        return best
+
+
+# ==========================================
+# [클래스] 세션 중 페르소나 전환 (재연결 없음)
+# ==========================================
+# Live API에는 연결된 세션의 system_instruction을 바꾸는 호출이 없다. 대신 새 지시문을
+# send_client_content(turn_complete=False)로 대화 맥락에 넣는다 - 모델이 따로 대답하지 않고
+# 다음 답변부터 새 역할로 말한다. 연결/카메라/마이크/대화 맥락은 그대로 유지된다.
+# 모델이 답하는 도중에 보내면 그 답변이 끊기므로, turn_state를 넘기면 진행 중인 턴이 끝날 때까지
+# 미뤘다가 (그 사이 의도가 또 바뀌면 마지막 것으로) 보낸다.
+#
+# 재연결할 때(재개 핸들이 없을 때)는 connect 쪽에서 current 페르소나로 config를 만들면 된다.
+
+
+class PersonaSwitcher:
+    def __init__(self, session, library, current, min_interval=10.0, turn_state=None):
+        self.session = session
+        self.library = library
+        self.current = current
+        self.min_interval = min_interval    # 전환 직후 같은 발화 조각으로 되돌아가지 않도록 (초)
+        self.turn_state = turn_state        # TurnState (없으면 바로 전송)
+
+        self._task = None
+        self._pending = None                # 턴이 끝나길 기다리는 동안 보낼 페르소나
+        self._switched_at = 0.0
+
+        # 통계
+        self.switches = 0
+        self.switch_ms = []
+
+    def instruction(self, name):
+        return (f"[역할 변경] 지금부터는 아래 지시를 따른다. 이 메시지에는 대답하지 말고, "
+                f"사용자의 다음 말부터 새 역할로 답한다.\n\n{self.library.text(name)}")
+
+    def on_text(self, text):
+        """사용자 발화(조각 포함)에서 의도가 바뀌었으면 전환을 예약한다 (이벤트 루프 안에서 호출)"""
+        if not text or time.monotonic() - self._switched_at < self.min_interval:
+            return
+        name = self.library.detect(text)
+        if name is None:
+            return
+        if self._task is not None and not self._task.done():
+            self._pending = name            # 아직 기다리는 중이면 가장 최근 의도로 바꿔 둔다
+            return
+        if name != self.current:
+            self._pending = name
+            self._task = asyncio.get_running_loop().create_task(self._switch_between_turns())
+
+    async def _switch_between_turns(self):
+        if self.turn_state is not None and await self.turn_state.wait_idle():
+            print(f"\n🎭 답변이 끝날 때까지 기다렸다가 전환: {self._pending}")
+        name, self._pending = self._pending, None
+        return await self.switch(name)
+
+    async def switch(self, name):
+        """페르소나를 바꾸고 걸린 시간(ms)을 돌려준다"""
+        if name == self.current or name not in self.library:
+            return 0.0
+        started = time.perf_counter()
+        try:
+            await self.session.send_client_content(
+                turns=[{"role": "user", "parts": [{"text": self.instruction(name)}]}],
+                turn_complete=False,
+            )
+        except Exception as e:
+            print(f"⚠️ 페르소나 전환 실패 ({name}): {e}")
+            return None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        previous, self.current = self.current, name
+        self._switched_at = time.monotonic()
+        self.switches += 1
+        self.switch_ms.append(elapsed_ms)
+        PERSONA_SWITCHES.inc()
+        PERSONA_SWITCH_MS.observe(elapsed_ms)
+        print(f"\n🎭 페르소나 전환: {previous} -> {name} ({elapsed_ms:.0f}ms)")
+        return elapsed_ms
+
+    def summary(self):
+        if not self.switch_ms:
+            return f"현재 {self.current}, 전환 없음"
+        return (f"현재 {self.current}, 전환 {self.switches}회, "
+                f"평균 {sum(self.switch_ms) / len(self.switch_ms):.0f}ms, 최대 {max(self.switch_ms):.0f}ms")
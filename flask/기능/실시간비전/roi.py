@@ -0,0 +1,130 @@
+import cv2
+import numpy as np
+
+# ==========================================
+# [클래스] 관심 영역(ROI) 선택기
+# ==========================================
+# 1280x720 전체를 640x480으로 줄이면 세탁기 조작부의 작은 글씨/아이콘이 뭉개진다.
+# 엣지가 빽빽한 영역(조작부 버튼/표시부, 얼룩 경계 등)을 찾아서
+# 그 부분만 원본 해상도로 잘라 보내면 같은 바이트로 훨씬 잘 읽힌다.
+#
+# 분석은 작은 흑백 이미지에서 Canny 엣지 -> 팽창으로 덩어리 만들기 -> 외곽선 중
+# '엣지 밀도 x 면적'이 가장 큰 것을 고르는 방식 (1프레임당 1ms 이하).
+#
+# find()는 장면이 바뀐 프레임(keyframe)에서만 불리므로, 이전 ROI와 섞는 건 같은 대상을 비추며
+# 카메라가 조금 움직인 경우(두 영역이 많이 겹칠 때)만 한다. 다른 곳을 비추면 새 영역을 그대로 쓴다.
+
+
+class RoiSelector:
+    def __init__(self, analysis_width=320, min_area_ratio=0.03, max_area_ratio=0.7,
+                 min_edge_density=0.08, padding=0.15, smoothing=0.5, min_overlap=0.5):
+        self.analysis_width = analysis_width
+        self.min_area_ratio = min_area_ratio      # 이보다 작은 덩어리는 잡음으로 간주
+        self.max_area_ratio = max_area_ratio      # 이보다 크면 굳이 자를 이유가 없음
+        self.min_edge_density = min_edge_density  # 덩어리 안에서 엣지 픽셀 비율 하한
+        self.padding = padding                    # 찾은 영역 주변 여백 비율
+        self.smoothing = smoothing                # 이전 ROI와 섞는 비율 (흔들림 방지)
+        self.min_overlap = min_overlap            # 이전 ROI와 이만큼(IoU) 겹쳐야 같은 대상으로 보고 섞음
+
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 5))
+        self._last_rect = None
+
+        # 통계
+        self.found = 0
+        self.missed = 0
+        self.resets = 0
+
+    def reset(self):
+        """다음 ROI는 이전 영역과 섞지 않도록 초기화"""
+        self._last_rect = None
+
+    def find(self, frame, reset=False):
+        """
+        원본 좌표계의 (x, y, w, h) 관심 영역을 반환. 뚜렷한 영역이 없으면 None.
+        reset=True면 이전 영역과 섞지 않는다 (장면 전환).
+        """
+        if reset:
+            self.reset()
+        fh, fw = frame.shape[:2]
+        scale = self.analysis_width / fw
+        small = cv2.resize(frame, (self.analysis_width, max(1, int(fh * scale))), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        edges = cv2.Canny(small, 60, 160)
+        blobs = cv2.dilate(edges, self._kernel, iterations=2)
+        contours, _ = cv2.findContours(blobs, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        total_area = small.shape[0] * small.shape[1]
+        best, best_score = None, 0.0
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            area = w * h
+            if not (self.min_area_ratio * total_area <= area <= self.max_area_ratio * total_area):
+                continue
+            density = cv2.countNonZero(edges[y:y + h, x:x + w]) / area
+            if density < self.min_edge_density:
+                continue
+            score = density * area
+            if score > best_score:
+                best, best_score = (x, y, w, h), score
+
+        if best is None:
+            self.missed += 1
+            self._last_rect = None
+            return None
+
+        # 원본 좌표로 환산 + 여백
+        x, y, w, h = (v / scale for v in best)
+        pad_w, pad_h = w * self.padding, h * self.padding
+        rect = np.array([x - pad_w, y - pad_h, w + 2 * pad_w, h + 2 * pad_h])
+
+        if self._last_rect is not None:
+            if _overlap(self._last_rect, rect) >= self.min_overlap:
+                rect = self.smoothing * self._last_rect + (1 - self.smoothing) * rect
+            else:
+                # 다른 대상으로 넘어감 - 이전 영역 쪽으로 끌려가지 않게 새 영역을 그대로 쓴다
+                self.resets += 1
+        self._last_rect = rect
+        self.found += 1
+        return tuple(int(round(v)) for v in rect)
+
+
+def _overlap(a, b):
+    """두 (x, y, w, h) 영역의 IoU"""
+    ix = max(0.0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def fit_crop(rect, frame_shape, out_size):
+    """
+    관심 영역을 전송 규격(out_size)과 같은 비율로 넓혀서 프레임 안에 맞춘다.
+    영역이 out_size보다 작으면 out_size 크기(원본 해상도 그대로)까지 주변을 더 포함한다.
+    반환: (x, y, w, h)
+    """
+    fh, fw = frame_shape[:2]
+    out_w, out_h = out_size
+    aspect = out_w / out_h
+    x, y, w, h = rect
+
+    # 비율 맞추기 (짧은 쪽을 늘림)
+    if w / max(h, 1) < aspect:
+        w = h * aspect
+    else:
+        h = w / aspect
+    # 원본 해상도로 보낼 수 있을 만큼은 넓힌다
+    if w < out_w:
+        w, h = out_w, out_h
+    # 프레임보다 크면 프레임에 맞춤
+    if w > fw:
+        w, h = fw, fw / aspect
+    if h > fh:
+        w, h = fh * aspect, fh
+
+    cx, cy = x + rect[2] / 2, y + rect[3] / 2
+    x0 = int(round(min(max(cx - w / 2, 0), fw - w)))
+    y0 = int(round(min(max(cy - h / 2, 0), fh - h)))
+    return x0, y0, int(round(w)), int(round(h))
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# ==========================================
+# [클래스] 세션 녹화 파일 (마이크 / 카메라 / 서버 응답)
+# ==========================================
+# 실제 세션에서 들어온 입력과 서버 응답을 시각과 함께 한 파일에 기록해 두면,
+# 카메라/마이크/Gemini 없이 같은 세션을 session_replay.py로 다시 돌려 볼 수 있다.
+#
+# 파일 형식: MAGIC + 헤더 JSON 한 줄, 이후 레코드 반복
+#   레코드 = <시각(float64, 녹화 시작 기준 초)> <종류(uint8)> <길이(uint32)> <내용>
+#   - MIC: 마이크 PCM 그대로 (게이트 전 원본)
+#   - FRAME: 카메라 프레임 JPEG (용량을 줄이려고 녹화 시 인코딩)
+#   - RESPONSE: uint32 JSON 길이 + 응답 JSON + 모델 오디오 PCM
+#   - EVENT: JSON (클라이언트가 보낸 audio_stream_end 등)
+
+MAGIC = b"VREC1\n"
+_RECORD = struct.Struct("<dBI")
+_LEN = struct.Struct("<I")
+
+KIND_MIC = 1
+KIND_FRAME = 2
+KIND_RESPONSE = 3
+KIND_EVENT = 4
+
+
+def encode_response(response):
+    """Live 응답에서 파이프라인이 쓰는 필드만 뽑아 (JSON bytes, 오디오 bytes)로 만든다"""
+    sc = getattr(response, "server_content", None)
+    meta = {}
+    audio = b""
+    if sc is not None:
+        input_tr = getattr(sc, "input_transcription", None)
+        if input_tr is not None and getattr(input_tr, "text", None):
+            meta["input_text"] = input_tr.text
+            meta["input_finished"] = bool(getattr(input_tr, "finished", False))
+        output_tr = getattr(sc, "output_transcription", None)
+        if output_tr is not None and getattr(output_tr, "text", None):
+            meta["output_text"] = output_tr.text
+        model_turn = getattr(sc, "model_turn", None)
+        if model_turn:
+            texts = []
+            for part in model_turn.parts or []:
+                if part.inline_data:
+                    audio += part.inline_data.data
+                if part.text:
+                    texts.append(part.text)
+            if texts:
+                meta["text"] = "".join(texts)
+        meta["turn_complete"] = bool(getattr(sc, "turn_complete", False))
+        meta["interrupted"] = bool(getattr(sc, "interrupted", False))
+    return json.dumps(meta, ensure_ascii=False).encode("utf-8"), audio
+
+
+def decode_response(payload):
+    """encode_response()의 역 - (메타 dict, 오디오 bytes)"""
+    (meta_len,) = _LEN.unpack_from(payload)
+    meta = json.loads(payload[_LEN.size:_LEN.size + meta_len].decode("utf-8"))
+    audio = bytes(payload[_LEN.size + meta_len:])
+    return meta, audio
+
+
+class SessionRecorder:
+    def __init__(self, path, frame_fps=5, jpeg_quality=85, **header):
+        self.path = str(path)
+        self.frame_fps = frame_fps
+        self.jpeg_quality = jpeg_quality
+        self._lock = threading.Lock()
+        self._file = open(self.path, "wb")
+        self._t0 = time.monotonic()
+        header.update({"frame_fps": frame_fps, "started_at": time.time()})
+        self._file.write(MAGIC)
+        self._file.write(json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n")
+
+        # 통계
+        self.counts = {KIND_MIC: 0, KIND_FRAME: 0, KIND_RESPONSE: 0, KIND_EVENT: 0}
+        self.bytes_written = 0
+
+    def _write(self, kind, payload, at=None):
+        t = (time.monotonic() if at is None else at) - self._t0
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(_RECORD.pack(t, kind, len(payload)))
+            self._file.write(payload)
+            self.counts[kind] += 1
+            self.bytes_written += _RECORD.size + len(payload)
+
+    # at: 기록 시각 (time.monotonic() 기준, 생략하면 지금) - 합성 녹화를 만들 때 사용
+
+    def mic(self, pcm, at=None):
+        self._write(KIND_MIC, bytes(pcm), at)
+
+    def frame(self, frame, at=None):
+        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+        if ok:
+            self._write(KIND_FRAME, buf.tobytes(), at)
+
+    def response(self, response, at=None):
+        meta, audio = encode_response(response)
+        self._write(KIND_RESPONSE, _LEN.pack(len(meta)) + meta + audio, at)
+
+    def event(self, name, at=None, **fields):
+        fields["event"] = name
+        self._write(KIND_EVENT, json.dumps(fields, ensure_ascii=False).encode("utf-8"), at)
+
+    @property
+    def started_at(self):
+        return self._t0
+
+    # ---------- 파이프라인 연결용 래퍼 ----------
+
+    def wrap_mic(self, mic):
+        return _RecordingMic(mic, self)
+
+    def wrap_session(self, session):
+        return _RecordingSession(session, self)
+
+    async def capture_frames(self, frames, is_running):
+        """공유 메모리의 새 프레임을 frame_fps 간격으로 기록 (JPEG 인코딩은 스레드에서)"""
+        interval = 1.0 / self.frame_fps
+        recorded_seq = 0
+        while is_running():
+            seq, frame = frames.latest()
+            if frame is not None and seq != recorded_seq:
+                recorded_seq = seq
+                # 인코딩 중에 슬롯이 덮어써지지 않도록 복사해서 넘긴다 (복사 중에 덮어써졌으면 다음 프레임)
+                frame = frames.read_copy(seq)
+                if frame is not None:
+                    await asyncio.to_thread(self.frame, frame)
+            await asyncio.sleep(interval)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def summary(self):
+        return (f"마이크 {self.counts[KIND_MIC]}, 프레임 {self.counts[KIND_FRAME]}, "
+                f"응답 {self.counts[KIND_RESPONSE]}, 이벤트 {self.counts[KIND_EVENT]}, "
+                f"{self.bytes_written / 1e6:.1f}MB -> {self.path}")
+
+
+class _RecordingMic:
+    """mic.read_frame() 결과를 기록하고 그대로 넘긴다 (나머지 속성은 원래 마이크로)"""
+
+    def __init__(self, mic, recorder):
+        self._mic = mic
+        self._recorder = recorder
+
+    async def read_frame(self):
+        data = await self._mic.read_frame()
+        self._recorder.mic(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._mic, name)
+
+
+class _RecordingSession:
+    """Live 세션 래퍼 - 받은 응답과 audio_stream_end 전송을 기록한다"""
+
+    def __init__(self, session, recorder):
+        self._session = session
+        self._recorder = recorder
+
+    async def send_realtime_input(self, **kwargs):
+        if kwargs.get("audio_stream_end"):
+            self._recorder.event("audio_stream_end")
+        return await self._session.send_realtime_input(**kwargs)
+
+    async def receive(self):
+        async for response in self._session.receive():
+            self._recorder.response(response)
+            yield response
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+# ==========================================
+# [함수] 녹화 파일 읽기
+# ==========================================
+
+def read_recording(path):
+    """(헤더 dict, [(시각, 종류, 내용 bytes), ...]) 반환"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"녹화 파일이 아닙니다: {path}")
+        header = json.loads(f.readline().decode("utf-8"))
+        records = []
+        while True:
+            head = f.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                break   # 녹화 도중 끊긴 파일은 마지막 온전한 레코드까지만
+            t, kind, length = _RECORD.unpack(head)
+            payload = f.read(length)
+            if len(payload) < length:
+                break
+            records.append((t, kind, payload))
+    return header, records
+
+
+def decode_frame(payload):
+    return cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
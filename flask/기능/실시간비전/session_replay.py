@@ -0,0 +1,356 @@
+import asyncio
+import threading
+import time
+
+from audio_dsp import AudioUplinkGate, VoiceActivityDetector
+from fake_live import FakeLiveSession, server_content
+from frame_encoder import FrameEncoder
+from frame_gate import SceneChangeGate
+from live_pipeline import LivePipeline
+from live_transcript import TranscriptRouter
+from metrics import REGISTRY, TURN_FIRST_AUDIO_MS
+from roi import RoiSelector
+from session_record import (KIND_EVENT, KIND_FRAME, KIND_MIC, KIND_RESPONSE,
+                            decode_frame, decode_response, read_recording)
+from uplink_control import AdaptiveUplinkController
+
+# ==========================================
+# 녹화 세션 재생 (카메라 / 마이크 / Gemini 없이 파이프라인 측정)
+# ==========================================
+# session_record.py로 남긴 파일을 읽어 녹화 때와 같은 시각에 마이크 묶음과 프레임을 넣고,
+# LivePipeline의 태스크를 그대로 돌린다. 서버 쪽은 가짜 Live 세션이 맡는데,
+# 녹화 당시 "발화 종료(audio_stream_end) -> 첫 응답" 간격만큼 기다렸다가 녹화된 응답을 돌려준다.
+# 그래서 측정되는 응답 지연 = 녹화 당시 모델 지연 + 지금 파이프라인(VAD/전송) 지연.
+#
+# 보고 항목: 발화 종료 -> 첫 오디오 지연, 이벤트 루프 지연, 전송 프레임/바이트, CPU 사용량
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class ReplayClock:
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.t0 = time.monotonic()
+
+    def at(self, t):
+        """녹화 시각 t에 해당하는 monotonic 시각"""
+        return self.t0 + t / self.speed
+
+    def until(self, t):
+        return max(0.0, self.at(t) - time.monotonic())
+
+
+class ReplayMic:
+    """녹화된 마이크 묶음을 녹화 때 간격으로 돌려준다 (MicrophoneStream.read_frame과 같은 모양)"""
+
+    def __init__(self, chunks, clock):
+        self._chunks = chunks          # [(시각, pcm), ...]
+        self._clock = clock
+        self._index = 0
+        self.finished = asyncio.Event()
+        self.frames_read = 0
+
+    async def read_frame(self):
+        if self._index >= len(self._chunks):
+            self.finished.set()
+            await asyncio.Event().wait()   # 더 없음 - 파이프라인이 끝낼 때까지 대기
+        t, pcm = self._chunks[self._index]
+        self._index += 1
+        await asyncio.sleep(self._clock.until(t))
+        self.frames_read += 1
+        return pcm
+
+    def summary(self):
+        return f"재생 묶음 {self.frames_read}/{len(self._chunks)}개"
+
+
+class ReplayFrames:
+    """녹화된 프레임을 녹화 때 시각에 맞춰 갱신 (캡처 프로세스처럼 별도 스레드에서 디코딩)"""
+
+    def __init__(self, frames, clock):
+        self._frames = frames          # [(시각, jpeg bytes), ...]
+        self._clock = clock
+        self._latest = (0, None)
+        self._stop = threading.Event()
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="replay-frames", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        for seq, (t, payload) in enumerate(self._frames, start=1):
+            frame = decode_frame(payload)
+            if self._stop.wait(self._clock.until(t)):
+                return
+            if frame is not None:
+                self._latest = (seq, frame)
+        self.finished.set()
+
+    def latest(self):
+        return self._latest
+
+    def read_copy(self, seq):
+        # 녹화 프레임은 장마다 새 배열이라 덮어써지지 않는다
+        latest_seq, frame = self._latest
+        return frame.copy() if frame is not None and latest_seq == seq else None
+
+    def stop(self):
+        self._stop.set()
+        self.thread.join(timeout=1.0)
+
+
+class ProbePlayer:
+    """소리는 내지 않고 AudioPlayer와 같은 지점에서 응답 지연만 잰다"""
+
+    def __init__(self):
+        self._speech_end_at = None
+        self._turn = None
+        self.turn_stats = []
+        self.flushes = 0
+        self.bytes = 0
+        self._muted = False
+
+    @property
+    def buffered_ms(self):
+        return 0.0
+
+    @property
+    def audible(self):
+        return self._turn is not None
+
+    def note_speech_end(self, at=None):
+        self._speech_end_at = time.monotonic() if at is None else at
+
+    def enqueue(self, pcm):
+        if self._muted:
+            return
+        if self._turn is None:
+            self._turn = {"speech_end_at": self._speech_end_at, "first_chunk_at": time.monotonic(),
+                          "bytes": 0, "interrupted": False}
+            self._speech_end_at = None
+        self._turn["bytes"] += len(pcm)
+        self.bytes += len(pcm)
+
+    def end_turn(self):
+        self._muted = False
+        self._close_turn()
+
+    def flush(self, reason="interrupted"):
+        self._muted = reason != "server" and self._turn is not None
+        if self._turn is None:
+            return False
+        self.flushes += 1
+        self._turn["interrupted"] = reason
+        self._close_turn()
+        return True
+
+    def _close_turn(self):
+        turn, self._turn = self._turn, None
+        if turn is None:
+            return
+        stats = {"bytes": turn["bytes"], "interrupted": turn["interrupted"]}
+        if turn["speech_end_at"] is not None:
+            stats["speech_end_to_first_chunk_ms"] = (turn["first_chunk_at"] - turn["speech_end_at"]) * 1000
+            TURN_FIRST_AUDIO_MS.observe(stats["speech_end_to_first_chunk_ms"])
+        self.turn_stats.append(stats)
+
+
+class NullLogger:
+    """DB 대신 개수만 센다"""
+
+    def __init__(self):
+        self.user_messages = 0
+        self.model_turns = 0
+
+    def append_text(self, text):
+        pass
+
+    def log_user_message(self, text):
+        self.user_messages += 1
+
+    def flush_model_turn(self):
+        self.model_turns += 1
+
+
+class LoopLagMonitor:
+    """interval마다 깨어나서 늦게 깨어난 만큼을 이벤트 루프 지연으로 기록"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+
+    async def run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.monotonic() - started - self.interval) * 1000)
+
+
+# ==========================================
+# [클래스] 녹화 응답을 돌려주는 가짜 Live 서버
+# ==========================================
+
+def split_turns(records):
+    """
+    RESPONSE 레코드를 턴 단위로 나눈다.
+    반환: [{"start": 첫 응답 시각, "after_speech_end": 발화 종료 후 지연(없으면 None), "responses": [(시각, 메타, 오디오)]}]
+    """
+    turns = []
+    current = None
+    last_speech_end = None
+    for t, kind, payload in records:
+        if kind == KIND_EVENT and b"audio_stream_end" in payload:
+            last_speech_end = t
+        elif kind == KIND_RESPONSE:
+            meta, audio = decode_response(payload)
+            if current is None:
+                current = {
+                    "start": t,
+                    "after_speech_end": t - last_speech_end if last_speech_end is not None else None,
+                    "responses": [],
+                }
+                last_speech_end = None
+            current["responses"].append((t, meta, audio))
+            if meta.get("turn_complete"):
+                turns.append(current)
+                current = None
+    if current is not None:
+        turns.append(current)
+    return turns
+
+
+class ReplayLiveSession(FakeLiveSession):
+    """
+    녹화된 턴을 돌려주는 가짜 세션.
+    발화 종료 뒤에 온 턴은 파이프라인이 audio_stream_end를 보낸 뒤 녹화 때 지연만큼 기다렸다 보내고,
+    그렇지 않은 턴(서버 VAD로 시작된 턴 등)은 녹화 시각에 맞춰 보낸다.
+    """
+
+    def __init__(self, turns, clock, speech_end_timeout=5.0):
+        super().__init__()
+        self.turns = turns
+        self.clock = clock
+        self.speech_end_timeout = speech_end_timeout
+        self._speech_ends = asyncio.Queue()
+        self.released = 0
+        self.unmatched = 0      # 발화 종료를 기다리다 녹화 시각으로 보낸 턴 수
+
+    async def send_realtime_input(self, **kwargs):
+        await super().send_realtime_input(**kwargs)
+        if kwargs.get("audio_stream_end"):
+            self._speech_ends.put_nowait(time.monotonic())
+
+    async def feed(self):
+        for turn in self.turns:
+            if turn["after_speech_end"] is not None:
+                try:
+                    wait = self.clock.until(turn["start"]) + self.speech_end_timeout
+                    speech_end = await asyncio.wait_for(self._speech_ends.get(), timeout=wait)
+                    await asyncio.sleep(max(0.0, speech_end + turn["after_speech_end"] / self.clock.speed
+                                            - time.monotonic()))
+                except asyncio.TimeoutError:
+                    self.unmatched += 1
+            else:
+                await asyncio.sleep(self.clock.until(turn["start"]))
+
+            responses = []
+            previous = turn["start"]
+            for t, meta, audio in turn["responses"]:
+                response = server_content(
+                    input_text=meta.get("input_text"),
+                    output_text=meta.get("output_text"),
+                    audio=audio or None,
+                    text=meta.get("text"),
+                    turn_complete=meta.get("turn_complete", False),
+                    interrupted=meta.get("interrupted", False),
+                    input_finished=meta.get("input_finished", False),
+                )
+                response.delay = (t - previous) / self.clock.speed
+                previous = t
+                responses.append(response)
+            self.add_turn(responses)
+            self.released += 1
+
+
+# ==========================================
+# [함수] 재생 실행
+# ==========================================
+
+async def replay(path, speed=1.0, drain_seconds=5.0, roi=True, audio_vad=True, target_kbps=250):
+    header, records = read_recording(path)
+    clock = ReplayClock(speed)
+
+    mic = ReplayMic([(t, p) for t, k, p in records if k == KIND_MIC], clock)
+    frames = ReplayFrames([(t, p) for t, k, p in records if k == KIND_FRAME], clock).start()
+    session = ReplayLiveSession(split_turns(records), clock)
+    player = ProbePlayer()
+    logger = NullLogger()
+
+    pipeline = LivePipeline(
+        session, frames, mic, player, logger,
+        transcripts=TranscriptRouter(logger, echo=False),
+        gate=SceneChangeGate(),
+        uplink=AdaptiveUplinkController(target_kbps=target_kbps),
+        encoder=FrameEncoder(max_pending=1),
+        roi_selector=RoiSelector() if roi else None,
+        audio_gate=AudioUplinkGate(vad=VoiceActivityDetector(frame_size=512)) if audio_vad else None,
+        show_window=False,
+    )
+    monitor = LoopLagMonitor()
+
+    async def finish_when_done():
+        await mic.finished.wait()
+        await asyncio.to_thread(frames.finished.wait, drain_seconds)
+        # 남은 턴이 다 나가고 재생될 때까지 조금 더 기다린다
+        deadline = time.monotonic() + drain_seconds
+        while time.monotonic() < deadline and (session.released < len(session.turns)
+                                                or not session._turns.empty()):
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.2)
+        pipeline.stop()
+
+    wall_start = time.monotonic()
+    cpu_start = time.process_time()
+    try:
+        await pipeline.run(session.feed(), monitor.run(), finish_when_done())
+    finally:
+        frames.stop()
+    wall = time.monotonic() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    latencies = [s["speech_end_to_first_chunk_ms"] for s in player.turn_stats if "speech_end_to_first_chunk_ms" in s]
+    return {
+        "recording": str(path),
+        "speed": speed,
+        "duration_s": round(wall, 2),
+        "cpu_s": round(cpu, 2),
+        "cpu_percent": round(cpu / wall * 100, 1) if wall else 0.0,
+        "turns": len(player.turn_stats),
+        "turns_recorded": len(session.turns),
+        "turns_unmatched": session.unmatched,
+        "speech_end_to_first_audio_ms": {
+            "count": len(latencies),
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "max": round(max(latencies), 1) if latencies else 0.0,
+        },
+        "loop_lag_ms": {
+            "p50": round(percentile(monitor.samples, 50), 2),
+            "p95": round(percentile(monitor.samples, 95), 2),
+            "max": round(max(monitor.samples), 2) if monitor.samples else 0.0,
+        },
+        "video_frames": session.count("video"),
+        "video_bytes": session.bytes_sent("video"),
+        "audio_chunks": session.count("audio"),
+        "audio_bytes": session.bytes_sent("audio"),
+        "speech_ends": session.count("audio_stream_end"),
+        "metrics": REGISTRY.snapshot(),
+    }
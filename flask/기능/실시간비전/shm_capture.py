@@ -0,0 +1,264 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from frame_sources import open_source
+
+# ==========================================
+# [클래스] 공유 메모리 프레임 버퍼 (트리플 버퍼 + 시퀀스 번호)
+# ==========================================
+# 카메라 캡처는 별도 프로세스에서 돌고, 프레임은 공유 메모리 슬롯에 바로 기록된다.
+# 화면 표시 / 인코더 / 감지기 같은 소비자는 최신 슬롯을 복사 없이 numpy 뷰로 읽는다.
+#
+# 헤더 (int64):
+#   [0] 최신 슬롯 번호  [1] 최신 시퀀스 번호  [2] 높이  [3] 너비  [4] 채널
+#   [5] 상태 (STATUS_*)  [6 ~ 6+슬롯수) 슬롯별 시퀀스 (쓰는 중이면 -1)
+#
+# 쓰기는 항상 '최신이 아닌' 슬롯에 하므로, 소비자가 받은 뷰는 그 뒤로 최소 (슬롯수-1)장이
+# 더 들어올 때까지 덮어써지지 않는다 (3슬롯, 30 FPS 기준 약 60ms). 그보다 오래 들고 있을
+# 프레임은 read_copy()로 복사한다 (복사 전후로 슬롯 시퀀스를 확인해서 찢어진 프레임은 버림).
+
+STATUS_STARTING = 0
+STATUS_RUNNING = 1
+STATUS_ENDED = 2
+STATUS_FAILED = -1
+
+_HEADER_FIELDS = 6
+_FRAME_ALIGN = 64
+
+
+def _attach_shared_memory(name):
+    """이미 만들어진 공유 메모리에 연결 (3.13+는 resource_tracker 등록 생략)"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameBuffer:
+    def __init__(self, shm, max_shape, slots, owner):
+        self._shm = shm
+        self.max_shape = tuple(max_shape)
+        self.slots = slots
+        self._owner = owner
+
+        header_len = _HEADER_FIELDS + slots
+        self._header = np.ndarray((header_len,), dtype=np.int64, buffer=shm.buf)
+        self._frame_offset = -(-header_len * 8 // _FRAME_ALIGN) * _FRAME_ALIGN
+        self._slot_bytes = int(np.prod(self.max_shape))
+        self._slot_seq = self._header[_HEADER_FIELDS:]
+
+    @classmethod
+    def create(cls, max_shape, slots=3):
+        """메인 프로세스에서 버퍼 생성 (max_shape = (높이, 너비, 채널))"""
+        header_len = _HEADER_FIELDS + slots
+        frame_offset = -(-header_len * 8 // _FRAME_ALIGN) * _FRAME_ALIGN
+        size = frame_offset + int(np.prod(max_shape)) * slots
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        buf = cls(shm, max_shape, slots, owner=True)
+        buf._header[:] = 0
+        buf._slot_seq[:] = 0
+        buf._header[0] = -1
+        return buf
+
+    @classmethod
+    def attach(cls, name, max_shape, slots=3):
+        """캡처 프로세스 쪽에서 기존 버퍼에 연결"""
+        return cls(_attach_shared_memory(name), max_shape, slots, owner=False)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def status(self):
+        return int(self._header[5])
+
+    @status.setter
+    def status(self, value):
+        self._header[5] = value
+
+    @property
+    def seq(self):
+        """가장 최근에 완성된 프레임의 시퀀스 번호 (아직 없으면 0)"""
+        return int(self._header[1])
+
+    def frame_shape(self):
+        h, w, c = (int(v) for v in self._header[2:5])
+        return (h, w, c) if c > 1 else (h, w)
+
+    def set_frame_shape(self, shape):
+        h, w = shape[:2]
+        c = shape[2] if len(shape) == 3 else 1
+        if h * w * c > self._slot_bytes:
+            raise ValueError(f"프레임 {shape}이(가) 공유 버퍼 크기 {self.max_shape}보다 큽니다")
+        self._header[2:5] = (h, w, c)
+
+    def slot_view(self, slot):
+        shape = self.frame_shape()
+        start = self._frame_offset + slot * self._slot_bytes
+        return np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf, offset=start)
+
+    # ---------- 쓰기 (캡처 프로세스) ----------
+
+    def next_write_slot(self):
+        """최신 슬롯이 아닌 다음 슬롯 번호"""
+        return (int(self._header[0]) + 1) % self.slots
+
+    def begin_write(self, slot):
+        self._slot_seq[slot] = -1
+        return self.slot_view(slot)
+
+    def commit(self, slot):
+        seq = int(self._header[1]) + 1
+        self._slot_seq[slot] = seq
+        self._header[0] = slot
+        self._header[1] = seq
+        return seq
+
+    # ---------- 읽기 (소비자) ----------
+
+    def latest(self):
+        """(시퀀스 번호, 프레임 뷰) - 아직 프레임이 없으면 (0, None). 복사하지 않는다."""
+        slot = int(self._header[0])
+        if slot < 0:
+            return 0, None
+        seq = int(self._slot_seq[slot])
+        if seq <= 0:
+            return 0, None
+        return seq, self.slot_view(slot)
+
+    def read_copy(self, seq):
+        """시퀀스 seq 프레임의 복사본 - 이미 덮어써졌거나 복사하는 동안 덮어써지면 None"""
+        matches = np.flatnonzero(self._slot_seq == seq) if seq > 0 else ()
+        if len(matches) == 0:
+            return None
+        slot = int(matches[0])
+        frame = self.slot_view(slot).copy()
+        # 복사하는 동안 캡처 프로세스가 이 슬롯에 쓰기 시작했으면 (-1 또는 새 번호) 앞뒤가 섞인 프레임
+        if int(self._slot_seq[slot]) != seq:
+            return None
+        return frame
+
+    def is_current(self, seq):
+        """해당 시퀀스의 프레임이 아직 덮어써지지 않았는지"""
+        return seq > 0 and seq in self._slot_seq
+
+    def close(self):
+        # numpy 뷰가 버퍼를 잡고 있으면 close가 실패하므로 먼저 놓는다
+        self._header = None
+        self._slot_seq = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# ==========================================
+# [프로세스] 카메라 캡처 워커
+# ==========================================
+# 소스는 웹캠뿐 아니라 동영상 파일 / 스트림 / 이미지 폴더 / 합성 프레임도 된다 (frame_sources.py).
+# 소스 프레임 크기가 공유 버퍼와 다르면 (파일이 1080p 등) 첫 프레임 크기에 맞춰 줄여서 넣는다.
+
+def _fit_frame_shape(shape, max_shape):
+    h, w = shape[:2]
+    max_h, max_w = max_shape[:2]
+    scale = min(1.0, max_h / h, max_w / w)
+    return (int(h * scale), int(w * scale)) + tuple(shape[2:])
+
+
+def _capture_worker(shm_name, max_shape, slots, source, width, height, fps, realtime, stop_event):
+    frames = SharedFrameBuffer.attach(shm_name, max_shape, slots)
+    cap = open_source(source, width=width, height=height, fps=fps, realtime=realtime)
+
+    try:
+        if not cap.isOpened():
+            frames.status = STATUS_FAILED
+            return
+
+        ret, frame = cap.read()
+        if not ret:
+            frames.status = STATUS_FAILED
+            return
+        frames.set_frame_shape(_fit_frame_shape(frame.shape, max_shape))
+        shape = frames.frame_shape()
+        # 크기를 정하려고 읽은 첫 프레임도 그대로 쓴다 (이미지 한 장 / 짧은 파일이면 이게 전부일 수 있음)
+        slot = frames.next_write_slot()
+        target = frames.begin_write(slot)
+        if frame.shape != shape:
+            cv2.resize(frame, (shape[1], shape[0]), dst=target, interpolation=cv2.INTER_AREA)
+        else:
+            np.copyto(target, frame)
+        frames.commit(slot)
+        frames.status = STATUS_RUNNING
+
+        while not stop_event.is_set():
+            slot = frames.next_write_slot()
+            target = frames.begin_write(slot)
+            # 가능하면 공유 메모리 슬롯에 바로 디코딩 (형태가 맞으면 OpenCV가 그대로 씀)
+            ret, frame = cap.read(target)
+            if not ret:
+                break
+            if frame.shape != shape:
+                cv2.resize(frame, (shape[1], shape[0]), dst=target, interpolation=cv2.INTER_AREA)
+            elif frame.ctypes.data != target.ctypes.data:
+                np.copyto(target, frame)
+            frames.commit(slot)
+    finally:
+        if frames.status == STATUS_RUNNING:
+            frames.status = STATUS_ENDED
+        cap.release()
+        frames.close()
+
+
+class CameraCaptureProcess:
+    def __init__(self, device=0, width=1280, height=720, slots=3, source=None, fps=None, realtime=True):
+        self.device = device
+        self.source = source if source is not None else device    # 소스 문자열 (frame_sources.open_source)
+        self.width = width
+        self.height = height
+        self.frames = SharedFrameBuffer.create((height, width, 3), slots=slots)
+        self._stop_event = mp.Event()
+        self._process = mp.Process(
+            target=_capture_worker,
+            args=(self.frames.name, self.frames.max_shape, slots, self.source, width, height, fps, realtime,
+                  self._stop_event),
+            name="camera-capture",
+            daemon=True,
+        )
+
+    def start(self):
+        self._process.start()
+
+    def wait_ready(self, timeout=10.0):
+        """첫 프레임이 들어오면 True, 카메라를 못 열었거나 시간 초과면 False (블로킹)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.frames.status == STATUS_FAILED:
+                return False
+            if self.frames.seq > 0:
+                return True
+            if not self._process.is_alive():
+                return False
+            time.sleep(0.01)
+        return False
+
+    @property
+    def running(self):
+        return self._process.is_alive() and self.frames.status != STATUS_ENDED
+
+    def stop(self):
+        self._stop_event.set()
+        if self._process.is_alive():
+            self._process.join(timeout=2.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        self.frames.close()
@@ -0,0 +1,142 @@
+import asyncio
+import pathlib
+import time
+import wave
+
+from metrics import REGISTRY, STARTUP_READY_MS
+
+# ==========================================
+# [클래스] 시작 단계 시간 측정 + 준비 장벽
+# ==========================================
+# 예전 main()은 오디오 -> 카메라 -> Live 연결 -> Firebase를 차례로 기다려서 키오스크가 켜지고
+# 몇 초 뒤에야 말을 걸 수 있었다. 서로 기다릴 필요가 없는 초기화는 barrier()로 동시에 돌리고,
+# 단계마다 (시작 기준 시작/끝 ms) 를 남겨 "켜진 뒤 첫 대화까지" 시간을 추적한다.
+
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}        # 이름 -> (시작 ms, 끝 ms)
+        self.ready_ms = None
+
+    def _now_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    async def phase(self, name, awaitable):
+        """awaitable 하나를 단계로 기록하며 기다린다"""
+        begin = self._now_ms()
+        try:
+            return await awaitable
+        finally:
+            end = self._now_ms()
+            self.phases[name] = (begin, end)
+            REGISTRY.gauge(f"vision_startup_{name}_ms", f"시작 단계 '{name}' 소요 시간").set(round(end - begin))
+
+    def mark(self, name):
+        """시작 기준 특정 시점 기록 (인사 재생 시작 등)"""
+        now = self._now_ms()
+        self.phases[name] = (now, now)
+        return now
+
+    async def barrier(self, **phases):
+        """
+        단계들을 동시에 실행하고 모두 끝날 때까지 기다린다 (= 준비 완료).
+        돌려주는 값: 이름 -> 결과 (실패한 단계는 예외 객체)
+        """
+        names = list(phases)
+        results = await asyncio.gather(*(self.phase(name, phases[name]) for name in names),
+                                       return_exceptions=True)
+        self.ready_ms = self._now_ms()
+        STARTUP_READY_MS.observe(self.ready_ms)
+        return dict(zip(names, results))
+
+    def summary(self):
+        parts = [f"{name} {end - begin:.0f}ms" if end > begin else f"{name} @{begin:.0f}ms"
+                 for name, (begin, end) in self.phases.items()]
+        text = ", ".join(parts)
+        if self.ready_ms is not None:
+            serial = sum(end - begin for begin, end in self.phases.values())
+            text += f" -> 준비 완료 {self.ready_ms:.0f}ms (순차 실행이었다면 약 {serial:.0f}ms)"
+        return text
+
+
+# ==========================================
+# [클래스] 로컬 인사말 (Live 연결을 기다리는 동안 재생)
+# ==========================================
+# Live 연결이 끝날 때까지 키오스크가 조용하지 않도록, 미리 만들어 둔 인사말 WAV를 바로 재생한다.
+# 파일은 `python vision.py --make-greeting`으로 한 번 만든다 (모델 목소리 그대로 저장).
+# 인사말을 재생했으면 모델이 다시 인사하지 않도록 지시문 뒤에 NOTE를 붙인다.
+
+
+class GreetingCache:
+    NOTE = "\n\n(안내: 첫 인사는 이미 음성으로 재생했다. 다시 인사하지 말고 사용자의 말에 바로 답해.)"
+    PROMPT = "키오스크 앞에 온 사용자에게 반갑게 짧게 인사해. 두 문장 이내로."
+
+    def __init__(self, path, rate=24000):
+        self.path = pathlib.Path(path)
+        self.rate = rate
+        self.pcm = None
+        self.played = False
+
+    def load(self):
+        """캐시된 인사말을 읽는다 (없거나 형식이 다르면 None)"""
+        if not self.path.exists():
+            return None
+        try:
+            with wave.open(str(self.path), "rb") as wav:
+                if wav.getframerate() != self.rate or wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                    print(f"⚠️ 인사말 형식이 다릅니다 ({self.path.name}) - 다시 만들어 주세요")
+                    return None
+                self.pcm = wav.readframes(wav.getnframes())
+        except Exception as e:
+            print(f"⚠️ 인사말 읽기 실패: {e}")
+            return None
+        return self.pcm
+
+    @property
+    def available(self):
+        return self.pcm is not None
+
+    @property
+    def duration_ms(self):
+        return len(self.pcm) / (self.rate * 2) * 1000 if self.pcm else 0.0
+
+    def play(self, player):
+        """재생 대기열에 넣는다 (사용자가 말을 시작하면 끼어들기로 끊긴다)"""
+        if self.pcm is None:
+            return False
+        player.enqueue(self.pcm)
+        player.end_turn()
+        self.played = True
+        return True
+
+    def save(self, pcm):
+        with wave.open(str(self.path), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.rate)
+            wav.writeframes(pcm)
+        self.pcm = pcm
+
+    async def record(self, connect):
+        """Live 세션에 인사를 시켜서 받은 음성을 캐시 파일로 저장 (connect: async context manager)"""
+        chunks = []
+        async with connect as session:
+            await session.send_client_content(
+                turns=[{"role": "user", "parts": [{"text": self.PROMPT}]}],
+                turn_complete=True,
+            )
+            async for response in session.receive():
+                content = response.server_content
+                if content is None:
+                    continue
+                if content.model_turn:
+                    for part in content.model_turn.parts:
+                        if part.inline_data:
+                            chunks.append(part.inline_data.data)
+                if content.turn_complete:
+                    break
+        pcm = b"".join(chunks)
+        if pcm:
+            self.save(pcm)
+        return pcm
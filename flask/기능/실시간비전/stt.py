@@ -0,0 +1,260 @@
+import queue
+import threading
+import time
+from collections import deque
+
+from audio_dsp import VoiceActivityDetector
+from metrics import STT_RECOGNIZE_MS
+
+# ==========================================
+# [클래스] STT 엔진 (교체 가능)
+# ==========================================
+# SpeechTranscriber는 엔진의 recognize()만 호출한다.
+# 인식 결과가 없으면 ""를 돌려주고, 네트워크/API 오류는 예외로 올린다.
+
+
+class RecognitionEngine:
+    name = "base"
+
+    def recognize(self, pcm, sample_rate, sample_width):
+        raise NotImplementedError
+
+
+class GoogleWebSpeechEngine(RecognitionEngine):
+    """Google Web Speech API (speech_recognition.recognize_google, 동기 호출)"""
+    name = "google"
+
+    def __init__(self, language="ko-KR"):
+        import speech_recognition as sr
+        self._sr = sr
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, pcm, sample_rate, sample_width):
+        # Raw PCM 데이터를 AudioData 객체로 변환
+        audio_source = self._sr.AudioData(bytes(pcm), sample_rate, sample_width)
+        try:
+            return self.recognizer.recognize_google(audio_source, language=self.language)
+        except self._sr.UnknownValueError:
+            # 인식 실패 (잡음 등) - 조용히 넘어감
+            return ""
+        except self._sr.RequestError as e:
+            raise RuntimeError(f"STT API 오류: {e}") from e
+
+
+class StubEngine(RecognitionEngine):
+    """네트워크 없이 고정 지연 후 고정 문장을 돌려주는 엔진 (테스트 / 부하 측정용)"""
+    name = "stub"
+
+    def __init__(self, text="테스트 발화", delay=0.0):
+        self.text = text
+        self.delay = delay
+        self.calls = 0
+
+    def recognize(self, pcm, sample_rate, sample_width):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if callable(self.text):
+            return self.text(pcm)
+        return self.text
+
+
+# ==========================================
+# [클래스] STT 처리기 (구간 분리 스레드 + 인식 워커 풀)
+# ==========================================
+# 구간 분리(VAD)는 한 스레드에서 끊김 없이 돌고, 잘라낸 발화는 크기 제한이 있는 대기열을 거쳐
+# 워커 여러 개가 동시에 인식한다. 대기열이 가득 차면 가장 오래된 발화를 버린다.
+# 결과는 발화 순서대로 내보낸다 (먼저 끝난 뒤쪽 발화는 앞 발화를 기다림).
+class SpeechTranscriber:
+    def __init__(self, logger, shared_state=None, engine=None, workers=2, max_pending=4,
+                 chunk_size=512, on_text=None):
+        self.logger = logger
+        self.shared_state = shared_state
+        self.engine = engine or GoogleWebSpeechEngine()
+        self.on_text = on_text          # 인식 결과 콜백 (선택)
+        self.audio_queue = queue.Queue()
+        self.running = True
+
+        # STT 설정
+        self.pause_threshold = 0.8    # 말 끊김 간주 시간 (초)
+        self.sample_rate = 16000
+        self.sample_width = 2         # 16-bit = 2 bytes
+        self.chunk_size = chunk_size
+        self.max_block_chunks = 16    # 한 번에 묶어서 처리할 최대 청크 수 (약 0.5초)
+        self.min_utterance_seconds = 0.5
+        self.max_utterance_seconds = 15
+
+        # 고정 임계값 대신 배경 소음에 맞춰 움직이는 VAD
+        self.vad = VoiceActivityDetector(frame_size=chunk_size)
+
+        # 인식 대기열 (seq, pcm, 잘린 시각)
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._pending_cond = threading.Condition()
+        self._next_seq = 0
+
+        # 순서 맞추기용 결과 보관 (seq -> 텍스트, 버려진 발화는 None)
+        self._results = {}
+        self._emit_seq = 0
+        self._results_lock = threading.Lock()
+
+        # 통계
+        self.utterances = 0
+        self.dropped = 0
+        self.recognized = 0
+        self.failed = 0
+        self.total_recognize_seconds = 0.0
+
+        self.workers = [
+            threading.Thread(target=self._worker_loop, name=f"stt-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+        self.thread = threading.Thread(target=self._process_loop, name="stt-segmenter", daemon=True)
+        self.thread.start()
+
+    @property
+    def pending(self):
+        """인식을 기다리는 발화 수"""
+        return len(self._pending)
+
+    def add_audio(self, data):
+        if self.running:
+            self.audio_queue.put(data)
+
+    def stop(self):
+        self.running = False
+        with self._pending_cond:
+            self._pending_cond.notify_all()
+        self.thread.join(timeout=1.0)
+        for worker in self.workers:
+            worker.join(timeout=1.0)
+
+    def _drain_block(self):
+        """큐에 쌓인 청크를 한 번에 꺼내 하나의 블록으로 합친다 (첫 청크는 최대 1초 대기)"""
+        chunks = [self.audio_queue.get(timeout=1.0)]
+        while len(chunks) < self.max_block_chunks:
+            try:
+                chunks.append(self.audio_queue.get_nowait())
+            except queue.Empty:
+                break
+        return b"".join(chunks)
+
+    def _process_loop(self):
+        print(f"👂 STT 리스너 시작 (한국어, 엔진: {self.engine.name}, 워커 {len(self.workers)}개)")
+
+        audio_buffer = bytearray()
+        silence_frames = 0
+        has_voice = False
+
+        # 1 프레임(청크) 당 시간 계산
+        # CHUNK_SIZE(512) / RATE(16000) = 0.032초
+        chunk_duration = self.chunk_size / self.sample_rate
+        pause_frame_count = int(self.pause_threshold / chunk_duration)
+        max_bytes = self.sample_rate * self.sample_width * self.max_utterance_seconds
+
+        while self.running:
+            try:
+                # 큐에서 오디오 블록 가져오기 (타임아웃 1초)
+                block = self._drain_block()
+
+                # 블록 전체의 음성 여부를 한 번에 계산 (RMS / 영교차율 / 스펙트럼 평탄도)
+                flags, frames = self.vad.process(block)
+
+                for is_voice, frame in zip(flags, frames):
+                    if is_voice:
+                        has_voice = True
+                        silence_frames = 0
+                    else:
+                        if has_voice:
+                            silence_frames += 1
+
+                    # 버퍼에 데이터 추가
+                    if has_voice:
+                        audio_buffer.extend(frame.tobytes())
+
+                    # 말이 끝났다고 판단되면 (일정 시간 침묵) 또는
+                    # 버퍼가 너무 커지면 (예: 15초 이상) 강제로 잘라서 인식 대기열로 (메모리 보호)
+                    if (has_voice and silence_frames > pause_frame_count) or len(audio_buffer) > max_bytes:
+                        self._submit(audio_buffer)
+
+                        # 초기화
+                        audio_buffer = bytearray()
+                        silence_frames = 0
+                        has_voice = False
+
+            except queue.Empty:
+                continue
+            except Exception as e:
+                print(f"STT 루프 오류: {e}")
+
+    def _submit(self, audio_data):
+        """잘라낸 발화를 인식 대기열에 넣는다 (가득 차면 가장 오래된 발화를 버림)"""
+        if len(audio_data) < self.sample_rate * self.sample_width * self.min_utterance_seconds: # 0.5초 미만은 무시
+            return
+
+        with self._pending_cond:
+            seq = self._next_seq
+            self._next_seq += 1
+            self.utterances += 1
+            if len(self._pending) >= self.max_pending:
+                old_seq, _, _ = self._pending.popleft()
+                self.dropped += 1
+                self._store_result(old_seq, None)
+            self._pending.append((seq, bytes(audio_data), time.monotonic()))
+            self._pending_cond.notify()
+
+    def _worker_loop(self):
+        while True:
+            with self._pending_cond:
+                while self.running and not self._pending:
+                    self._pending_cond.wait()
+                if not self.running:
+                    return
+                seq, pcm, _ = self._pending.popleft()
+
+            text = None
+            started = time.perf_counter()
+            try:
+                text = self.engine.recognize(pcm, self.sample_rate, self.sample_width)
+            except Exception as e:
+                self.failed += 1
+                print(f"STT 처리 중 오류: {e}")
+            elapsed = time.perf_counter() - started
+            self.total_recognize_seconds += elapsed
+            STT_RECOGNIZE_MS.observe(elapsed * 1000)
+            self._store_result(seq, text)
+
+    def _store_result(self, seq, text):
+        """결과를 보관하고, 앞 순서가 모두 끝났으면 순서대로 내보낸다"""
+        with self._results_lock:
+            self._results[seq] = text
+            while self._emit_seq in self._results:
+                ready = self._results.pop(self._emit_seq)
+                self._emit_seq += 1
+                if ready:
+                    self._emit(ready)
+
+    def _emit(self, text):
+        if not text.strip():
+            return
+        self.recognized += 1
+        print(f"\n[🗣️ User]: {text}")
+        if self.logger is not None:
+            self.logger.log_user_message(text)
+        if self.on_text is not None:
+            self.on_text(text)
+
+        # shared_state 접근이 어려우므로 로거를 통해 우회하거나 전역 변수 고려
+        # 여기서는 간단히 전역 shared_state가 없으므로 생략하거나
+        # SpeechTranscriber에 shared_state 참조를 넘겨주는 것이 좋음
+        if self.shared_state:
+            self.shared_state["display_text"] = "..."
+
+    def summary(self):
+        done = self.utterances - self.dropped
+        avg = self.total_recognize_seconds / done * 1000 if done else 0.0
+        return (f"발화 {self.utterances}개, 인식 {self.recognized}개, 버림 {self.dropped}개, "
+                f"오류 {self.failed}개, 평균 인식 {avg:.0f}ms")
@@ -0,0 +1,41 @@
+import asyncio
+
+# ==========================================
+# [클래스] 모델 턴 진행 상태 (턴 사이에만 끼워 넣을 메시지용)
+# ==========================================
+# 모델이 답하는 도중에 send_client_content를 보내면 그 답변이 끊기고 오디오가 잘린다.
+# 수신 루프가 모델 출력 / 도구 호출을 받으면 begin(), turn_complete나 interrupted를 받으면 end()를 부르고,
+# 페르소나 전환 / 화면 인식 맥락처럼 급하지 않은 메시지는 wait_idle()로 턴 사이까지 기다렸다가 보낸다.
+# (사용자가 말하는 동안은 모델 턴이 없으므로 바로 보낸다 - 다음 답변에 반영되는 게 목적)
+
+
+class TurnState:
+    def __init__(self):
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        # 통계
+        self.turns = 0
+        self.deferred = 0       # 턴이 끝나길 기다렸다가 보낸 메시지 수
+
+    @property
+    def in_turn(self):
+        return not self._idle.is_set()
+
+    def begin(self):
+        """모델 출력(음성 / 텍스트 / 도구 호출)을 받았을 때"""
+        if self._idle.is_set():
+            self._idle.clear()
+            self.turns += 1
+
+    def end(self):
+        """turn_complete 또는 interrupted를 받았을 때"""
+        self._idle.set()
+
+    async def wait_idle(self):
+        """진행 중인 모델 턴이 있으면 끝날 때까지 기다린다 (기다렸으면 True)"""
+        if self._idle.is_set():
+            return False
+        self.deferred += 1
+        await self._idle.wait()
+        return True
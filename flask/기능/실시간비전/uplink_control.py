@@ -0,0 +1,121 @@
+# ==========================================
+# [클래스] 비디오 업링크 적응 제어기
+# ==========================================
+# send_realtime_input(video=...) 한 번에 걸린 시간과 보낸 JPEG 크기를 측정해서
+# 해상도 / JPEG 품질 / 전송 주기를 목표 비트레이트에 맞게 조절한다.
+# 비트레이트는 실제로 보낸 바이트를 벽시계 시간으로 나눠서 잰다 (변화 없는 장면 / 화면 인식으로
+# 프레임을 건너뛰면 주기마다 한 장씩 보내지 않으므로 주기로 나누면 과대 추정된다).
+# 매장 Wi-Fi가 약할 때 비디오가 오디오 업링크를 막지 않도록 하는 것이 목적.
+
+import time
+from collections import deque
+
+# (가로, 세로, JPEG 품질) - 낮은 단계부터
+DEFAULT_LADDER = [
+    (320, 240, 35),
+    (480, 360, 40),
+    (640, 480, 50),
+    (800, 600, 60),
+    (960, 720, 70),
+]
+
+
+class AdaptiveUplinkController:
+    def __init__(self, target_kbps=250, ladder=None, min_interval=0.4, max_interval=2.0,
+                 start_level=2, congestion_ratio=0.5, adjust_every=4, smoothing=0.3, window=20):
+        self.target_bps = target_kbps * 1000
+        self.ladder = list(ladder or DEFAULT_LADDER)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.congestion_ratio = congestion_ratio  # 전송 시간이 주기의 이 비율을 넘으면 혼잡으로 판단
+        self.adjust_every = adjust_every          # 최소 몇 프레임마다 한 번 조절할지 (출렁임 방지)
+        self.smoothing = smoothing                # EWMA 계수
+
+        self.level = max(0, min(start_level, len(self.ladder) - 1))
+        self.interval = min_interval
+
+        self.avg_bytes = None
+        self.avg_send_time = None
+        self._sent = deque(maxlen=window)         # 현재 설정으로 보낸 (시각, 바이트)
+        self._samples_since_adjust = 0
+
+        # 통계
+        self.frames = 0
+        self.total_bytes = 0
+        self.last_send_time = 0.0
+        self.adjustments = 0
+
+    @property
+    def size(self):
+        w, h, _ = self.ladder[self.level]
+        return (w, h)
+
+    @property
+    def quality(self):
+        return self.ladder[self.level][2]
+
+    @property
+    def estimated_bps(self):
+        """현재 설정으로 실제 보낸 비트레이트 (한 장뿐이면 주기마다 보낸다고 가정한 추정치)"""
+        if len(self._sent) >= 2:
+            elapsed = self._sent[-1][0] - self._sent[0][0]
+            if elapsed > 0:
+                # 첫 프레임은 구간의 시작점이므로 그 뒤에 보낸 바이트만 센다
+                return sum(size for _, size in list(self._sent)[1:]) * 8 / elapsed
+        if self.avg_bytes is None:
+            return 0.0
+        return self.avg_bytes * 8 / self.interval
+
+    def _ewma(self, prev, value):
+        return value if prev is None else prev + self.smoothing * (value - prev)
+
+    def record(self, payload_bytes, send_seconds, now=None):
+        """프레임 1장 전송 결과 기록 후 필요하면 설정 조절 (now: 전송을 마친 monotonic 시각)"""
+        self._sent.append((time.monotonic() if now is None else now, payload_bytes))
+        self.frames += 1
+        self.total_bytes += payload_bytes
+        self.last_send_time = send_seconds
+        self.avg_bytes = self._ewma(self.avg_bytes, payload_bytes)
+        self.avg_send_time = self._ewma(self.avg_send_time, send_seconds)
+
+        self._samples_since_adjust += 1
+        if self._samples_since_adjust >= self.adjust_every:
+            self._adjust()
+
+    def _adjust(self):
+        congested = self.avg_send_time > self.interval * self.congestion_ratio
+        bps = self.estimated_bps
+        before = (self.level, self.interval)
+
+        if congested or bps > self.target_bps * 1.15:
+            # 줄이기: 화질 먼저 낮추고, 최저 단계면 전송 간격을 늘린다
+            if self.level > 0:
+                self.level -= 1
+            else:
+                self.interval = min(self.max_interval, self.interval * 1.25)
+        elif bps < self.target_bps * 0.7:
+            # 늘리기: 전송 간격부터 원래대로 되돌리고, 그다음 화질을 올린다
+            if self.interval > self.min_interval:
+                self.interval = max(self.min_interval, self.interval / 1.25)
+            elif self.level < len(self.ladder) - 1:
+                # 한 단계 올렸을 때 목표를 넘을 것 같으면 유지 (면적 비율로 대략 추정)
+                w, h, _ = self.ladder[self.level]
+                nw, nh, _ = self.ladder[self.level + 1]
+                if bps * (nw * nh) / (w * h) < self.target_bps:
+                    self.level += 1
+
+        if (self.level, self.interval) != before:
+            self.adjustments += 1
+            # 새 설정의 결과로 다시 평균을 잡는다 (이전 전송 시간이 남아 있으면
+            # 다음 조절에서도 혼잡으로 보고 단계가 연달아 내려간다)
+            self.avg_bytes = None
+            self.avg_send_time = None
+            self._sent.clear()
+        self._samples_since_adjust = 0
+
+    def summary(self):
+        w, h = self.size
+        return (f"{w}x{h} q{self.quality} 주기 {self.interval:.2f}s | "
+                f"예상 {self.estimated_bps / 1000:.0f}kbps / 목표 {self.target_bps / 1000:.0f}kbps | "
+                f"평균 전송 {1000 * (self.avg_send_time or 0):.0f}ms")
+
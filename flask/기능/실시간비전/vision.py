@@ -1,478 +1,413 @@
+import argparse
 import asyncio
 import os
 import cv2
 import pathlib
 import sys
-import time
 import pyaudio
 import warnings
 import traceback
-import threading
-import queue
-import speech_recognition as sr
-import audioop
-import sqlite3
-import textwrap
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import db
-from dotenv import load_dotenv
-
-# [수정] google.genai에서 types 임포트
+
+from frame_gate import SceneChangeGate
+from uplink_control import AdaptiveUplinkController
+from frame_encoder import FrameEncoder
+from shm_capture import CameraCaptureProcess
+from frame_sources import describe_source
+from roi import RoiSelector
+from audio_dsp import AudioUplinkGate, BargeInDetector, VoiceActivityDetector
+from audio_io import AudioPlayer, MicrophoneStream
+from stt import GoogleWebSpeechEngine, SpeechTranscriber
+from live_transcript import TranscriptRouter
+from session_record import SessionRecorder
+from live_session import ReconnectingSession
+from context_budget import ContextBudget, FRAME_TOKENS
+from persona import PersonaLibrary, PersonaSwitcher
+from turn_state import TurnState
+from startup import GreetingCache, StartupTimer
+from manual_index import ManualIndex, ManualPrefetcher, ManualSearch, load_manual_sections
+from visual_index import VisualIndex, VisualRecognizer
+from metrics import PLAYBACK_BUFFER_MS, REGISTRY, STT_QUEUE_DEPTH
+from db_logger import DatabaseLogger
+# Live 세션 설정(모델 / 페르소나 / 컨텍스트 / 도구)은 게이트웨이와 같이 쓴다
+from live_config import (API_KEY, CONTEXT_COMPRESSION, CONTEXT_TARGET_TOKENS, CONTEXT_TRIGGER_TOKENS, INPUT_RATE,
+                         LIVE_SESSION_RESUMPTION, MANUAL_CACHE_PATH, MANUAL_TOOL, METRICS_HOST, METRICS_PORT,
+                         MODEL_ID, OUTPUT_RATE, PERSONA_DEFAULT, TRANSCRIPT_SOURCE, VIDEO_MAX_CONTEXT_SHARE,
+                         VIDEO_MEDIA_RESOLUTION, VIDEO_MIN_INTERVAL, get_config)
+
 try:
     from google import genai
-    from google.genai import types
 except ImportError:
     print("❌ google-genai 라이브러리가 설치되지 않았습니다.")
     sys.exit(1)
 
+from live_pipeline import LivePipeline
+
 # [설정] 경고 메시지 숨기기
 warnings.filterwarnings("ignore")
 
 # ==========================================
-# [설정] 환경 변수
+# [설정] 환경 변수 (.env는 live_config.py에서 읽음)
 # ==========================================
 
-def load_environment():
-    try:
-        current_dir = pathlib.Path(__file__).parent.absolute()
-        env_path = None
-        for parent in [current_dir] + list(current_dir.parents):
-            check_path = parent / ".env"
-            if check_path.exists():
-                env_path = check_path
-                break
-
-        if env_path:
-            load_dotenv(dotenv_path=env_path)
-        else:
-            print("⚠️ .env 파일을 찾을 수 없습니다.")
-    except Exception as e:
-        print(f"❌ .env 로드 오류: {e}")
-
-load_environment()
-
-API_KEY = os.getenv("GEMINI_API_KEY")
 if not API_KEY:
     print("❌ API 키가 없습니다. .env 파일을 확인해주세요.")
     sys.exit(1)
 
-
-MODEL_ID = "gemini-2.5-flash-native-audio-preview-09-2025"
-#MODEL_ID = "gemini-2.5-flash"
-#MODEL_ID = "gemini-2.5-flash-preview-09-2025"
-#MODEL_ID = "gemini-2.0-flash"
-#MODEL_ID = "gemini-2.0-flash-exp"
-
 # [오디오 설정]
 AUDIO_FORMAT = pyaudio.paInt16
 CHANNELS = 1
-INPUT_RATE = 16000
-OUTPUT_RATE = 24000
 CHUNK_SIZE = 512
 MIC_DEVICE_INDEX = None
-
-# ==========================================
-# [함수] 설정 및 페르소나 로드
-# ==========================================
-
-def get_config():
-    current_dir = pathlib.Path(__file__).parent.absolute()
-    persona_path = current_dir / "persona_세탁법.txt"
-    
-    system_instruction = ""
-    if persona_path.exists():
-        try:
-            system_instruction = persona_path.read_text(encoding="utf-8")
-            print(f"🎭 페르소나 로드됨: {persona_path.name}")
-        except Exception:
-            pass
-    else:
-        system_instruction = "너는 도움이 되는 AI 어시스턴트야. 실시간으로 대화해."
-
-    return {
-        "response_modalities": ["AUDIO"],
-        "speech_config": {
-            "voice_config": {
-                "prebuilt_voice_config": {
-                    "voice_name": "Aoede"
-                }
-            }
-        },
-        "system_instruction": system_instruction
-    }
-
-# ==========================================
-# [클래스] DB 로그 저장 (Firebase Realtime Database)
-# ==========================================
-class DatabaseLogger:
-    def __init__(self, cred_path="firebase_key.json", database_url="https://YOUR_PROJECT_ID-default-rtdb.firebaseio.com/"):
-        self.cred_path = cred_path
-        self.database_url = database_url
-        self.buffer = []
-        self.session_id = None
-        self._init_firebase()
-        self._start_session()
-
-    def _init_firebase(self):
-        """Firebase 초기화"""
-        try:
-            # 이미 초기화되었는지 확인
-            if not firebase_admin._apps:
-                cred = credentials.Certificate(self.cred_path)
-                firebase_admin.initialize_app(cred, {
-                    'databaseURL': self.database_url
-                })
-                print("🔥 Firebase 연결 성공!")
-            else:
-                print("🔥 Firebase 이미 연결됨")
-        except Exception as e:
-            print(f"❌ Firebase 초기화 오류: {e}")
-            print("⚠️ firebase_key.json 파일과 database_url을 확인해주세요.")
-
-    def _start_session(self):
-        """새로운 대화 세션 시작"""
-        try:
-            # 세션 ID 생성 (타임스탬프 기반)
-            self.session_id = str(int(time.time()))
-            session_ref = db.reference(f'sessions/{self.session_id}')
-            
-            session_data = {
-                'start_time': time.strftime("%Y-%m-%d %H:%M:%S"),
-                'model_id': MODEL_ID
-            }
-            session_ref.set(session_data)
-            print(f"💾 Firebase 세션 시작됨: ID {self.session_id}")
-        except Exception as e:
-            print(f"❌ 세션 시작 오류: {e}")
-
-    def append_text(self, text):
-        self.buffer.append(text)
-
-    def log_user_message(self, text):
-        """사용자 메시지 저장"""
-        try:
-            if self.session_id:
-                messages_ref = db.reference(f'sessions/{self.session_id}/messages')
-                new_message_ref = messages_ref.push() # 고유 키 생성
-                
-                message_data = {
-                    'sender': 'user',
-                    'content': text,
-                    'created_at': time.strftime("%Y-%m-%d %H:%M:%S")
-                }
-                new_message_ref.set(message_data)
-        except Exception as e:
-            print(f"\n⚠️ Firebase 저장 실패 (User): {e}")
-
-    def flush_model_turn(self):
-        """모델 응답 저장"""
-        if not self.buffer: return
-        
-        full_text = "".join(self.buffer)
-        
-        try:
-            if self.session_id:
-                messages_ref = db.reference(f'sessions/{self.session_id}/messages')
-                new_message_ref = messages_ref.push()
-                
-                message_data = {
-                    'sender': 'gemini',
-                    'content': full_text,
-                    'created_at': time.strftime("%Y-%m-%d %H:%M:%S")
-                }
-                new_message_ref.set(message_data)
-        except Exception as e:
-            print(f"\n⚠️ Firebase 저장 실패 (Gemini): {e}")
-            
-        self.buffer = []
-    
-    def save_feedback(self, score):
-        """피드백 저장"""
-        try:
-            if self.session_id:
-                session_ref = db.reference(f'sessions/{self.session_id}')
-                session_ref.update({
-                    'feedback': score
-                })
-                print("✅ Firebase에 피드백 저장 완료!")
-        except Exception as e:
-            print(f"❌ 피드백 저장 오류: {e}")
-
-# ==========================================
-# [클래스] STT 처리기 (백그라운드 스레드)
-# ==========================================
-class SpeechTranscriber:
-    def __init__(self, logger, shared_state=None):
-        self.logger = logger
-        self.shared_state = shared_state
-        self.audio_queue = queue.Queue()
-        self.running = True
-        self.recognizer = sr.Recognizer()
-        
-        # STT 설정
-        self.energy_threshold = 1000  # 음성 감지 임계값 (조절 필요)
-        self.pause_threshold = 0.8    # 말 끊김 간주 시간 (초)
-        self.sample_rate = 16000
-        self.sample_width = 2         # 16-bit = 2 bytes
-
-        self.thread = threading.Thread(target=self._process_loop, daemon=True)
-        self.thread.start()
-    
-    def add_audio(self, data):
-        if self.running:
-            self.audio_queue.put(data)
-            
-    def stop(self):
-        self.running = False
-        self.thread.join(timeout=1.0)
-
-    def _process_loop(self):
-        print("👂 STT 리스너 시작 (한국어)")
-        
-        audio_buffer = bytearray()
-        silence_frames = 0
-        has_voice = False
-        
-        # 1 프레임(청크) 당 시간 계산
-        # CHUNK_SIZE(512) / RATE(16000) = 0.032초
-        chunk_duration = 512 / 16000
-        pause_frame_count = int(self.pause_threshold / chunk_duration)
-        
-        while self.running:
-            try:
-                # 큐에서 오디오 청크 가져오기 (타임아웃 1초)
-                data = self.audio_queue.get(timeout=1.0)
-                
-                # 에너지(소리 크기) 계산
-                rms = audioop.rms(data, self.sample_width)
-                
-                if rms > self.energy_threshold:
-                    has_voice = True
-                    silence_frames = 0
-                else:
-                    if has_voice:
-                        silence_frames += 1
-                
-                # 버퍼에 데이터 추가
-                if has_voice:
-                    audio_buffer.extend(data)
-                
-                # 말이 끝났다고 판단되면 (일정 시간 침묵)
-                if has_voice and silence_frames > pause_frame_count:
-                    # 인식 수행
-                    self._recognize(audio_buffer)
-                    
-                    # 초기화
-                    audio_buffer = bytearray()
-                    silence_frames = 0
-                    has_voice = False
-                    
-                # 버퍼가 너무 커지면 (예: 15초 이상) 강제 인식 (메모리 보호)
-                if len(audio_buffer) > 16000 * 2 * 15:
-                    self._recognize(audio_buffer)
-                    audio_buffer = bytearray()
-                    silence_frames = 0
-                    has_voice = False
-
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"STT 루프 오류: {e}")
-                
-    def _recognize(self, audio_data):
-        if len(audio_data) < 16000 * 2 * 0.5: # 0.5초 미만은 무시
-            return
-            
-        try:
-            # Raw PCM 데이터를 AudioData 객체로 변환
-            audio_source = sr.AudioData(bytes(audio_data), self.sample_rate, self.sample_width)
-            
-            # Google Web Speech API 호출 (동기)
-            text = self.recognizer.recognize_google(audio_source, language="ko-KR")
-            if text.strip():
-                print(f"\n[🗣️ User]: {text}")
-                self.logger.log_user_message(text)
-                
-                # shared_state 접근이 어려우므로 로거를 통해 우회하거나 전역 변수 고려
-                # 여기서는 간단히 전역 shared_state가 없으므로 생략하거나 
-                # SpeechTranscriber에 shared_state 참조를 넘겨주는 것이 좋음
-                if hasattr(self, 'shared_state') and self.shared_state:
-                     self.shared_state["display_text"] = "..."
-                
-        except sr.UnknownValueError:
-            # 인식 실패 (잡음 등) - 조용히 넘어감
-            pass
-        except sr.RequestError as e:
-            print(f"STT API 오류: {e}")
-        except Exception as e:
-            print(f"STT 처리 중 오류: {e}")
+MIC_FRAME_MS = 100               # 마이크 입력을 이 길이(ms)로 묶어서 전송 (100~200 권장)
+MIC_BUFFER_SECONDS = 2.0         # 콜백 링 버퍼 크기 (초)
+PLAYBACK_PREBUFFER_MS = 80       # 재생 시작 전에 모아둘 모델 오디오 양 (지터 버퍼)
+PLAYBACK_LOCAL_BARGE_IN = True   # 로컬 VAD가 사용자 발화를 감지하면 재생 중인 답변을 즉시 끊음
+BARGE_IN_ECHO_RATIO = 2.5        # 재생 중에는 VAD 임계값의 이 배수보다 커야 끼어들기 (스피커 소리 되울림 무시)
+BARGE_IN_MIN_SPEECH_MS = 300     # 재생 중 끼어들기로 인정할 최소 발화 길이 (ms)
+
+# [STT 설정]
+STT_WORKERS = 2                  # 동시에 인식 요청을 보낼 워커 수
+STT_MAX_PENDING = 4              # 인식 대기 발화 수 상한 (넘치면 가장 오래된 발화를 버림)
+AUDIO_UPLINK_VAD = True          # True: 말하는 구간(+앞뒤 여유)만 전송하고 무음은 보내지 않음
+AUDIO_PRE_ROLL_FRAMES = 10       # 말 시작 전 함께 보낼 청크 수 (10 x 32ms)
+AUDIO_POST_ROLL_FRAMES = 15      # 말이 끝난 뒤 더 보낼 청크 수 (15 x 32ms)
+
+# [카메라 설정]
+CAMERA_DEVICE_INDEX = 0
+CAMERA_WIDTH = 1280              # 내 화면용 해상도 (고해상도)
+CAMERA_HEIGHT = 720
+CAMERA_BUFFER_SLOTS = 3          # 공유 메모리 프레임 슬롯 수 (트리플 버퍼)
+# 프레임 소스: 웹캠 번호 / 동영상 파일 / rtsp://·http:// 스트림 / 이미지 폴더 / "synthetic" (frame_sources.py)
+CAMERA_SOURCE = os.getenv("VISION_SOURCE", str(CAMERA_DEVICE_INDEX))
+HEADLESS = os.getenv("VISION_HEADLESS") == "1"   # True: 미리보기 창을 띄우지 않음 (서버 박스용)
+
+# [비디오 전송 설정]
+VIDEO_MAX_INTERVAL = 2.0         # 회선이 나쁠 때 늘어날 수 있는 최대 전송 간격 (초)
+VIDEO_TARGET_KBPS = 250          # 비디오 업링크 목표 비트레이트 (해상도/품질/주기를 자동 조절)
+VIDEO_ENCODE_QUEUE_SIZE = 1      # 전송 대기 중인 인코딩 완료 프레임 수 (넘치면 오래된 것부터 버림)
+VIDEO_ROI_MODE = "auto"          # "auto": 장면 변화 시 조작부/얼룩 등 관심 영역을 원본 해상도로 잘라 전송, "off": 항상 전체 화면
+VIDEO_CHECK_INTERVAL = 0.1       # 장면 변화 확인 주기 (초)
+VIDEO_DIFF_THRESHOLD = 6.0       # 썸네일 평균 픽셀 차이가 이 값 이상이면 장면 변화로 간주
+VIDEO_HEARTBEAT_INTERVAL = 5.0   # 장면 변화가 없을 때 하트비트 전송 간격 (초)
+
+# [지표 설정]
+METRICS_DUMP_PATH = os.getenv("VISION_METRICS_DUMP")          # 지정하면 주기적으로 JSON 스냅샷 저장
+METRICS_DUMP_INTERVAL = 10.0     # JSON 덤프 주기 (초)
+
+# [페르소나 설정]
+PERSONA_AUTO_SWITCH = True        # 사용자 발화에서 의도가 바뀌면 세션을 끊지 않고 페르소나 전환
+
+# [재연결 설정]
+RECONNECT_BASE_DELAY = 0.5       # 재연결 첫 대기 (초, 실패할 때마다 2배 + 지터)
+RECONNECT_MAX_DELAY = 15.0       # 재연결 대기 상한 (초)
+RECONNECT_GAP_SECONDS = 5.0      # 끊긴 동안 보관했다가 다시 보낼 오디오 길이 (초)
+RECONNECT_MAX_ATTEMPTS = 10      # 한 번 끊겼을 때 재연결 시도 상한 (다 실패하면 상담 종료)
+RECONNECT_HANDLE_ATTEMPTS = 3    # 재개 핸들로 이만큼 실패하면 핸들을 버리고 새 세션으로 연결
+
+# [매뉴얼 검색 설정]
+MANUAL_PREFETCH = True           # 사용자가 말하는 중에 전사 조각으로 미리 검색 (도구 호출 때 바로 답함)
+
+# [화면 인식 설정]
+VISUAL_INDEX = True              # 보낼 프레임을 기준 사진(조작부 / 설명서 조각)과 로컬에서 비교해 알아본 것을 텍스트로 알림
+VISUAL_REFERENCES = [            # (이미지 경로, 라벨, 모델에게 알려줄 설명)
+    (pathlib.Path(__file__).parents[2] / "assets" / "세탁기_조작부.jpeg", "세탁기 조작부",
+     "드럼 세탁기 조작부 (코스 선택 다이얼, 표시창, 옵션 버튼)"),
+]
+VISUAL_REFS_DIR = pathlib.Path(__file__).parent.absolute() / "visual_refs"  # 추가 기준 사진 + labels.json (에러 표시창 등)
+VISUAL_MIN_INLIERS = 15          # 이만큼 특징점이 기하적으로 맞아야 인식
+VISUAL_INTERVAL_SCALE = 2.0      # 알아본 대상이 계속 보이는 동안 영상 전송 간격 배수
+VISUAL_RESEND_INTERVAL = None    # 같은 대상을 다시 알려주기까지 최소 간격 (초, None이면 세션당 한 번)
+
+# [시작 설정]
+GREETING_PATH = pathlib.Path(__file__).parent.absolute() / "greeting.wav"   # Live 연결 중 재생할 인사말 (--make-greeting)
+
+# [녹화 설정]
+SESSION_RECORD_PATH = os.getenv("VISION_RECORD_PATH")   # 지정하면 세션 입력/응답을 녹화 (테스트/세션재생확인.py로 재생)
 
 # ==========================================
 # [메인] 실행 루프
 # ==========================================
 
-async def main():
+async def main(source=CAMERA_SOURCE, headless=HEADLESS):
     try:
+        timer = StartupTimer()
+        loop = asyncio.get_running_loop()
         client = genai.Client(api_key=API_KEY)
-        config = get_config()
-        p = pyaudio.PyAudio()
-        
-        input_stream = None
-        output_stream = None
-
-        try:
-            output_stream = p.open(format=AUDIO_FORMAT, channels=CHANNELS, rate=OUTPUT_RATE, output=True)
-            input_stream = p.open(format=AUDIO_FORMAT, channels=CHANNELS, rate=INPUT_RATE, input=True, 
-                                  input_device_index=MIC_DEVICE_INDEX, frames_per_buffer=CHUNK_SIZE)
-        except Exception as e:
-            print(f"❌ 오디오 초기화 오류: {e}")
+        personas = PersonaLibrary()
+        config = get_config(personas)
+
+        # 캐시된 인사말이 있으면 연결을 기다리는 동안 재생하고, 모델은 다시 인사하지 않게 한다
+        greeting = GreetingCache(GREETING_PATH, rate=OUTPUT_RATE)
+        instruction_note = ""
+        if greeting.load() is not None:
+            instruction_note = GreetingCache.NOTE
+            config["system_instruction"] += instruction_note
+
+        def open_audio():
+            pa = pyaudio.PyAudio()
+            out = None
+            try:
+                # 재생은 전용 스레드 (수신 루프가 output_stream.write()에서 막히지 않도록)
+                out = AudioPlayer(pa, rate=OUTPUT_RATE, channels=CHANNELS, sample_format=AUDIO_FORMAT,
+                                  prebuffer_ms=PLAYBACK_PREBUFFER_MS).start()
+                # 마이크는 콜백 모드 (PortAudio 스레드가 링 버퍼에 쓰고 루프는 묶음 단위로 꺼냄)
+                inp = MicrophoneStream(pa, rate=INPUT_RATE, channels=CHANNELS, chunk_size=CHUNK_SIZE,
+                                       frame_ms=MIC_FRAME_MS, buffer_seconds=MIC_BUFFER_SECONDS,
+                                       device_index=MIC_DEVICE_INDEX, sample_format=AUDIO_FORMAT).start(loop)
+            except Exception:
+                if out is not None:
+                    out.stop()
+                pa.terminate()
+                raise
+            return pa, out, inp
+
+        async def start_audio():
+            audio = await asyncio.to_thread(open_audio)
+            if greeting.play(audio[1]):
+                timer.mark("greeting")
+            return audio
+
+        def open_manual():
+            index = ManualIndex(load_manual_sections(MANUAL_CACHE_PATH))
+            return ManualSearch(index)
+
+        def open_visual_index():
+            index = VisualIndex(min_inliers=VISUAL_MIN_INLIERS)
+            for path, label, text in VISUAL_REFERENCES:
+                if path.exists():
+                    index.add_file(path, label, text)
+            index.add_directory(VISUAL_REFS_DIR)
+            return index
+
+        # 카메라는 별도 프로세스에서 캡처 -> 공유 메모리 (이벤트 루프는 cap.read()를 기다리지 않음)
+        camera = CameraCaptureProcess(
+            width=CAMERA_WIDTH,
+            height=CAMERA_HEIGHT,
+            slots=CAMERA_BUFFER_SLOTS,
+            source=source,
+        )
+        camera.start()
+        frames = camera.frames
+
+        # 끊기면 마지막 재개 핸들을 넣은 설정으로 다시 연결 (카메라/마이크/로거는 그대로 유지)
+        switcher = None
+
+        def connect(handle):
+            session_config = config
+            if LIVE_SESSION_RESUMPTION:
+                session_config = dict(config, session_resumption={"handle": handle})
+            if handle is None and switcher is not None:
+                # 맥락 없이 새로 붙는 경우 - 전환된 페르소나로 시작
+                session_config = dict(session_config,
+                                      system_instruction=personas.text(switcher.current) + instruction_note)
+            return client.aio.live.connect(model=MODEL_ID, config=session_config)
+
+        live = ReconnectingSession(
+            connect,
+            base_delay=RECONNECT_BASE_DELAY,
+            max_delay=RECONNECT_MAX_DELAY,
+            max_gap_seconds=RECONNECT_GAP_SECONDS,
+            audio_bytes_per_second=INPUT_RATE * 2 * CHANNELS,
+            max_attempts=RECONNECT_MAX_ATTEMPTS,
+            handle_attempts=RECONNECT_HANDLE_ATTEMPTS,
+        )
+
+        # 오디오 장치 / 카메라 / Live 연결 / 로컬 로그 DB를 동시에 준비하고 모두 끝날 때까지 기다린다
+        print(f"\n🚀 모델({MODEL_ID}) 연결 중... (오디오 / 카메라 동시 준비)")
+        ready = await timer.barrier(
+            audio=start_audio(),
+            camera=asyncio.to_thread(camera.wait_ready),
+            live=live.__aenter__(),
+            logger=asyncio.to_thread(DatabaseLogger),
+            manual=asyncio.to_thread(open_manual) if MANUAL_TOOL else asyncio.sleep(0),
+            visual=asyncio.to_thread(open_visual_index) if VISUAL_INDEX else asyncio.sleep(0),
+        )
+        p, player, mic = ready["audio"] if isinstance(ready["audio"], tuple) else (None, None, None)
+        logger = ready["logger"] if isinstance(ready["logger"], DatabaseLogger) else None
+
+        failed = None
+        if p is None:
+            failed = f"오디오 초기화 오류: {ready['audio']}"
+        elif ready["camera"] is not True:
+            failed = f"프레임 소스를 열 수 없습니다: {describe_source(source)}"
+        elif isinstance(ready["live"], BaseException):
+            failed = f"Live 연결 오류: {ready['live']}"
+        elif logger is None:
+            failed = f"로그 DB 초기화 오류: {ready['logger']}"
+        if failed:
+            print(f"❌ {failed}")
+            await live.close()
+            camera.stop()
+            if logger is not None:
+                logger.close()
+            if player: player.stop()
+            if mic: mic.stop()
+            if p: p.terminate()
             return
 
-        cap = cv2.VideoCapture(0)
-        # 내 화면용 해상도 (고해상도)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        # 매뉴얼 색인은 없어도 대화는 된다 (도구가 '찾지 못함'으로 답함)
+        manual = ready["manual"] if isinstance(ready["manual"], ManualSearch) else None
+        if manual is not None:
+            print(f"📚 매뉴얼 검색: {manual.summary()}")
+        elif MANUAL_TOOL:
+            print(f"⚠️ 매뉴얼 색인 준비 실패 - 설명서 없이 진행: {ready['manual']}")
 
-        if not cap.isOpened():
-            print("❌ 웹캠을 찾을 수 없습니다.")
-            return
+        # 화면 인식도 선택 기능 - 기준 사진이 하나도 없으면 끈다
+        visual_index = ready["visual"] if isinstance(ready["visual"], VisualIndex) and len(ready["visual"]) else None
+        if visual_index is not None:
+            print(f"👁️ 화면 인식: 기준 {len(visual_index)}개 ({', '.join(ref.label for ref in visual_index.references)})")
+        elif VISUAL_INDEX:
+            reason = ready["visual"] if isinstance(ready["visual"], BaseException) else "기준 사진 없음"
+            print(f"⚠️ 화면 인식 준비 실패 - 영상만으로 진행: {reason}")
 
-        print(f"\n🚀 모델({MODEL_ID}) 연결 중...")
+        print(f"📷 프레임 소스: {describe_source(source)}{' (헤드리스)' if headless else ''}")
+        print(f"⏱️ 시작: {timer.summary()}")
 
 
         # 공유 데이터 컨테이너 (미리 정의하여 STT에 전달)
         shared_state = {
-            "latest_frame": None, 
             "running": True,
             "display_text": "안녕하세요!" 
         }
 
-        logger = DatabaseLogger()
-        stt_transcriber = SpeechTranscriber(logger, shared_state)
+        # 사용자 발화 텍스트: Live 세션 전사를 쓰면 별도 STT는 띄우지 않는다
+        stt_transcriber = None
+        transcripts = None
+        if TRANSCRIPT_SOURCE == "live":
+            transcripts = TranscriptRouter(logger)
+        else:
+            stt_transcriber = SpeechTranscriber(logger, shared_state, engine=GoogleWebSpeechEngine(language="ko-KR"),
+                                                workers=STT_WORKERS, max_pending=STT_MAX_PENDING,
+                                                chunk_size=CHUNK_SIZE)
+
+        # 지표: 재생 버퍼 / STT 대기열은 샘플러 스레드가 주기적으로 읽는다
+        REGISTRY.track(PLAYBACK_BUFFER_MS, lambda: player.buffered_ms or None)   # 재생 중일 때만
+        if stt_transcriber is not None:
+            REGISTRY.track(STT_QUEUE_DEPTH, lambda: stt_transcriber.pending)
+        REGISTRY.gauge("vision_firebase_outbox_pending", "아직 올라가지 않은 로그 행 수",
+                       fn=logger.outbox.pending_count)
+        if METRICS_PORT:
+            try:
+                REGISTRY.serve(METRICS_PORT, host=METRICS_HOST)
+                print(f"📈 지표: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+            except OSError as e:
+                print(f"⚠️ 지표 서버 시작 실패: {e}")
+        if METRICS_DUMP_PATH:
+            REGISTRY.dump_every(METRICS_DUMP_PATH, METRICS_DUMP_INTERVAL)
+
+        recorder = None
+        if SESSION_RECORD_PATH:
+            recorder = SessionRecorder(SESSION_RECORD_PATH, model_id=MODEL_ID, mic_rate=INPUT_RATE,
+                                       output_rate=OUTPUT_RATE)
+            print(f"⏺️ 세션 녹화 중: {SESSION_RECORD_PATH}")
 
         try:
-            async with client.aio.live.connect(model=MODEL_ID, config=config) as session:
+            # 위에서 이미 연결됨 - 끝날 때 닫기 위해 컨텍스트로 감싼다
+            async with live as session:
                 print("✅ 연결 성공! 대화를 시작하세요. (종료: Ctrl+C 또는 화면에서 'q')")
                 
-                # -------------------------------------------------------
-                # [Task 1] 비디오 처리 (화면 표시 + 전송 분리)
-                # -------------------------------------------------------
-                
-                async def capture_and_display():
-                    print("📷 카메라 캡처 시작")
-                    while shared_state["running"]:
-                        ret, frame = cap.read()
-                        if not ret: 
-                            print("❌ 카메라 프레임 읽기 실패")
-                            break
-
-                        shared_state["latest_frame"] = frame.copy()
-
-                        cv2.imshow('Gemini Live Vision', frame)
-                        if cv2.waitKey(1) & 0xFF == ord('q'):
-                            shared_state["running"] = False
-                            break
-                        
-                        # 화면 갱신 (약 30 FPS)
-                        await asyncio.sleep(0.03)
-                async def send_video_frames():
-                    print("📡 비디오 전송 데몬 시작")
-                    while shared_state["running"]:
-                        if shared_state["latest_frame"] is not None:
-                            frame = shared_state["latest_frame"]
-                            
-                            # 전송 규격 640x480
-                            frame_resized = cv2.resize(frame, (640, 480))
-                            _, buffer = cv2.imencode('.jpg', frame_resized, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
-                            
-                            try:
-                                await session.send_realtime_input(
-                                    video=types.Blob(
-                                        data=buffer.tobytes(), 
-                                        mime_type="image/jpeg"
-                                    )
-                                )
-                            except TypeError:
-                                await session.send_realtime_input(
-                                    data=buffer.tobytes(), 
-                                    mime_type="image/jpeg"
-                                )
-                            except Exception as e:
-                                print(f"비디오 전송 오류 (무시됨): {e}")
-                        
-                        # 전송 주기 (0.4초 = 2.5 FPS)
-                        await asyncio.sleep(0.4)
-                
-                # -------------------------------------------------------
-                # [Task 2] 오디오 입력
-                # -------------------------------------------------------
-                async def send_audio_stream():
-                    print("🎙️ 마이크 전송 시작")
-                    while True:
-                        try:
-                            data = await asyncio.to_thread(input_stream.read, CHUNK_SIZE, exception_on_overflow=False)
-                            
-                            # STT 처리를 위해 데이터 복사본 전달
-                            stt_transcriber.add_audio(data)
-                            
-                            # [수정] 문서를 참고하여 audio=types.Blob(...) 형태로 전송
-                            await session.send_realtime_input(
-                                audio=types.Blob(
-                                    data=data, 
-                                    mime_type="audio/pcm;rate=16000"
-                                )
-                            )
-                        except Exception as e:
-                            print(f"오디오 전송 오류: {e}")
-                            break
-
-                # -------------------------------------------------------
-                # [Task 3] 응답 수신
-                # -------------------------------------------------------
-                async def receive_response():
-                    while True:
-                        try:
-                            async for response in session.receive():
-                                if response.server_content:
-                                    model_turn = response.server_content.model_turn
-                                    if model_turn:
-                                        for part in model_turn.parts:
-                                            if part.inline_data:
-                                                output_stream.write(part.inline_data.data)
-                                            if part.text:
-                                                print(part.text, end="", flush=True)
-                                                logger.append_text(part.text)
-
-                                    # 턴이 끝났는지 확인 (API 버전에 따라 다를 수 있음)
-                                    # turn_complete가 명시적으로 오면 저장
-                                    if getattr(response.server_content, "turn_complete", False):
-                                        logger.flush_model_turn()
-                                        
-                        except Exception as e:
-                            print(f"수신 오류: {e}")
-                            break
-
-                video_display_task = asyncio.create_task(capture_and_display())
-                video_sender_task = asyncio.create_task(send_video_frames())
-                audio_task = asyncio.create_task(send_audio_stream())
-                recv_task = asyncio.create_task(receive_response())
-
-                try:
-                    # 카메라 창이 닫힐 때까지 대기
-                    await video_display_task
-                except asyncio.CancelledError:
-                    pass
-                finally:
-                    video_sender_task.cancel()
-                    audio_task.cancel()
-                    recv_task.cancel()
+                # 전송 쪽 상태 (선별 / 업링크 제어 / 인코더)
+                gate = SceneChangeGate(
+                    diff_threshold=VIDEO_DIFF_THRESHOLD,
+                    heartbeat_interval=VIDEO_HEARTBEAT_INTERVAL,
+                )
+                uplink = AdaptiveUplinkController(
+                    target_kbps=VIDEO_TARGET_KBPS,
+                    min_interval=VIDEO_MIN_INTERVAL,
+                    max_interval=VIDEO_MAX_INTERVAL,
+                )
+                # 컨텍스트 토큰 추정 (비디오가 창을 너무 많이 차지하면 비디오부터 줄임)
+                context = ContextBudget(
+                    trigger_tokens=CONTEXT_TRIGGER_TOKENS if CONTEXT_COMPRESSION else None,
+                    target_tokens=CONTEXT_TARGET_TOKENS,
+                    frame_tokens=FRAME_TOKENS.get(VIDEO_MEDIA_RESOLUTION, 258),
+                    max_video_share=VIDEO_MAX_CONTEXT_SHARE,
+                    input_rate=INPUT_RATE,
+                    output_rate=OUTPUT_RATE,
+                )
+
+                audio_gate = None
+                if AUDIO_UPLINK_VAD:
+                    audio_gate = AudioUplinkGate(
+                        vad=VoiceActivityDetector(frame_size=CHUNK_SIZE),
+                        pre_roll_frames=AUDIO_PRE_ROLL_FRAMES,
+                        post_roll_frames=AUDIO_POST_ROLL_FRAMES,
+                    )
+
+                # 사용자 발화 텍스트로 미리 하는 일
+                # - 페르소나 전환: 의도가 바뀌면 세션 안에서 지시문만 바꾼다 (모델이 답하는 중이면 턴이 끝난 뒤에)
+                # - 매뉴얼 미리 찾기: search_manual 호출이 오기 전에 결과를 준비해 둔다
+                turn_state = TurnState()
+                switcher = PersonaSwitcher(session, personas, PERSONA_DEFAULT, turn_state=turn_state)
+                text_handlers = []
+                if PERSONA_AUTO_SWITCH:
+                    text_handlers.append(switcher.on_text)
+                if MANUAL_PREFETCH and manual is not None:
+                    text_handlers.append(ManualPrefetcher(manual).on_partial)
+
+                def on_user_text(text):
+                    for handler in text_handlers:
+                        handler(text)
+
+                if transcripts is not None:
+                    transcripts.on_partial = on_user_text     # 발화 중간 조각마다 (말이 끝나기 전에)
+                elif stt_transcriber is not None:
+                    # STT는 발화가 끝나야 결과가 나오지만 모델 응답(도구 호출)보다는 대개 먼저 온다
+                    stt_transcriber.on_text = lambda text: loop.call_soon_threadsafe(on_user_text, text)
+
+                # 로컬 화면 인식: 알아본 조작부 / 에러 표시를 텍스트로 알리고 그동안 영상 간격을 늘린다
+                visual = None
+                if visual_index is not None:
+                    visual = VisualRecognizer(session, visual_index, interval_scale=VISUAL_INTERVAL_SCALE,
+                                              resend_interval=VISUAL_RESEND_INTERVAL, turn_state=turn_state)
+
+                # 녹화: 마이크 묶음 / 카메라 프레임 / 서버 응답을 파일로 남긴다 (session_replay.py로 재생)
+                extra_tasks = []
+                if recorder is not None:
+                    extra_tasks.append(recorder.capture_frames(frames, lambda: shared_state["running"]))
+
+                pipeline = LivePipeline(
+                    recorder.wrap_session(session) if recorder is not None else session,
+                    frames,
+                    recorder.wrap_mic(mic) if recorder is not None else mic,
+                    player,
+                    logger,
+                    transcripts=transcripts,
+                    stt=stt_transcriber,
+                    shared_state=shared_state,
+                    gate=gate,
+                    uplink=uplink,
+                    encoder=FrameEncoder(max_pending=VIDEO_ENCODE_QUEUE_SIZE),
+                    roi_selector=RoiSelector() if VIDEO_ROI_MODE == "auto" else None,
+                    audio_gate=audio_gate,
+                    camera_alive=lambda: camera.running,
+                    show_window=not headless,
+                    check_interval=VIDEO_CHECK_INTERVAL,
+                    local_barge_in=PLAYBACK_LOCAL_BARGE_IN,
+                    barge_in=BargeInDetector(audio_gate.vad, sample_rate=INPUT_RATE, echo_ratio=BARGE_IN_ECHO_RATIO,
+                                             min_speech_ms=BARGE_IN_MIN_SPEECH_MS) if audio_gate is not None else None,
+                    context=context,
+                    tools=manual.tools() if manual is not None else None,
+                    visual=visual,
+                    turn_state=turn_state,
+                )
+                # 카메라 창이 닫힐 때까지 (종료: 'q') 태스크 실행
+                await pipeline.run(*extra_tasks)
+                print(f"📊 Live 연결: {live.summary()}")
+                print(f"📊 컨텍스트: {context.summary()}")
+                print(f"📊 페르소나: {switcher.summary()}")
+                if manual is not None:
+                    print(f"📊 매뉴얼 검색: {manual.summary()}")
+                if visual is not None:
+                    print(f"📊 화면 인식: {visual.summary()}")
 
         except Exception as e:
             print(f"\n❌ 세션 오류: {e}")
             traceback.print_exc()
         finally:
-            stt_transcriber.stop()
+            if stt_transcriber is not None:
+                stt_transcriber.stop()
+                print(f"📊 STT: {stt_transcriber.summary()}")
             
             # [종료 시퀀스] 사용자 피드백 수집
             print("\n" + "="*40)
@@ -486,17 +421,48 @@ async def main():
                     logger.save_feedback(feedback_score)
             except Exception as e:
                 print(f"피드백 저장 오류: {e}")
+
+            # 쓰기 대기열에 남은 로그(피드백 포함)를 모두 보내고 종료
+            logger.close()
             print("="*40 + "\n")
 
-            if cap.isOpened(): cap.release()
-            if input_stream: input_stream.stop_stream(); input_stream.close()
-            if output_stream: output_stream.stop_stream(); output_stream.close()
+            if recorder is not None:
+                recorder.close()
+                print(f"📊 녹화: {recorder.summary()}")
+
+            snapshot = REGISTRY.snapshot()
+            print(f"📊 응답 지연(발화 종료→첫 오디오): {snapshot['vision_turn_first_audio_ms']}")
+            if METRICS_DUMP_PATH:
+                REGISTRY.dump(METRICS_DUMP_PATH)
+            REGISTRY.stop()
+
+            camera.stop()
+            if mic: mic.stop()
+            if player:
+                print(f"📊 재생: {player.summary()}")
+                player.stop()
             if p: p.terminate()
-            cv2.destroyAllWindows()
+            if not headless:
+                cv2.destroyAllWindows()
 
     except Exception as e:
         print(f"\n❌ 메인 오류: {e}")
         input("엔터를 누르면 종료합니다...")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gemini Live 비전 상담")
+    parser.add_argument("--source", default=CAMERA_SOURCE,
+                        help="웹캠 번호 / 동영상 파일 / rtsp://·http:// 주소 / 이미지 폴더 / synthetic[:시드]")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="미리보기 창 없이 실행 (종료: Ctrl+C)")
+    parser.add_argument("--make-greeting", action="store_true",
+                        help=f"Live 연결 중 재생할 인사말을 만들어 {GREETING_PATH.name}에 저장하고 종료")
+    args = parser.parse_args()
+    if args.make_greeting:
+        greeting = GreetingCache(GREETING_PATH, rate=OUTPUT_RATE)
+        greeting_config = {k: v for k, v in get_config().items() if k != "session_resumption"}
+        pcm = asyncio.run(greeting.record(
+            genai.Client(api_key=API_KEY).aio.live.connect(model=MODEL_ID, config=greeting_config)))
+        print(f"✅ 인사말 저장: {GREETING_PATH} ({greeting.duration_ms / 1000:.1f}초)" if pcm else "❌ 인사말을 받지 못했습니다")
+    else:
+        asyncio.run(main(source=args.source, headless=args.headless))
\ No newline at end of file
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import pathlib
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from metrics import VISUAL_CONTEXTS, VISUAL_MATCH_MS, VISUAL_MATCHES
+
+# ==========================================
+# [클래스] 로컬 화면 인식 (ORB 특징점 색인)
+# ==========================================
+# 사용자는 대부분 정해진 몇 가지 세탁기 조작부나 표시창의 에러 코드를 비춘다. 그때마다 모델이
+# 영상만 보고 "무엇인지"부터 알아내야 해서 한 턴이 더 걸린다.
+# 기준 사진(조작부 / 설명서 페이지 조각)의 ORB 특징점을 미리 뽑아 두고, 장면이 바뀐 프레임을
+# 비교해서 알아보면 그 이름/설명을 텍스트 맥락으로 세션에 넣는다.
+#
+# 매칭: ORB(해밍 거리) -> 비율 테스트 -> RANSAC 호모그래피 인라이어 수가 min_inliers 이상이면 인식.
+# 640px 프레임 기준 10~40ms (알아본 경우가 더 김)라서 이벤트 루프 밖(스레드)에서 돌린다.
+#
+# 기준 이미지 폴더 (VISUAL_REFS_DIR)는 labels.json으로 이름과 설명을 붙인다:
+#   {"OE_표시창.jpg": {"label": "에러 OE", "text": "표시창에 OE 에러 (배수 문제)"}, ...}
+
+VisualMatch = namedtuple("VisualMatch", ["label", "text", "inliers", "match_ms"])
+_Reference = namedtuple("_Reference", ["label", "text", "keypoints", "descriptors"])
+
+
+class VisualIndex:
+    def __init__(self, frame_width=640, ref_width=640, features=1000, ratio=0.75, min_inliers=15):
+        self.frame_width = frame_width      # 프레임은 이 폭으로 줄여서 비교
+        self.ref_width = ref_width          # 기준 이미지도 이 폭에 맞춤 (작은 사진은 키움)
+        self.ratio = ratio                  # Lowe 비율 테스트
+        self.min_inliers = min_inliers
+        self._orb = cv2.ORB_create(nfeatures=features)
+        self._matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+        self.references = []
+
+        # 통계
+        self.checked = 0
+        self.recognized = 0
+        self.total_ms = 0.0
+
+    def __len__(self):
+        return len(self.references)
+
+    def _gray(self, image, width):
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        h, w = image.shape[:2]
+        if w != width:
+            interpolation = cv2.INTER_AREA if w > width else cv2.INTER_CUBIC
+            image = cv2.resize(image, (width, max(1, round(h * width / w))), interpolation=interpolation)
+        return image
+
+    # ---------- 기준 이미지 ----------
+
+    def add(self, label, image, text=None):
+        """기준 이미지 하나 추가 (특징점이 너무 적으면 False)"""
+        if image is None:
+            return False
+        keypoints, descriptors = self._orb.detectAndCompute(self._gray(image, self.ref_width), None)
+        if descriptors is None or len(keypoints) < self.min_inliers:
+            print(f"⚠️ 화면 인식 기준 '{label}': 특징점이 부족해서 제외 ({len(keypoints)}개)")
+            return False
+        self.references.append(_Reference(label, text or label, keypoints, descriptors))
+        return True
+
+    def add_file(self, path, label, text=None):
+        # cv2.imread는 윈도우에서 한글 경로를 못 읽으므로 바이트로 읽어서 디코딩
+        data = np.fromfile(str(path), dtype=np.uint8)
+        return self.add(label, cv2.imdecode(data, cv2.IMREAD_COLOR), text)
+
+    def add_directory(self, directory):
+        """labels.json에 적힌 기준 이미지들을 추가"""
+        directory = pathlib.Path(directory)
+        labels_path = directory / "labels.json"
+        if not labels_path.exists():
+            return 0
+        added = 0
+        for name, info in json.loads(labels_path.read_text(encoding="utf-8")).items():
+            if (directory / name).exists() and self.add_file(directory / name, info["label"], info.get("text")):
+                added += 1
+        return added
+
+    # ---------- 매칭 ----------
+
+    def prepare(self, frame):
+        """프레임을 비교용 흑백 축소본으로 (새 배열 - 공유 메모리 슬롯이 덮어써져도 안전)"""
+        return self._gray(frame, self.frame_width)
+
+    def match(self, gray):
+        """prepare()한 프레임에서 가장 잘 맞는 기준 이미지 (없으면 None). 스레드에서 호출."""
+        started = time.perf_counter()
+        keypoints, descriptors = self._orb.detectAndCompute(gray, None)
+        best = None
+        if descriptors is not None and len(keypoints) >= self.min_inliers:
+            for ref in self.references:
+                inliers = self._inliers(ref, keypoints, descriptors)
+                if inliers >= self.min_inliers and (best is None or inliers > best[1]):
+                    best = (ref, inliers)
+        match_ms = (time.perf_counter() - started) * 1000
+
+        self.checked += 1
+        self.total_ms += match_ms
+        VISUAL_MATCH_MS.observe(match_ms)
+        if best is None:
+            return None
+        self.recognized += 1
+        VISUAL_MATCHES.inc()
+        ref, inliers = best
+        return VisualMatch(ref.label, ref.text, inliers, match_ms)
+
+    def _inliers(self, ref, keypoints, descriptors):
+        pairs = self._matcher.knnMatch(ref.descriptors, descriptors, k=2)
+        good = [p[0] for p in pairs if len(p) == 2 and p[0].distance < self.ratio * p[1].distance]
+        if len(good) < self.min_inliers:
+            return 0
+        src = np.float32([ref.keypoints[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
+        dst = np.float32([keypoints[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+        _, mask = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+        return int(mask.sum()) if mask is not None else 0
+
+    def summary(self):
+        avg = self.total_ms / self.checked if self.checked else 0.0
+        return (f"기준 {len(self.references)}개, 비교 {self.checked}회, 인식 {self.recognized}회, "
+                f"평균 {avg:.1f}ms")
+
+
+# ==========================================
+# [클래스] 화면 인식 결과를 세션 맥락으로 전달
+# ==========================================
+# 보낼 프레임이 정해질 때마다 offer()로 넘기면 (이전 매칭이 끝났을 때만) 스레드에서 매칭한다.
+# 새로 알아본 대상이면 turn_complete=False 텍스트로 알려서 모델이 턴을 시작하지 않게 하고,
+# 같은 대상이 계속 보이는 동안은 interval_scale만큼 영상 전송 간격을 늘린다
+# (모델은 이미 무엇인지 텍스트로 알고 있으므로 프레임을 덜 보내도 인식을 잃지 않는다).
+#
+# 알림은 대상마다 한 번만 (resend_interval을 주면 그 간격이 지난 뒤 다시) 보내고, 모델이 답하는
+# 중이면 끊기지 않도록 turn_state로 턴이 끝날 때까지 미룬다. 기다리는 사이 대상이 화면에서
+# 사라졌거나 바뀌었으면 그때 보이는 대상만 알린다.
+
+
+class VisualRecognizer:
+    def __init__(self, session, index, interval_scale=2.0, forget_after=2, resend_interval=None,
+                 turn_state=None):
+        self.session = session
+        self.index = index
+        self.interval_scale = interval_scale    # 인식 중일 때 영상 간격 배수
+        self.forget_after = forget_after        # 연속 이만큼 못 알아보면 인식 해제
+        self.resend_interval = resend_interval  # 같은 대상을 다시 알려주기까지 최소 간격 (초, None이면 세션당 한 번)
+        self.turn_state = turn_state            # TurnState (없으면 바로 전송)
+
+        self.current = None
+        self._misses = 0
+        self._task = None
+        self._sender = None
+        self._pending = None                    # 턴이 끝나길 기다리는 알림 (VisualMatch)
+        self._sent_at = {}                      # 라벨 -> 마지막으로 알려준 시각
+
+        # 통계
+        self.contexts = 0
+
+    @property
+    def video_interval_scale(self):
+        return self.interval_scale if self.current is not None else 1.0
+
+    def context_text(self, match):
+        return (f"[화면 인식] 지금 카메라에 보이는 것: {match.text}. "
+                f"이 메시지에는 대답하지 말고, 사용자가 물어보면 이 정보를 참고해.")
+
+    def offer(self, frame):
+        """보낼 프레임 하나를 넘긴다 (이벤트 루프 안에서 호출, 매칭 중이면 건너뜀)"""
+        if self._task is not None and not self._task.done():
+            return False
+        gray = self.index.prepare(frame)
+        self._task = asyncio.get_running_loop().create_task(self.recognize(gray))
+        return True
+
+    def _should_send(self, label):
+        sent_at = self._sent_at.get(label)
+        if sent_at is None:
+            return True
+        return self.resend_interval is not None and time.monotonic() - sent_at >= self.resend_interval
+
+    async def recognize(self, gray):
+        match = await asyncio.to_thread(self.index.match, gray)
+        if match is None:
+            self._misses += 1
+            if self.current is not None and self._misses >= self.forget_after:
+                print(f"\n👁️ 화면 인식 해제: {self.current}")
+                self.current = None
+            return None
+
+        self._misses = 0
+        if match.label != self.current:
+            self.current = match.label
+            print(f"\n👁️ 화면 인식: {match.label} (특징점 {match.inliers}개, {match.match_ms:.0f}ms)")
+            if self._should_send(match.label):
+                self._pending = match
+                if self._sender is None or self._sender.done():
+                    self._sender = asyncio.get_running_loop().create_task(self._send_between_turns())
+        return match
+
+    async def _send_between_turns(self):
+        # 보내는 동안 새 대상이 잡히면 이어서 처리한다
+        while self._pending is not None:
+            if self.turn_state is not None:
+                await self.turn_state.wait_idle()
+            match, self._pending = self._pending, None
+            # 기다리는 사이 화면에서 사라졌거나 이미 알린 대상이면 보내지 않는다
+            if match.label == self.current and self._should_send(match.label):
+                await self.send_context(match)
+
+    async def send_context(self, match):
+        try:
+            await self.session.send_client_content(
+                turns=[{"role": "user", "parts": [{"text": self.context_text(match)}]}],
+                turn_complete=False,
+            )
+        except Exception as e:
+            print(f"⚠️ 화면 인식 결과 전송 실패 ({match.label}): {e}")
+            return False
+        self._sent_at[match.label] = time.monotonic()
+        self.contexts += 1
+        VISUAL_CONTEXTS.inc()
+        return True
+
+    def summary(self):
+        return f"{self.index.summary()}, 맥락 전송 {self.contexts}회, 현재 {self.current or '없음'}"
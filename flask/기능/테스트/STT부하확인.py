@@ -0,0 +1,68 @@
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+# 실시간비전 폴더의 모듈을 가져오기 위한 경로 추가
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "실시간비전"))
+from stt import SpeechTranscriber, StubEngine
+
+# ==========================================
+# STT 워커 풀 부하 확인 (마이크/네트워크 없이)
+# ==========================================
+# 1초짜리 발화 + 1초 침묵을 빠르게 밀어 넣고, 느린 가짜 엔진으로 인식시켜
+# 결과가 순서대로 나오는지, 대기열이 넘칠 때 오래된 발화가 버려지는지 확인한다.
+
+RATE = 16000
+CHUNK = 512
+UTTERANCES = 12
+ENGINE_DELAY = 0.8   # 가짜 인식 1건당 걸리는 시간 (초)
+
+
+def make_utterance(index):
+    t = np.arange(RATE) / RATE
+    tone = 3000 * np.sin(2 * np.pi * (150 + 10 * index) * t)
+    silence = np.random.default_rng(index).normal(0, 100, RATE)
+    return np.concatenate([tone, silence]).astype(np.int16).tobytes()
+
+
+class PrintLogger:
+    def __init__(self):
+        self.messages = []
+
+    def log_user_message(self, text):
+        self.messages.append(text)
+
+
+def label_from_tone(pcm):
+    """가장 강한 주파수로 몇 번째 발화였는지 복원 (make_utterance의 150 + 10 * index Hz)"""
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    spectrum = np.abs(np.fft.rfft(samples))
+    peak_hz = np.argmax(spectrum) * RATE / len(samples)
+    return f"발화 #{round((peak_hz - 150) / 10)}"
+
+
+engine = StubEngine(text=label_from_tone, delay=ENGINE_DELAY)
+logger = PrintLogger()
+transcriber = SpeechTranscriber(logger, engine=engine, workers=2, max_pending=4, chunk_size=CHUNK)
+
+started = time.perf_counter()
+for i in range(UTTERANCES):
+    pcm = make_utterance(i)
+    for k in range(0, len(pcm), CHUNK * 2):
+        transcriber.add_audio(pcm[k:k + CHUNK * 2])
+    time.sleep(0.1)   # 실제(2초)보다 20배 빠르게 밀어 넣음
+
+# 남은 인식이 끝날 때까지 대기
+deadline = time.time() + 10
+while transcriber.pending and time.time() < deadline:
+    time.sleep(0.1)
+time.sleep(ENGINE_DELAY + 0.5)
+transcriber.stop()
+
+print("\n------------------------------------------------")
+print(f"⏱️ 소요 시간: {time.perf_counter() - started:.1f}초")
+print(f"📊 {transcriber.summary()}")
+print(f"📝 로그된 순서: {logger.messages}")
+print("------------------------------------------------\n")
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import pathlib
+import sys
+
+# 실시간비전 폴더의 모듈을 가져오기 위한 경로 추가
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "실시간비전"))
+from fake_live import FakeLiveSession, server_content, tool_call
+from gateway import ClientConnection, LiveGateway
+from manual_index import ManualIndex, ManualSearch
+
+# ==========================================
+# 게이트웨이 search_manual 도구 응답 확인 (네트워크 없이)
+# ==========================================
+# 가짜 Live 세션이 search_manual tool_call을 보낸 뒤 답변 턴을 이어 보낸다.
+# 게이트웨이 클라이언트 연결이 tool_call을 버리지 않고 send_tool_response로 검색 결과를 돌려주는지,
+# 그 뒤의 턴이 클라이언트까지 turn_complete로 전달되는지 본다 (WebSocket은 가짜 객체).
+
+SECTIONS = [
+    {"section_id": 1, "category": "troubleshooting_table", "section_title": "12페이지 (고장조치 표)",
+     "content_text": "문제상황 OE 에러 배수가 안 됨 해결방법 배수 필터를 청소하세요", "page_number": 12},
+    {"section_id": 2, "category": "troubleshooting_table", "section_title": "13페이지 (고장조치 표)",
+     "content_text": "문제상황 문이 열리지 않음 해결방법 잠금 해제 후 다시 시도하세요", "page_number": 13},
+]
+
+
+class FakeWebSocket:
+    """클라이언트는 아무것도 보내지 않고, 게이트웨이가 보낸 메시지만 모은다"""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = asyncio.Event()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self.closed.wait()
+        raise StopAsyncIteration
+
+    async def send(self, message):
+        self.sent.append(message)
+        if isinstance(message, str) and json.loads(message)["type"] == "turn_complete":
+            self.closed.set()
+
+
+class FakeConnect:
+    def __init__(self, session):
+        self.session = session
+
+    async def __aenter__(self):
+        return self.session
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+async def run():
+    session = FakeLiveSession()
+    session.add_turn([tool_call("search_manual", {"query": "OE 에러 배수"}, call_id="call-7")])
+    session.add_turn([
+        server_content(output_text="배수 필터를 청소해 주세요.", audio=b"\0" * 4800),
+        server_content(turn_complete=True),
+    ])
+    index = ManualIndex(SECTIONS)
+    gateway = LiveGateway(lambda handle: FakeConnect(session), make_tools=lambda: ManualSearch(index).tools())
+    ws = FakeWebSocket()
+    await asyncio.wait_for(ClientConnection(gateway, ws, "c1").run(), timeout=5.0)
+
+    responses = [payload["function_responses"] for _, kind, payload in session.sent if kind == "tool_response"]
+    events = [json.loads(m)["type"] for m in ws.sent if isinstance(m, str)]
+    ok = (
+        len(responses) == 1
+        and responses[0][0].id == "call-7"
+        and "OE" in json.dumps(responses[0][0].response, ensure_ascii=False)
+        and "turn_complete" in events
+    )
+    print("\n------------------------------------------------")
+    print(f"  🔧 send_tool_response: {len(responses)}회, 클라이언트 이벤트: {events}")
+    print("✅ 게이트웨이가 tool_call에 답함" if ok else "❌ tool_call 응답이 예상과 다릅니다")
+    print("------------------------------------------------\n")
+
+
+asyncio.run(run())
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import pathlib
+import sys
+import time
+
+# 실시간비전 폴더의 모듈을 가져오기 위한 경로 추가
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "실시간비전"))
+from fake_live import FakeLiveSession, server_content
+from gateway import AUDIO_IN, FRAME_IN, LiveGateway
+
+# ==========================================
+# 게이트웨이 부하 확인 (세션 / 코어)
+# ==========================================
+# Gemini 대신 가짜 Live 세션(발화가 끝나면 1.5초 분량의 답변 음성을 돌려줌)을 붙여 게이트웨이를 띄우고,
+# 별도 프로세스에서 클라이언트 N개가 실제 속도로 오디오(100ms 묶음)와 JPEG(1 FPS)를 보낸다.
+# 게이트웨이 프로세스의 CPU 시간만 재서 "코어 하나로 감당할 수 있는 세션 수"를 계산한다.
+#   sessions_per_core = N / (CPU 초 / 경과 초)
+
+PORT = 8799
+TOKEN = "load-test"      # 접속 토큰 (틀린 토큰은 핸드셰이크에서 거절되는지도 확인)
+LEVELS = [5, 10, 20]     # 동시 클라이언트 수
+DURATION = 10.0          # 단계별 측정 시간 (초)
+SPEAK_SECONDS = 3.0      # 클라이언트 발화 길이 (이후 답변을 기다림)
+FRAME_BYTES = 30000      # 클라이언트가 보내는 JPEG 크기 흉내
+
+
+class EchoLiveSession(FakeLiveSession):
+    """audio_stream_end를 받으면 답변 한 턴(0.15초 x 10조각)을 돌려준다"""
+
+    async def send_realtime_input(self, **kwargs):
+        if kwargs.get("audio_stream_end"):
+            turn = [server_content(input_text="질문", input_finished=True)]
+            for _ in range(10):
+                response = server_content(output_text="답변 ", audio=b"\0" * 7200)
+                response.delay = 0.02
+                turn.append(response)
+            turn.append(server_content(turn_complete=True))
+            self.add_turn(turn)
+        # 보낸 내용은 기록하지 않음 (장시간 부하에서 메모리가 늘지 않도록)
+
+
+class FakeConnect:
+    def __init__(self, handle):
+        self.handle = handle
+
+    async def __aenter__(self):
+        await asyncio.sleep(0.05)   # 연결 지연 흉내
+        return EchoLiveSession()
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+# ---------- 클라이언트 (별도 프로세스) ----------
+
+async def run_client(index, duration, results):
+    from websockets.asyncio.client import connect
+    from websockets.exceptions import ConnectionClosed
+
+    stats = {"turns": 0, "audio_bytes": 0, "busy": False, "started": time.monotonic()}
+    pcm = bytes([AUDIO_IN]) + b"\1\0" * 1600      # 100ms
+    jpeg = bytes([FRAME_IN]) + os.urandom(FRAME_BYTES)
+    deadline = time.monotonic() + duration
+    try:
+        async with connect(f"ws://127.0.0.1:{PORT}/?token={TOKEN}", max_size=2 ** 22) as ws:
+            async def reader():
+                try:
+                    async for message in ws:
+                        if isinstance(message, bytes):
+                            stats["audio_bytes"] += len(message) - 1
+                        else:
+                            event = json.loads(message)
+                            if event["type"] == "turn_complete":
+                                stats["turns"] += 1
+                                turn_done.set()
+                            elif event["type"] == "busy":
+                                stats["busy"] = True
+                except ConnectionClosed:
+                    pass
+
+            turn_done = asyncio.Event()
+            read_task = asyncio.create_task(reader())
+            while time.monotonic() < deadline and not stats["busy"]:
+                started = time.monotonic()
+                for k in range(int(SPEAK_SECONDS * 10)):
+                    await ws.send(pcm)
+                    if k % 10 == 0:
+                        await ws.send(jpeg)
+                    await asyncio.sleep(max(0.0, started + (k + 1) * 0.1 - time.monotonic()))
+                turn_done.clear()
+                await ws.send(json.dumps({"type": "audio_end"}))
+                try:
+                    await asyncio.wait_for(turn_done.wait(), timeout=5.0)
+                except asyncio.TimeoutError:
+                    pass
+            read_task.cancel()
+    except ConnectionClosed:
+        pass    # 세션 상한으로 거절됨 (busy)
+    finally:
+        stats["ended"] = time.monotonic()
+        results.append(stats)
+
+
+def client_process(count, duration, queue):
+    async def run_all():
+        results = []
+        await asyncio.gather(*(run_client(i, duration, results) for i in range(count)), return_exceptions=True)
+        return results
+
+    queue.put(asyncio.run(run_all()))
+
+
+# ---------- 게이트웨이 (이 프로세스) ----------
+
+async def check_token():
+    """토큰이 틀리면 세션을 만들기 전에 401로 거절되는지"""
+    from websockets.asyncio.client import connect
+    from websockets.exceptions import InvalidStatus
+
+    try:
+        async with connect(f"ws://127.0.0.1:{PORT}/?token=wrong"):
+            return False
+    except InvalidStatus as e:
+        return e.response.status_code == 401
+
+
+async def measure():
+    gateway = LiveGateway(lambda handle: FakeConnect(handle), max_sessions=max(LEVELS), token=TOKEN)
+    ready = asyncio.Event()
+    server_task = asyncio.create_task(gateway.serve("127.0.0.1", PORT, ready=ready))
+    await ready.wait()
+    token_ok = await check_token() and gateway.accepted == 0
+    print("✅ 틀린 토큰 거절됨 (401)" if token_ok else "❌ 틀린 토큰으로도 접속됨")
+
+    report = []
+    for count in LEVELS:
+        queue = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=client_process, args=(count, DURATION, queue))
+        cpu_start = time.process_time()
+        proc.start()
+        results = await asyncio.to_thread(queue.get)
+        await asyncio.to_thread(proc.join)
+        cpu = time.process_time() - cpu_start
+        # 클라이언트가 실제로 붙어 있던 구간 (프로세스 시작 시간은 빼고, monotonic은 프로세스 간 공통)
+        wall = max(r["ended"] for r in results) - min(r["started"] for r in results) if results else 0.0
+
+        cpu_fraction = cpu / wall if wall else 0.0
+        row = {
+            "clients": count,
+            "wall_s": round(wall, 1),
+            "cpu_s": round(cpu, 2),
+            "cpu_percent": round(cpu_fraction * 100, 1),
+            "sessions_per_core": round(count / cpu_fraction, 1) if cpu_fraction else None,
+            "turns": sum(r["turns"] for r in results),
+            "audio_mb_out": round(sum(r["audio_bytes"] for r in results) / 1e6, 1),
+            "rejected": sum(1 for r in results if r["busy"]),
+        }
+        report.append(row)
+        print(f"📊 클라이언트 {count}개: CPU {row['cpu_percent']}% -> 코어당 약 {row['sessions_per_core']}세션, "
+              f"턴 {row['turns']}개, 다운링크 {row['audio_mb_out']}MB")
+
+    server_task.cancel()
+    return report
+
+
+def main():
+    report = asyncio.run(measure())
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import pathlib
+import sys
+import threading
+import time
+
+import numpy as np
+
+# 실시간비전 폴더의 모듈을 가져오기 위한 경로 추가
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "실시간비전"))
+import pyaudio
+from audio_dsp import BargeInDetector, VoiceActivityDetector
+from audio_io import AudioPlayer
+
+# ==========================================
+# 로컬 끼어들기 확인 (스피커 / 마이크 없이)
+# ==========================================
+# 1) 재생 중 스피커 소리가 마이크로 되돌아온 정도(임계값 ECHO_LEVEL배)로는 끊지 않고,
+#    사용자가 크게 말하면 끊는지 (BargeInDetector)
+# 2) 로컬에서 끊은 뒤 같은 턴의 오디오가 더 와도 재생하지 않고, end_turn() 뒤 다음 턴은 재생하는지
+#    (AudioPlayer, 출력 장치 대신 쓴 바이트만 세는 가짜 스트림)
+
+RATE = 16000
+CHUNK = 1600            # 100ms
+ECHO_LEVEL = 1.8        # 임계값 대비 되울림 크기
+SPEECH_LEVEL = 4.0
+
+
+class CountingStream:
+    def __init__(self):
+        self.written = 0
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        time.sleep(len(data) / 48000)     # 24kHz 16bit 실시간 속도
+        with self.lock:
+            self.written += len(data)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePyAudio:
+    def __init__(self):
+        self.stream = CountingStream()
+
+    def open(self, **kwargs):
+        return self.stream
+
+
+def tone(level, threshold):
+    t = np.arange(CHUNK) / RATE
+    return (level * threshold * np.sqrt(2) * np.sin(2 * np.pi * 220 * t)).astype(np.int16).tobytes()
+
+
+def check_detector():
+    vad = VoiceActivityDetector(frame_size=512)
+    detector = BargeInDetector(vad, sample_rate=RATE)
+    echo_cut = sum(detector.process(tone(ECHO_LEVEL, vad.threshold), True) for _ in range(30))
+    speech_cut = [detector.process(tone(SPEECH_LEVEL, vad.threshold), True) for _ in range(6)]
+    cut_ms = (speech_cut.index(True) + 1) * 100 if True in speech_cut else None
+    return echo_cut == 0 and cut_ms is not None, echo_cut, cut_ms
+
+
+def check_muted_turn():
+    pa = FakePyAudio()
+    player = AudioPlayer(pa, rate=24000, sample_format=pyaudio.paInt16).start()
+    chunk = b"\0" * 4800                # 100ms
+    try:
+        for _ in range(10):
+            player.enqueue(chunk)
+        time.sleep(0.15)
+        player.flush("local-vad")       # 사용자가 끼어듦
+        time.sleep(0.05)
+        after_flush = pa.stream.written
+        for _ in range(5):
+            player.enqueue(chunk)       # 서버는 아직 같은 턴을 보내는 중
+        time.sleep(0.3)
+        leaked = pa.stream.written - after_flush
+        player.end_turn()               # 서버 turn_complete
+        player.enqueue(chunk)           # 다음 턴
+        player.end_turn()
+        time.sleep(0.3)
+        next_turn = pa.stream.written - after_flush - leaked
+    finally:
+        player.stop()
+    return leaked == 0 and next_turn == len(chunk), leaked, next_turn
+
+
+def main():
+    detector_ok, echo_cut, cut_ms = check_detector()
+    muted_ok, leaked, next_turn = check_muted_turn()
+    print("\n------------------------------------------------")
+    print(f"  🔊 되울림({ECHO_LEVEL}배)으로 끊김: {echo_cut}회, 큰 목소리({SPEECH_LEVEL}배) 끊기까지: {cut_ms}ms")
+    print(f"  🔇 끊은 뒤 같은 턴 오디오 재생: {leaked}바이트, 다음 턴 재생: {next_turn}바이트")
+    print("✅ 끼어들기 정상" if detector_ok and muted_ok else "❌ 끼어들기 결과가 예상과 다릅니다")
+    print("------------------------------------------------\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import asyncio
+import pathlib
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+# 실시간비전 폴더의 모듈을 가져오기 위한 경로 추가
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "실시간비전"))
+from fake_live import FakeLiveSession
+from live_pipeline import LivePipeline
+from manual_index import ManualIndex, ManualPrefetcher, ManualSearch, load_manual_sections
+
+# ==========================================
+# search_manual 도구 지연 확인 (목표: p95 < 50ms)
+# ==========================================
+# 실시간비전/manual_sections.json(실행 중 Supabase에서 받은 캐시)이 있으면 그것으로,
+# 없으면 고장조치 표 형식의 가짜 조각 SYNTHETIC_SECTIONS개로 색인을 만든다.
+# 1) 질의 QUERIES개를 캐시 없이 검색해 p50/p95를 재고
+# 2) 가짜 세션에 tool_call을 넣어 send_tool_response까지 돌아오는지 확인하고
+# 3) 발화 전사 조각으로 미리 찾기를 돌린 뒤 모델 질의가 미리 찾은 결과로 답해지는 비율을 본다.
+# 4) 커버리지가 같은 발화가 여럿이면 가장 최근 발화의 후보를 쓰고, 실제 질의로 다시 채점하는지 본다.
+
+CACHE_PATH = pathlib.Path(__file__).resolve().parents[1] / "실시간비전" / "manual_sections.json"
+SYNTHETIC_SECTIONS = 3000
+QUERIES = 500
+TARGET_P95_MS = 50.0
+
+SYMPTOMS = ["전원이 켜지지 않음", "물이 나오지 않음", "배수가 안 됨", "탈수가 안 됨", "소음이 심함",
+            "문이 열리지 않음", "세탁물에서 냄새", "거품이 넘침", "진동이 심함", "물이 샘"]
+CODES = ["OE", "IE", "UE", "DE", "LE", "FE", "PE", "dHE", "tE", "CE"]
+
+# (사용자 발화, 모델이 search_manual에 넣을 법한 질의)
+UTTERANCES = [
+    ("세탁기 화면에 OE 에러가 떠요 배수가 안 되는 것 같아요", "OE 에러 배수"),
+    ("탈수가 안 되고 소음이 심해요", "탈수 소음"),
+    ("문이 열리지 않아요 어떻게 해요", "문 열리지 않음"),
+    ("세탁물에서 냄새가 나요", "통살균 코스 사용법"),     # 발화에 없는 말로 찾는 경우 (미적중)
+]
+
+
+def synthetic_sections(count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        symptom = rng.choice(SYMPTOMS)
+        code = rng.choice(CODES)
+        rows.append({
+            "section_id": i,
+            "category": "troubleshooting_table",
+            "section_title": f"{i // 20 + 1}페이지 (고장조치 표)",
+            "content_text": f"문제상황 {code} 에러 {symptom} 원인 필터 막힘 또는 호스 꺾임 {i} "
+                            f"해결방법 배수 필터를 청소하고 호스를 확인하세요 서비스센터 문의 {rng.randint(0, 99999)}",
+            "page_number": i // 20 + 1,
+        })
+    return rows
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+async def check_tool_call(search):
+    session = FakeLiveSession()
+    pipeline = LivePipeline(session, None, None, None, None, tools=search.tools())
+    call = SimpleNamespace(id="call-1", name="search_manual", args={"query": "OE 에러 배수가 안 돼요"})
+    await pipeline.answer_tool_call(SimpleNamespace(function_calls=[call]))
+    sent = [payload["function_responses"] for _, kind, payload in session.sent if kind == "tool_response"]
+    return bool(sent) and sent[0][0].id == "call-1" and bool(sent[0][0].response["results"])
+
+
+async def check_prefetch(index):
+    search = ManualSearch(index)
+    prefetcher = ManualPrefetcher(search)
+    for utterance, query in UTTERANCES:
+        # 전사 조각은 몇 글자씩 누적되어 온다
+        for end in range(3, len(utterance) + 3, 3):
+            prefetcher.on_partial(utterance[:end])
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.3)     # 말이 끝나고 모델이 도구를 부르기까지
+        search.search_manual(query)
+    return search
+
+
+def check_prefetch_newest():
+    sections = [
+        {"section_id": 1, "section_title": "통살균", "content_text": "통살균 코스 진행 중 에러", "page_number": 1},
+        {"section_id": 2, "section_title": "배수", "content_text": "OE 에러 배수 필터 청소", "page_number": 2},
+        {"section_id": 3, "section_title": "문", "content_text": "문 잠김 해제 방법", "page_number": 3},
+    ]
+    search = ManualSearch(ManualIndex(sections), top_k=1, prefetch_candidates=1)
+    search.prefetch("통살균 에러")      # 오래된 발화
+    search.prefetch("OE 에러")          # 최근 발화 (질의 '에러'에 대한 커버리지는 둘 다 100%)
+    result = search.search_manual("에러")
+    return search.prefetch_hits == 1 and result["results"][0]["page"] == 2
+
+
+def main():
+    if CACHE_PATH.exists():
+        sections = load_manual_sections(CACHE_PATH)
+        source = CACHE_PATH.name
+    else:
+        sections = synthetic_sections(SYNTHETIC_SECTIONS)
+        source = f"가짜 조각 {SYNTHETIC_SECTIONS}개"
+
+    started = time.perf_counter()
+    index = ManualIndex(sections)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(1)
+    timings = []
+    for _ in range(QUERIES):
+        query = f"{rng.choice(CODES)} {rng.choice(SYMPTOMS)}"
+        search = ManualSearch(index)      # 매번 새 세션 캐시 -> 캐시 없는 지연
+        t0 = time.perf_counter()
+        search.search_manual(query)
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    cached = ManualSearch(index)
+    cached.search_manual("OE 배수")
+    t0 = time.perf_counter()
+    cached.search_manual("OE  배수!")
+    cached_ms = (time.perf_counter() - t0) * 1000
+
+    tool_ok = asyncio.run(check_tool_call(ManualSearch(index)))
+    prefetched = asyncio.run(check_prefetch(index))
+    newest_ok = check_prefetch_newest()
+    p95 = percentile(timings, 95)
+
+    print("\n------------------------------------------------")
+    print(f"  📚 색인: {source}, {len(index)}개 조각, 생성 {build_ms:.0f}ms")
+    print(f"  ⏱️ 검색: p50 {percentile(timings, 50):.2f}ms, p95 {p95:.2f}ms, 최대 {max(timings):.2f}ms")
+    print(f"  ⏱️ 같은 질의 (세션 캐시): {cached_ms:.3f}ms, {cached.summary()}")
+    print(f"  🔧 tool_call -> send_tool_response: {'정상' if tool_ok else '실패'}")
+    print(f"  🔮 미리 찾기: {prefetched.summary()}")
+    print(f"  🔮 같은 커버리지면 최근 발화 사용: {'정상' if newest_ok else '실패'}")
+    print("✅ 목표 이내" if p95 < TARGET_P95_MS and tool_ok and newest_ok
+          else f"❌ p95 {TARGET_P95_MS:.0f}ms 초과 또는 도구 응답 / 미리 찾기 실패")
+    print("------------------------------------------------\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import pathlib
+import sys
+import tempfile
+
+import numpy as np
+
+# 실시간비전 폴더의 모듈을 가져오기 위한 경로 추가
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "실시간비전"))
+from fake_live import server_content
+from session_record import SessionRecorder
+from session_replay import replay
+
+# ==========================================
+# 세션 재생 측정 (카메라 / 마이크 / Gemini 없이)
+# ==========================================
+# 사용법:
+#   python 세션재생확인.py                    -> 합성 녹화(발화 4번 + 움직이는 화면)를 만들어 재생
+#   python 세션재생확인.py session.rec [배속]  -> vision.py에서 VISION_RECORD_PATH로 남긴 녹화 재생
+#
+# 결과(JSON)의 speech_end_to_first_audio_ms, loop_lag_ms, video_bytes, cpu_percent를
+# 파이프라인 변경 전후로 비교한다.
+
+RATE = 16000
+MIC_FRAME = 1600          # 100ms 묶음 (vision.py MIC_FRAME_MS)
+UTTERANCES = 4
+MODEL_LATENCY = 0.6       # 합성 녹화에 넣을 "발화 종료 -> 첫 응답" 지연 (초)
+
+
+def make_recording(path):
+    """발화(톤) 1.5초 + 침묵 2.5초를 반복하는 녹화 파일을 만든다"""
+    rng = np.random.default_rng(0)
+    recorder = SessionRecorder(path, source="synthetic")
+    t0 = recorder.started_at
+    t = 0.0
+
+    def frame_at(seconds):
+        frame = np.full((720, 1280, 3), 40, np.uint8)
+        x = int(200 + 150 * seconds) % 1000
+        frame[200:500, x:x + 250] = (30, 160, 220)     # 움직이는 조작부 흉내
+        return frame
+
+    for index in range(UTTERANCES):
+        speech = 3000 * np.sin(2 * np.pi * (180 + 20 * index) * np.arange(int(RATE * 1.5)) / RATE)
+        silence = rng.normal(0, 80, int(RATE * 2.5))
+        pcm = np.concatenate([speech, silence]).astype(np.int16).tobytes()
+        speech_end = t + 1.5 + 15 * 512 / RATE      # post-roll 뒤에 audio_stream_end
+
+        for offset in range(0, len(pcm), MIC_FRAME * 2):
+            recorder.mic(pcm[offset:offset + MIC_FRAME * 2], at=t0 + t)
+            if int(t * 10) % 2 == 0:
+                recorder.frame(frame_at(t), at=t0 + t)    # 5 FPS
+            t += MIC_FRAME / RATE
+
+        recorder.event("audio_stream_end", at=t0 + speech_end)
+        start = speech_end + MODEL_LATENCY
+        recorder.response(server_content(input_text=f"질문 {index}", input_finished=True), at=t0 + start - 0.05)
+        for k in range(5):
+            recorder.response(server_content(output_text=f"답변 {k} ", audio=b"\0" * 9600), at=t0 + start + k * 0.1)
+        recorder.response(server_content(turn_complete=True), at=t0 + start + 0.6)
+
+    recorder.close()
+    print(f"🎞️ 합성 녹화: {recorder.summary()}")
+
+
+def main():
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+        speed = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    else:
+        path = str(pathlib.Path(tempfile.gettempdir()) / "vision_synthetic.rec")
+        speed = 1.0
+        make_recording(path)
+
+    report = asyncio.run(replay(path, speed=speed))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    expected = report["turns_recorded"]
+    if report["speech_end_to_first_audio_ms"]["count"] == expected and not report["turns_unmatched"]:
+        print(f"✅ 재생 완료: 턴 {expected}개 모두 발화 종료 기준으로 측정됨")
+    else:
+        print("⚠️ 일부 턴이 발화 종료와 맞춰지지 않았습니다 (VAD 설정/녹화 확인)")
+
+
+if __name__ == "__main__":
+    main()
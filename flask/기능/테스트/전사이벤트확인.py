@@ -0,0 +1,75 @@
+import asyncio
+import pathlib
+import sys
+
+# 실시간비전 폴더의 모듈을 가져오기 위한 경로 추가
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "실시간비전"))
+from fake_live import FakeLiveSession, server_content
+from live_transcript import TranscriptRouter
+
+# ==========================================
+# Live 세션 전사 이벤트 -> 로거 저장 순서 확인 (네트워크 없이)
+# ==========================================
+# 가짜 세션이 사용자 전사 조각 / 모델 전사 / 턴 완료를 보내면
+# 사용자 메시지 1개, 모델 메시지 1개가 순서대로 저장되어야 한다.
+
+
+class MemoryLogger:
+    """DatabaseLogger와 같은 메서드만 가진 메모리 로거"""
+
+    def __init__(self):
+        self.buffer = []
+        self.messages = []
+
+    def append_text(self, text):
+        self.buffer.append(text)
+
+    def log_user_message(self, text):
+        self.messages.append(("user", text))
+
+    def flush_model_turn(self):
+        if self.buffer:
+            self.messages.append(("gemini", "".join(self.buffer)))
+        self.buffer = []
+
+
+async def run():
+    session = FakeLiveSession()
+    session.add_turn([
+        server_content(input_text="이 얼룩"),
+        server_content(input_text=" 어떻게 지워요?"),
+        server_content(output_text="커피 얼룩이네요. ", audio=b"\0" * 960),
+        server_content(output_text="중성세제로 두드려 주세요."),
+        server_content(turn_complete=True),
+    ])
+    # 사용자 발화만 있고 모델이 답하기 전에 턴이 끝나는 경우
+    session.add_turn([
+        server_content(input_text="고마워요", input_finished=True),
+        server_content(turn_complete=True),
+    ])
+
+    logger = MemoryLogger()
+    partials = []
+    router = TranscriptRouter(logger, on_partial=partials.append, echo=False)
+
+    for _ in range(2):
+        async for response in session.receive():
+            router.handle(response.server_content)
+            if response.server_content.turn_complete:
+                router.turn_complete()
+                logger.flush_model_turn()
+
+    expected = [
+        ("user", "이 얼룩 어떻게 지워요?"),
+        ("gemini", "커피 얼룩이네요. 중성세제로 두드려 주세요."),
+        ("user", "고마워요"),
+    ]
+    print("\n------------------------------------------------")
+    for sender, text in logger.messages:
+        print(f"  [{sender}] {text}")
+    print(f"  부분 전사: {partials}")
+    print("✅ 저장 순서 정상" if logger.messages == expected else "❌ 저장 내용이 예상과 다릅니다")
+    print("------------------------------------------------\n")
+
+
+asyncio.run(run())
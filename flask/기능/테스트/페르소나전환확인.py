@@ -0,0 +1,93 @@
+import asyncio
+import pathlib
+import sys
+
+# 실시간비전 폴더의 모듈을 가져오기 위한 경로 추가
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "실시간비전"))
+from fake_live import FakeLiveSession, server_content
+from live_transcript import TranscriptRouter
+from persona import PersonaLibrary, PersonaSwitcher
+from turn_state import TurnState
+
+# ==========================================
+# 세션 중 페르소나 전환 확인 (네트워크 없이)
+# ==========================================
+# 세탁법 페르소나로 시작한 세션에서 사용자가 "세탁기가 고장 났어요"라고 말하면
+# 발화 조각(on_partial)만 보고 수리 페르소나 지시문이 turn_complete=False로 한 번 전송되어야 한다.
+# 가짜 세션은 send_client_content에 네트워크 왕복(SEND_RTT)만큼 지연을 넣는다.
+# 모델이 답하는 중(TurnState.begin 이후)에 의도가 바뀌면 턴이 끝날 때까지 보내지 않아야 한다.
+
+SEND_RTT = 0.04     # 초
+
+
+class NullLogger:
+    def append_text(self, text):
+        pass
+
+    def log_user_message(self, text):
+        pass
+
+
+class SlowSendSession(FakeLiveSession):
+    async def send_client_content(self, **kwargs):
+        await asyncio.sleep(SEND_RTT)
+        await super().send_client_content(**kwargs)
+
+
+async def check_deferred(library):
+    """답변 중에는 미뤘다가 turn_complete 뒤에 보내는지"""
+    session = SlowSendSession()
+    turn_state = TurnState()
+    switcher = PersonaSwitcher(session, library, "세탁법", min_interval=0.0, turn_state=turn_state)
+    turn_state.begin()
+    switcher.on_text("세탁기가 고장")
+    switcher.on_text("세탁기가 고장 난 것 같아요")
+    await asyncio.sleep(SEND_RTT * 3)
+    during_turn = session.count("client_content")
+    turn_state.end()
+    await asyncio.sleep(SEND_RTT * 2)
+    return during_turn == 0 and session.count("client_content") == 1 and switcher.current == "세탁기수리법"
+
+
+async def run():
+    library = PersonaLibrary()
+    session = SlowSendSession()
+    switcher = PersonaSwitcher(session, library, "세탁법", min_interval=0.0)
+    router = TranscriptRouter(NullLogger(), on_partial=switcher.on_text, echo=False)
+
+    session.add_turn([
+        server_content(input_text="세탁기가"),
+        server_content(input_text=" 고장 난 것 같아요"),
+        server_content(input_text=" 에러 코드가 떠요", input_finished=True),
+        server_content(output_text="에러 코드를 보여 주세요."),
+        server_content(turn_complete=True),
+    ])
+    session.add_turn([
+        server_content(input_text="이 얼룩은 어떻게 빨래해요?", input_finished=True),
+        server_content(output_text="중성세제로 두드려 주세요."),
+        server_content(turn_complete=True),
+    ])
+    for _ in range(2):
+        async for response in session.receive():
+            router.handle(response.server_content)
+            await asyncio.sleep(0.1)    # 전사 조각 사이 간격 흉내
+        router.turn_complete()
+    await asyncio.sleep(SEND_RTT * 2)
+
+    sent = [payload for _, kind, payload in session.sent if kind == "client_content"]
+    ok = (
+        len(sent) == 2
+        and all(payload["turn_complete"] is False for payload in sent)
+        and library.text("세탁기수리법") in sent[0]["turns"][0]["parts"][0]["text"]
+        and library.text("세탁법") in sent[1]["turns"][0]["parts"][0]["text"]
+        and switcher.current == "세탁법"
+    )
+    deferred_ok = await check_deferred(library)
+    print("\n------------------------------------------------")
+    print(f"  📊 {switcher.summary()}")
+    print(f"  ⏸️ 답변 중 전환 요청: {'턴이 끝난 뒤 전송' if deferred_ok else '답변 도중 전송되거나 누락됨'}")
+    print("✅ 발화 조각에서 전환됨 (재연결 없음)" if ok and deferred_ok else "❌ 전환 결과가 예상과 다릅니다")
+    print("------------------------------------------------\n")
+
+
+asyncio.run(run())
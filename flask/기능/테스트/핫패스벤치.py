@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+# 실시간비전 폴더의 모듈을 가져오기 위한 경로 추가
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "실시간비전"))
+from audio_dsp import AudioUplinkGate, VoiceActivityDetector, frame_features, frame_rms, pcm_to_frames
+from frame_encoder import FrameEncoder
+from frame_gate import SceneChangeGate
+from frame_sources import SyntheticSource
+from stt import SpeechTranscriber, StubEngine
+from uplink_control import DEFAULT_LADDER
+
+# ==========================================
+# 비디오 / 오디오 핫패스 마이크로벤치마크
+# ==========================================
+# 프레임마다 / 512샘플 청크마다 도는 작업을 합성 프레임(SyntheticSource)과 합성 PCM으로 잰다.
+#   - ns/op      : 반복 측정의 중앙값
+#   - alloc/op   : tracemalloc으로 잰 1회당 순간 할당량 (NumPy 배열 / 파이썬 객체, OpenCV 내부 버퍼는 제외)
+#   - 처리량     : 초당 횟수 (오디오는 실시간 대비 배수)
+#
+# 기준값은 핫패스벤치_기준.json에 저장한다. 실행하면 기준과 비교해서 TOLERANCE 이상 느려진 항목을 표시하고
+# 종료 코드 1을 돌려준다 (CI 등에서 회귀 확인용).
+#   python 핫패스벤치.py            기준과 비교
+#   python 핫패스벤치.py --save     현재 결과를 기준으로 저장 (장비가 바뀌었을 때)
+#   python 핫패스벤치.py --json 결과.json
+
+BASELINE_PATH = pathlib.Path(__file__).resolve().parent / "핫패스벤치_기준.json"
+TOLERANCE = 0.25        # 기준 대비 25% 넘게 느려지면 회귀
+MIN_TIME = 0.3          # 측정 1회당 최소 시간 (초)
+REPEATS = 5
+ALLOC_SAMPLES = 20
+
+RATE = 16000
+CHUNK = 512
+FRAME_W, FRAME_H = 1280, 720
+
+
+# ---------- 측정 도구 ----------
+
+def measure(fn, items_per_op=1.0):
+    """fn()을 반복 실행해서 {ns_per_op, ops_per_s, alloc_bytes_per_op} 반환"""
+    for _ in range(3):
+        fn()    # 워밍업 (버퍼 할당 / 캐시)
+
+    # MIN_TIME을 넘길 만큼 반복 횟수를 늘린다
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_TIME:
+            break
+        loops *= 2 if elapsed < MIN_TIME / 10 else max(2, int(MIN_TIME / elapsed * 1.2))
+
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter_ns()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter_ns() - started) / loops)
+    ns = statistics.median(samples)
+
+    tracemalloc.start()
+    allocs = []
+    for _ in range(ALLOC_SAMPLES):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        allocs.append(peak - before)
+    tracemalloc.stop()
+
+    return {
+        "ns_per_op": round(ns),
+        "ops_per_s": round(1e9 / ns * items_per_op, 1),
+        "alloc_bytes_per_op": int(statistics.median(allocs)),
+        "spread_pct": round((max(samples) - min(samples)) / ns * 100, 1),
+    }
+
+
+def synthetic_frames(count=8):
+    source = SyntheticSource(FRAME_W, FRAME_H, fps=30, seed=7, scene_seconds=0.1, realtime=False)
+    return [source.read()[1].copy() for _ in range(count)]
+
+
+def synthetic_pcm(seconds, speech_ratio=0.5, seed=0):
+    """발화(배음이 있는 톤 + 잡음) / 침묵(약한 잡음)을 번갈아 이어 붙인 16kHz PCM"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    total = int(seconds * RATE)
+    while sum(len(p) for p in parts) < total:
+        speech = int(RATE * 1.5)
+        t = np.arange(speech) / RATE
+        f0 = rng.uniform(120, 220)
+        voice = sum(3000 / k * np.sin(2 * np.pi * f0 * k * t) for k in range(1, 5))
+        parts.append(voice + rng.normal(0, 150, speech))
+        silence = int(speech * (1 - speech_ratio) / speech_ratio)
+        parts.append(rng.normal(0, 80, silence))
+    return np.clip(np.concatenate(parts)[:total], -32768, 32767).astype(np.int16).tobytes()
+
+
+def cycle(items):
+    state = {"i": 0}
+
+    def next_item():
+        state["i"] = (state["i"] + 1) % len(items)
+        return items[state["i"]]
+    return next_item
+
+
+# ---------- 벤치마크 ----------
+
+async def video_benchmarks():
+    results = {}
+    frames = synthetic_frames()
+    next_frame = cycle(frames)
+
+    results["frame.copy 1280x720"] = measure(lambda: next_frame().copy())
+
+    # 전송 경로와 같은 함수 (미리 잡아둔 resize 버퍼 + imencode)
+    encoder = FrameEncoder(max_pending=1)
+    try:
+        for w, h, quality in DEFAULT_LADDER:
+            results[f"resize+imencode {w}x{h} q{quality}"] = measure(
+                lambda w=w, h=h, q=quality: encoder._encode(next_frame(), (w, h), q))
+        for quality in (35, 50, 70, 85, 95):
+            results[f"resize+imencode 640x480 q{quality}"] = measure(
+                lambda q=quality: encoder._encode(next_frame(), (640, 480), q))
+    finally:
+        encoder.stop()
+
+    gate = SceneChangeGate()
+    results["scene_gate.check 1280x720"] = measure(lambda: gate.check(next_frame()))
+    return results
+
+
+def audio_benchmarks():
+    results = {}
+    chunk_seconds = CHUNK / RATE
+    pcm = synthetic_pcm(10.0)
+    chunks = [pcm[i:i + CHUNK * 2] for i in range(0, len(pcm) - CHUNK * 2 + 1, CHUNK * 2)]
+    next_chunk = cycle(chunks)
+    realtime = 1.0 / chunk_seconds      # ops/s -> 실시간 배수로 바꾸는 값
+
+    results["pcm_to_frames 512"] = measure(lambda: pcm_to_frames(next_chunk()))
+    results["rms 512"] = measure(lambda: frame_rms(pcm_to_frames(next_chunk())))
+    results["features(rms/zcr/flatness) 512"] = measure(lambda: frame_features(pcm_to_frames(next_chunk())))
+
+    vad = VoiceActivityDetector(frame_size=CHUNK)
+    results["vad.process 512"] = measure(lambda: vad.process(next_chunk()))
+    block = b"".join(chunks[:16])       # STT는 최대 16청크(약 0.5초)씩 묶어서 처리
+    vad_block = VoiceActivityDetector(frame_size=CHUNK)
+    results["vad.process 16x512 (블록)"] = measure(lambda: vad_block.process(block), items_per_op=16)
+
+    gate = AudioUplinkGate(vad=VoiceActivityDetector(frame_size=CHUNK))
+    results["uplink_gate.process 512"] = measure(lambda: gate.process(next_chunk()))
+
+    for name, result in results.items():
+        per_op = 16 if "블록" in name else 1
+        result["x_realtime"] = round(1e9 / result["ns_per_op"] * per_op / realtime, 1)
+    results["stt segmentation 512"] = stt_segmentation()
+    return results
+
+
+def stt_segmentation(seconds=60.0):
+    """SpeechTranscriber 분할 스레드에 60초 분량을 한꺼번에 넣고 모두 잘릴 때까지의 시간"""
+    class NullLogger:
+        def log_user_message(self, text):
+            pass
+
+    pcm = synthetic_pcm(seconds, seed=1)
+    chunks = [pcm[i:i + CHUNK * 2] for i in range(0, len(pcm), CHUNK * 2)]
+    # 마지막 발화도 잘리도록 침묵을 덧붙임
+    chunks += [np.zeros(CHUNK, dtype=np.int16).tobytes()] * int(1.5 * RATE / CHUNK)
+
+    samples = []
+    utterances = 0
+    for _ in range(3):
+        transcriber = SpeechTranscriber(NullLogger(), engine=StubEngine(text="", delay=0.0),
+                                        workers=1, max_pending=1000, chunk_size=CHUNK)
+        started = time.perf_counter()
+        for chunk in chunks:
+            transcriber.add_audio(chunk)
+        # 큐가 비고 발화 수가 더 늘지 않을 때까지
+        last, stable_since = -1, time.perf_counter()
+        while True:
+            if transcriber.audio_queue.empty() and transcriber.utterances == last:
+                if time.perf_counter() - stable_since > 0.2:
+                    break
+            else:
+                last, stable_since = transcriber.utterances, time.perf_counter()
+            time.sleep(0.005)
+        elapsed = stable_since - started
+        transcriber.stop()
+        samples.append(elapsed)
+        utterances = transcriber.utterances
+
+    elapsed = statistics.median(samples)
+    audio_seconds = len(chunks) * CHUNK / RATE
+    return {
+        "ns_per_op": round(elapsed / len(chunks) * 1e9),
+        "ops_per_s": round(len(chunks) / elapsed, 1),
+        "alloc_bytes_per_op": None,
+        "spread_pct": round((max(samples) - min(samples)) / elapsed * 100, 1),
+        "x_realtime": round(audio_seconds / elapsed, 1),
+        "utterances": utterances,
+    }
+
+
+# ---------- 기준 비교 ----------
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+        "date": time.strftime("%Y-%m-%d"),
+    }
+
+
+def compare(results, baseline):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("ns_per_op"):
+            result["vs_baseline"] = None
+            continue
+        ratio = result["ns_per_op"] / base["ns_per_op"]
+        result["vs_baseline"] = round(ratio, 2)
+        if ratio > 1 + TOLERANCE:
+            regressions.append(name)
+    return regressions
+
+
+def print_table(results):
+    print(f"\n{'항목':<34}{'ns/op':>12}{'처리량/s':>12}{'alloc/op':>11}{'실시간x':>9}{'기준 대비':>10}")
+    print("-" * 88)
+    for name, r in results.items():
+        alloc = "-" if r["alloc_bytes_per_op"] is None else f"{r['alloc_bytes_per_op'] / 1024:.1f}KB"
+        rt = f"{r['x_realtime']}" if "x_realtime" in r else "-"
+        vs = r.get("vs_baseline")
+        vs_text = "-" if vs is None else (f"x{vs:.2f}" + (" ❌" if vs > 1 + TOLERANCE else ""))
+        print(f"{name:<34}{r['ns_per_op']:>12,}{r['ops_per_s']:>12,.0f}{alloc:>11}{rt:>9}{vs_text:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="비디오/오디오 핫패스 마이크로벤치마크")
+    parser.add_argument("--save", action="store_true", help=f"결과를 기준({BASELINE_PATH.name})으로 저장")
+    parser.add_argument("--json", help="결과를 JSON으로 저장할 경로")
+    parser.add_argument("--only", choices=["video", "audio"], help="한쪽만 실행")
+    args = parser.parse_args()
+
+    results = {}
+    if args.only != "audio":
+        results.update(asyncio.run(video_benchmarks()))
+    if args.only != "video":
+        results.update(audio_benchmarks())
+
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8")) if BASELINE_PATH.exists() else {}
+    regressions = compare(results, baseline) if baseline and not args.save else []
+    print_table(results)
+
+    report = {"environment": environment(), "tolerance": TOLERANCE, "results": results}
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.save:
+        BASELINE_PATH.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n💾 기준 저장: {BASELINE_PATH.name}")
+    elif baseline:
+        base_env = baseline.get("environment", {})
+        if base_env.get("cpus") != os.cpu_count() or base_env.get("opencv") != cv2.__version__:
+            print(f"\n⚠️ 기준을 만든 환경과 다릅니다 (기준: {base_env}) - 비교는 참고용")
+        if regressions:
+            print(f"\n❌ 기준보다 {TOLERANCE * 100:.0f}% 넘게 느려짐: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ 기준 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
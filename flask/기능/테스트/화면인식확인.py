@@ -0,0 +1,124 @@
+import asyncio
+import pathlib
+import sys
+
+import cv2
+import numpy as np
+
+# 실시간비전 폴더의 모듈을 가져오기 위한 경로 추가
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "실시간비전"))
+from fake_live import FakeLiveSession
+from frame_sources import SyntheticSource
+from turn_state import TurnState
+from visual_index import VisualIndex, VisualRecognizer
+
+# ==========================================
+# 로컬 화면 인식 확인 (카메라 / 네트워크 없이)
+# ==========================================
+# assets/세탁기_조작부.jpeg를 기준으로 색인을 만들고, 가짜 카메라 장면 위에
+# 조작부 사진을 크기 / 기울기 / 밝기를 바꿔 붙인 프레임(양성)과 그냥 장면(음성)을 번갈아 넣는다.
+# 1) 양성 인식률 / 음성 오인식 수 / 매칭 시간을 재고
+# 2) 인식기가 같은 대상은 맥락을 한 번만 (turn_complete=False) 보내고, 모델이 답하는 중에는
+#    턴이 끝날 때까지 미루고, 보이는 동안만 영상 간격 배수를 올리는지 가짜 세션으로 확인한다.
+
+ASSETS = pathlib.Path(__file__).resolve().parents[2] / "assets"
+PANEL_PATH = ASSETS / "세탁기_조작부.jpeg"
+DISTRACTOR_PATH = ASSETS / "수건사진.jpeg"      # 다른 기준 사진과 헷갈리지 않는지
+FRAMES = 60
+TARGET_RECALL = 0.9
+
+
+def load(path):
+    return cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def paste_panel(background, panel, rng):
+    """조작부 사진을 원근 왜곡 / 크기 / 밝기를 바꿔 배경 위에 붙인다"""
+    bh, bw = background.shape[:2]
+    ph, pw = panel.shape[:2]
+    scale = rng.uniform(1.0, 1.6)
+    w, h = int(pw * scale), int(ph * scale)
+    x, y = rng.integers(0, bw - w), rng.integers(0, bh - h)
+    skew = w * 0.08
+    corners = np.float32([[0, 0], [pw, 0], [pw, ph], [0, ph]])
+    placed = np.float32([[x + rng.uniform(0, skew), y + rng.uniform(0, skew)], [x + w - rng.uniform(0, skew), y],
+                         [x + w, y + h - rng.uniform(0, skew)], [x, y + h]])
+    matrix = cv2.getPerspectiveTransform(corners, placed)
+    warped = cv2.warpPerspective(panel, matrix, (bw, bh))
+    mask = cv2.warpPerspective(np.full_like(panel, 255), matrix, (bw, bh))
+    frame = np.where(mask > 0, warped, background)
+    return cv2.convertScaleAbs(frame, alpha=rng.uniform(0.8, 1.2), beta=rng.uniform(-20, 20))
+
+
+def make_frames(panel):
+    source = SyntheticSource(640, 480, fps=10, seed=3, realtime=False)
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(FRAMES):
+        _, background = source.read()
+        positive = i % 2 == 0
+        frames.append((positive, paste_panel(background, panel, rng) if positive else background.copy()))
+    return frames
+
+
+async def check_recognizer(index, panel_frame, empty_frame):
+    session = FakeLiveSession()
+    turn_state = TurnState()
+    recognizer = VisualRecognizer(session, index, interval_scale=2.0, forget_after=2, turn_state=turn_state)
+    scales = []
+    sent_during_turn = None
+    # 모델이 답하는 중에 조작부 3번 (알림은 미룸) -> 턴 끝 (알림 전송)
+    # -> 다른 장면 2번 (인식 해제) -> 다시 조작부 (이미 알린 대상이라 다시 보내지 않음)
+    turn_state.begin()
+    for i, frame in enumerate([panel_frame] * 3 + [empty_frame] * 2 + [panel_frame]):
+        if i == 3:
+            await asyncio.sleep(0.05)
+            sent_during_turn = session.count("client_content")
+            turn_state.end()
+        recognizer.offer(frame)
+        await recognizer._task
+        scales.append(recognizer.video_interval_scale)
+    await asyncio.sleep(0.05)
+    sent = [payload for _, kind, payload in session.sent if kind == "client_content"]
+    ok = (
+        sent_during_turn == 0
+        and len(sent) == 1
+        and sent[0]["turn_complete"] is False
+        and "조작부" in sent[0]["turns"][0]["parts"][0]["text"]
+        and scales == [2.0, 2.0, 2.0, 2.0, 1.0, 2.0]
+    )
+    return ok, recognizer
+
+
+def main():
+    panel = load(PANEL_PATH)
+    index = VisualIndex()
+    index.add(PANEL_PATH.stem, panel, "드럼 세탁기 조작부 (코스 선택 다이얼, 표시창, 옵션 버튼)")
+    if DISTRACTOR_PATH.exists():
+        index.add(DISTRACTOR_PATH.stem, load(DISTRACTOR_PATH))
+
+    frames = make_frames(panel)
+    hits = false_alarms = positives = 0
+    for positive, frame in frames:
+        match = index.match(index.prepare(frame))
+        if positive:
+            positives += 1
+            hits += match is not None and match.label == PANEL_PATH.stem
+        else:
+            false_alarms += match is not None
+
+    ok, recognizer = asyncio.run(check_recognizer(index, frames[0][1], frames[1][1]))
+    recall = hits / positives
+
+    print("\n------------------------------------------------")
+    print(f"  👁️ 색인: 기준 {len(index)}개 ({', '.join(ref.label for ref in index.references)})")
+    print(f"  🎯 조작부 인식: {hits}/{positives} ({recall:.0%}), 빈 장면 오인식 {false_alarms}회")
+    print(f"  ⏱️ {index.summary()}")
+    print(f"  💬 인식기: {recognizer.summary()}")
+    print("✅ 로컬 인식 정상" if recall >= TARGET_RECALL and false_alarms == 0 and ok
+          else "❌ 인식률 / 오인식 / 맥락 전송이 예상과 다릅니다")
+    print("------------------------------------------------\n")
+
+
+if __name__ == "__main__":
+    main()